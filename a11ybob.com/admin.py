@@ -1,3 +1,4 @@
+import io
 import secrets
 from functools import wraps
 from datetime import datetime, timezone
@@ -11,11 +12,39 @@ from flask import (
     flash,
     session,
     current_app,
+    Response,
+    stream_with_context,
 )
 from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+import autolink
+import bulk
+import facets
+import glossary
+import related
+import versions
+from listing import fetch_page, prefix_filter
+from projections import view
+from rendering import render_article
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
+ADMIN_PER_PAGE = 50
+
+# Admin list tables: the field the filter box matches by prefix, the sortable
+# columns (each backed by a (field, _id) index) and the default sort, where a
+# leading "-" means descending.
+ADMIN_LISTS = {
+    "glossary": {"prefix": "term", "sorts": ["term"], "default": "term"},
+    "reviews": {"prefix": "title", "sorts": ["title", "year"], "default": "-year"},
+    "articles": {
+        "prefix": "title",
+        "sorts": ["title", "published_date"],
+        "default": "-published_date",
+    },
+}
+
 
 def admin_required(f):
     @wraps(f)
@@ -39,10 +68,76 @@ def parse_lines(text):
     return [line.strip() for line in text.splitlines() if line.strip()]
 
 
+def admin_listing(collection):
+    """One page of an admin list table, filtered and sorted by the query string.
+
+    Returns the fetch_page() result plus the ``query`` and ``sort`` in effect.
+    """
+    options = ADMIN_LISTS[collection]
+    query = request.args.get("q", "").strip()
+    sort = request.args.get("sort", options["default"])
+    if sort.lstrip("-") not in options["sorts"]:
+        sort = options["default"]
+    listing = fetch_page(
+        get_db()[collection],
+        page=max(1, request.args.get("page", 1, type=int)),
+        per_page=ADMIN_PER_PAGE,
+        match=prefix_filter(options["prefix"], query),
+        sort=[(sort.lstrip("-"), -1 if sort.startswith("-") else 1)],
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        projection=view(collection, "admin"),
+    )
+    listing.update(query=query, sort=sort)
+    return listing
+
+
 def today():
     return datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
 
+def now():
+    return datetime.now(timezone.utc)
+
+
+def record_change(db, collection, old, new):
+    """Update data derived from a collection after a create, edit or delete.
+
+    ``old`` is None for a create and ``new`` is None for a delete.
+    """
+    # Recommendations change on documents in any collection, so they are
+    # written before the content versions move
+    recommended = related.apply_change(db, collection, old, new)
+    version = versions.bump(db, collection)
+    current_app.config["versions"].note(collection, version)
+    for name in sorted(recommended - {collection}):
+        current_app.config["versions"].note(name, versions.bump(db, name))
+    facets.apply_change(db, collection, old, new)
+    if collection == "glossary":
+        glossary.cascade(db, old, new)
+        if autolink.vocabulary(old) != autolink.vocabulary(new):
+            vocabulary = versions.bump(db, autolink.VOCABULARY)
+            current_app.config["versions"].note(autolink.VOCABULARY, vocabulary)
+    search = current_app.config.get("search")
+    if search is not None:
+        search.apply_change(collection, old, new, version)
+
+
+def record_bulk_change(db, collection):
+    """Refresh data derived from ``collection`` after a bulk import."""
+    tracker = current_app.config["versions"]
+    if collection == "glossary":
+        # Before the bump, so no page is cached under the new version with
+        # the old related-term lists
+        glossary.relink_all(db)
+    tracker.note(collection, versions.bump(db, collection))
+    facets.rebuild(db, collection)
+    if collection == "glossary":
+        tracker.note(autolink.VOCABULARY, versions.bump(db, autolink.VOCABULARY))
+    # The in-process search index rebuilds when it sees the new version.
+    # Recommendations for imported documents wait for seed/build_related.py.
+
+
 # --- Auth ---
 
 
@@ -77,9 +172,64 @@ def dashboard():
     db = get_db()
     return render_template(
         "admin/dashboard.html",
-        glossary_count=db.glossary.count_documents({}),
-        review_count=db.reviews.count_documents({}),
-        article_count=db.articles.count_documents({}),
+        glossary_count=db.glossary.estimated_document_count(),
+        review_count=db.reviews.estimated_document_count(),
+        article_count=db.articles.estimated_document_count(),
+    )
+
+
+# --- Bulk import and export ---
+
+
+@admin_bp.route("/import", methods=["GET", "POST"])
+@admin_required
+def bulk_import():
+    report = None
+    collection = request.form.get("collection", "")
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if collection not in VALIDATORS:
+            flash("Choose what to import.", "error")
+        elif not upload or not upload.filename:
+            flash("Choose a file to upload.", "error")
+        else:
+            db = get_db()
+            fmt = request.form.get("format") or bulk.format_for(upload.filename)
+            stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+            try:
+                report = bulk.import_records(
+                    db,
+                    collection,
+                    bulk.read_records(stream, fmt),
+                    VALIDATORS[collection],
+                    automaton=current_app.config["glossary_links"].current(),
+                )
+            except ValueError as e:
+                flash(f"Could not read the file: {e}", "error")
+            # A file that fails part-way may still have written earlier batches
+            if report is None or report.imported:
+                record_bulk_change(db, collection)
+    return render_template(
+        "admin/import.html",
+        collections=list(VALIDATORS),
+        formats=bulk.FORMATS,
+        key_fields=bulk.KEY_FIELDS,
+        selected=collection,
+        report=report,
+    )
+
+
+@admin_bp.route("/export/<collection>.<fmt>")
+@admin_required
+def bulk_export(collection, fmt):
+    if collection not in bulk.FIELDS or fmt not in bulk.FORMATS:
+        flash("Unknown export.", "error")
+        return redirect(url_for("admin.bulk_import"))
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(
+        stream_with_context(bulk.export_chunks(get_db(), collection, fmt)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={collection}.{fmt}"},
     )
 
 
@@ -89,9 +239,19 @@ def dashboard():
 @admin_bp.route("/glossary")
 @admin_required
 def glossary_list():
+    listing = admin_listing("glossary")
+    return render_template(
+        "admin/glossary_list.html", terms=listing.pop("items"), **listing
+    )
+
+
+@admin_bp.route("/glossary/dangling")
+@admin_required
+def glossary_dangling():
     db = get_db()
-    terms = list(db.glossary.find().sort("term", 1))
-    return render_template("admin/glossary_list.html", terms=terms)
+    return render_template(
+        "admin/glossary_dangling.html", terms=glossary.dangling_references(db)
+    )
 
 
 @admin_bp.route("/glossary/add", methods=["GET", "POST"])
@@ -107,9 +267,20 @@ def glossary_add():
                 form=request.form,
                 editing=False,
             )
+        term["related"] = glossary.resolve(db, term["related_terms"])
         term["created"] = today()
         term["updated"] = today()
-        db.glossary.insert_one(term)
+        term["modified"] = now()
+        try:
+            db.glossary.insert_one(term)
+        except DuplicateKeyError:
+            return render_template(
+                "admin/glossary_form.html",
+                errors=[_duplicate_term(term)],
+                form=request.form,
+                editing=False,
+            )
+        record_change(db, "glossary", None, term)
         flash(f"Glossary term \u2018{term['term']}\u2019 added.", "success")
         return redirect(url_for("admin.glossary_list"))
     return render_template(
@@ -136,8 +307,20 @@ def glossary_edit(term_id):
                 editing=True,
                 term=existing,
             )
+        doc["related"] = glossary.resolve(db, doc["related_terms"])
         doc["updated"] = today()
-        db.glossary.update_one({"_id": ObjectId(term_id)}, {"$set": doc})
+        doc["modified"] = now()
+        try:
+            db.glossary.update_one({"_id": ObjectId(term_id)}, {"$set": doc})
+        except DuplicateKeyError:
+            return render_template(
+                "admin/glossary_form.html",
+                errors=[_duplicate_term(doc)],
+                form=request.form,
+                editing=True,
+                term=existing,
+            )
+        record_change(db, "glossary", existing, dict(existing, **doc))
         flash(f"Glossary term \u2018{doc['term']}\u2019 updated.", "success")
         return redirect(url_for("admin.glossary_list"))
 
@@ -157,6 +340,7 @@ def glossary_delete(term_id):
 
     if request.method == "POST":
         db.glossary.delete_one({"_id": ObjectId(term_id)})
+        record_change(db, "glossary", term, None)
         flash(f"Glossary term \u2018{term['term']}\u2019 deleted.", "success")
         return redirect(url_for("admin.glossary_list"))
 
@@ -169,6 +353,10 @@ def glossary_delete(term_id):
     )
 
 
+def _duplicate_term(doc):
+    return f"A glossary term named \u2018{doc['term']}\u2019 already exists."
+
+
 def _validate_glossary(form):
     errors = []
     term = form.get("term", "").strip()
@@ -195,9 +383,10 @@ def _validate_glossary(form):
 @admin_bp.route("/reviews")
 @admin_required
 def reviews_list():
-    db = get_db()
-    reviews = list(db.reviews.find().sort("year", -1))
-    return render_template("admin/reviews_list.html", reviews=reviews)
+    listing = admin_listing("reviews")
+    return render_template(
+        "admin/reviews_list.html", reviews=listing.pop("items"), **listing
+    )
 
 
 @admin_bp.route("/reviews/add", methods=["GET", "POST"])
@@ -215,7 +404,17 @@ def reviews_add():
             )
         doc["created"] = today()
         doc["updated"] = today()
-        db.reviews.insert_one(doc)
+        doc["modified"] = now()
+        try:
+            db.reviews.insert_one(doc)
+        except DuplicateKeyError:
+            return render_template(
+                "admin/reviews_form.html",
+                errors=[_duplicate_doi(doc)],
+                form=request.form,
+                editing=False,
+            )
+        record_change(db, "reviews", None, doc)
         flash(f"Review \u2018{doc['title']}\u2019 added.", "success")
         return redirect(url_for("admin.reviews_list"))
     return render_template(
@@ -243,7 +442,18 @@ def reviews_edit(review_id):
                 review=existing,
             )
         doc["updated"] = today()
-        db.reviews.update_one({"_id": ObjectId(review_id)}, {"$set": doc})
+        doc["modified"] = now()
+        try:
+            db.reviews.update_one({"_id": ObjectId(review_id)}, {"$set": doc})
+        except DuplicateKeyError:
+            return render_template(
+                "admin/reviews_form.html",
+                errors=[_duplicate_doi(doc)],
+                form=request.form,
+                editing=True,
+                review=existing,
+            )
+        record_change(db, "reviews", existing, dict(existing, **doc))
         flash(f"Review \u2018{doc['title']}\u2019 updated.", "success")
         return redirect(url_for("admin.reviews_list"))
 
@@ -263,6 +473,7 @@ def reviews_delete(review_id):
 
     if request.method == "POST":
         db.reviews.delete_one({"_id": ObjectId(review_id)})
+        record_change(db, "reviews", review, None)
         flash(f"Review \u2018{review['title']}\u2019 deleted.", "success")
         return redirect(url_for("admin.reviews_list"))
 
@@ -281,9 +492,10 @@ def reviews_delete(review_id):
 @admin_bp.route("/articles")
 @admin_required
 def articles_list():
-    db = get_db()
-    articles = list(db.articles.find().sort("published_date", -1))
-    return render_template("admin/articles_list.html", articles=articles)
+    listing = admin_listing("articles")
+    return render_template(
+        "admin/articles_list.html", articles=listing.pop("items"), **listing
+    )
 
 
 @admin_bp.route("/articles/add", methods=["GET", "POST"])
@@ -299,9 +511,20 @@ def articles_add():
                 form=request.form,
                 editing=False,
             )
+        render_article(doc, current_app.config["glossary_links"].current())
         doc["created"] = today()
         doc["updated"] = today()
-        db.articles.insert_one(doc)
+        doc["modified"] = now()
+        try:
+            db.articles.insert_one(doc)
+        except DuplicateKeyError:
+            return render_template(
+                "admin/articles_form.html",
+                errors=[_duplicate_slug(doc)],
+                form=request.form,
+                editing=False,
+            )
+        record_change(db, "articles", None, doc)
         flash(f"Article \u2018{doc['title']}\u2019 added.", "success")
         return redirect(url_for("admin.articles_list"))
     return render_template(
@@ -328,8 +551,20 @@ def articles_edit(article_id):
                 editing=True,
                 article=existing,
             )
+        render_article(doc, current_app.config["glossary_links"].current())
         doc["updated"] = today()
-        db.articles.update_one({"_id": ObjectId(article_id)}, {"$set": doc})
+        doc["modified"] = now()
+        try:
+            db.articles.update_one({"_id": ObjectId(article_id)}, {"$set": doc})
+        except DuplicateKeyError:
+            return render_template(
+                "admin/articles_form.html",
+                errors=[_duplicate_slug(doc)],
+                form=request.form,
+                editing=True,
+                article=existing,
+            )
+        record_change(db, "articles", existing, dict(existing, **doc))
         flash(f"Article \u2018{doc['title']}\u2019 updated.", "success")
         return redirect(url_for("admin.articles_list"))
 
@@ -349,6 +584,7 @@ def articles_delete(article_id):
 
     if request.method == "POST":
         db.articles.delete_one({"_id": ObjectId(article_id)})
+        record_change(db, "articles", article, None)
         flash(f"Article \u2018{article['title']}\u2019 deleted.", "success")
         return redirect(url_for("admin.articles_list"))
 
@@ -396,6 +632,14 @@ def _validate_article(form):
     return doc, errors
 
 
+def _duplicate_doi(doc):
+    return f"Another review already has the DOI {doc['doi']}."
+
+
+def _duplicate_slug(doc):
+    return f"Another article already uses the slug \u2018{doc['slug']}\u2019."
+
+
 def _validate_review(form):
     errors = []
     title = form.get("title", "").strip()
@@ -437,3 +681,11 @@ def _validate_review(form):
         "rating": rating,
     }
     return doc, errors
+
+
+# Form validators by collection, shared with bulk imports
+VALIDATORS = {
+    "glossary": _validate_glossary,
+    "reviews": _validate_review,
+    "articles": _validate_article,
+}
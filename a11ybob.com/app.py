@@ -1,332 +1,531 @@
-import math
-import markdown as md
-from markupsafe import Markup
-from flask import Flask, render_template, request, session
-from pymongo import MongoClient
+import os
+from markupsafe import Markup, escape
+from flask import Flask, make_response, render_template, request, session, url_for
+from jinja2 import FileSystemBytecodeCache
 from bson.objectid import ObjectId
+from cache import CACHE_ARGS, ResponseCache, cached_page
 from config import Config
+from database import LazyDatabase
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
+from conditional import (
+    collection_validators,
+    document_validators,
+    not_modified,
+    with_validators,
+    without_validators,
+)
 from admin import admin_bp
+from autolink import VOCABULARY, GlossaryLinker
+from facets import FACET_FIELDS
+from listing import fetch_page, text_search
+from projections import view
+from search import ATLAS_INDEXES, SEARCH_FIELDS, MemorySearch
+from typeahead import DEFAULT_LIMIT, MAX_LIMIT, Typeahead
+from versions import VersionTracker
+from rendering import render_article, render_markdown, is_stale
+import assets
+import metrics
+import timing
 
 GLOSSARY_PER_PAGE = 20
 REVIEWS_PER_PAGE = 10
 ARTICLES_PER_PAGE = 10
 
+REVIEW_SORTS = {
+    "newest": ("_id", -1),
+    "year_desc": ("year", -1),
+    "year_asc": ("year", 1),
+    "title": ("title", 1),
+    "author": ("authors", 1),
+}
+ARTICLE_SORTS = {
+    "newest": ("published_date", -1),
+    "oldest": ("published_date", 1),
+    "title": ("title", 1),
+}
+
+# Numbered page links stop here; deeper pages are reached with cursor links
+NUMBERED_PAGE_LIMIT = 20
+
+# Browsers may reuse typeahead suggestions this long
+SUGGEST_MAX_AGE = 60
+
 app = Flask(__name__)
 app.config.from_object(Config)
 
-# MongoDB connection
-client = MongoClient(
-    app.config["MONGO_URI"],
-    serverSelectionTimeoutMS=5000,
-    connectTimeoutMS=5000,
-    socketTimeoutMS=10000,
-)
-db = client[app.config["MONGO_DB"]]
+
+def bytecode_cache():
+    """A Jinja bytecode cache in JINJA_CACHE_DIR, or None if it is disabled
+    or cannot be written."""
+    directory = app.config["JINJA_CACHE_DIR"]
+    if not directory:
+        return None
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        return None
+    if not os.access(directory, os.W_OK):
+        return None
+    return FileSystemBytecodeCache(directory)
+
+
+# New workers load compiled templates instead of compiling them again
+app.jinja_env.bytecode_cache = bytecode_cache()
+
+
+def client_options():
+    """Keyword arguments for this app's MongoClient and AsyncMongoClient."""
+    config = app.config
+    options = {
+        "serverSelectionTimeoutMS": 5000,
+        "connectTimeoutMS": 5000,
+        "socketTimeoutMS": 10000,
+        "maxPoolSize": config["MONGO_MAX_POOL_SIZE"],
+        "minPoolSize": config["MONGO_MIN_POOL_SIZE"],
+        "event_listeners": [timing.CommandTimer(), *metrics.listeners()],
+    }
+    if config["MONGO_WAIT_QUEUE_TIMEOUT_MS"]:
+        options["waitQueueTimeoutMS"] = config["MONGO_WAIT_QUEUE_TIMEOUT_MS"]
+    if config["MONGO_MAX_IDLE_TIME_MS"]:
+        options["maxIdleTimeMS"] = config["MONGO_MAX_IDLE_TIME_MS"]
+    if config["MONGO_COMPRESSORS"]:
+        options["compressors"] = config["MONGO_COMPRESSORS"]
+    return options
+
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def public_read_preference():
+    """The read preference for public pages, from the configuration."""
+    mode = READ_PREFERENCES[app.config["MONGO_PUBLIC_READ_PREFERENCE"]]
+    if mode is Primary:
+        return Primary()
+    return mode(max_staleness=app.config["MONGO_MAX_STALENESS_SECONDS"])
+
+
+def settle_seconds():
+    """How long after a content version moves public reads may still miss
+    the change: the secondaries' staleness bound plus the version check
+    interval, or 0 when public pages read the primary."""
+    if app.config["MONGO_PUBLIC_READ_PREFERENCE"] == "primary":
+        return 0.0
+    return (
+        app.config["MONGO_MAX_STALENESS_SECONDS"]
+        + app.config["CONTENT_VERSION_CHECK_SECONDS"]
+    )
+
+
+# MongoDB connection, made on first use in each process so the app can be
+# preloaded before gunicorn forks its workers
+db = LazyDatabase(app.config["MONGO_URI"], app.config["MONGO_DB"], client_options)
 app.config["db"] = db
 
+# Public page content may come from secondaries. Admin pages, writes, content
+# versions and the in-process indexes built from them stay on the primary.
+public_db = db.with_options(read_preference=public_read_preference())
+
+# Content versions, shared by everything that derives data from a collection
+app.config["versions"] = VersionTracker(
+    db, interval=app.config["CONTENT_VERSION_CHECK_SECONDS"], settle=settle_seconds()
+)
+
+# Full-text search backend (None means Atlas Search)
+app.config["search"] = None
+if app.config["SEARCH_BACKEND"] == "memory":
+    app.config["search"] = MemorySearch(db, FACET_FIELDS, app.config["versions"])
+
+# Glossary term links in articles and reviews
+app.config["glossary_links"] = GlossaryLinker(
+    db, app.config["versions"], app.config["GLOSSARY_LINK_PREFIX"]
+)
+
+# Glossary search box suggestions
+app.config["typeahead"] = Typeahead(db, app.config["versions"])
+
+# Rendered public pages
+app.config["response_cache"] = None
+if app.config["RESPONSE_CACHE_MAX_BYTES"] > 0:
+    app.config["response_cache"] = ResponseCache(app.config["RESPONSE_CACHE_MAX_BYTES"])
+
+# Server-Timing header and slow-request log
+timing.init_app(app)
+
+# Prometheus metrics at /metrics
+metrics.init_app(app)
+
+# Fingerprinted static assets and compressed responses
+assets.init_app(app)
+
 # Register admin blueprint
 app.register_blueprint(admin_bp)
 
 
+def compile_templates():
+    """Compile every template into the Jinja cache, so a preloading server
+    does it once before forking instead of in each worker. With a bytecode
+    cache this also stores each template's code for later processes."""
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+
 # --- Markdown filter ---
 
 @app.template_filter("markdown")
 def markdown_filter(text):
     if not text:
         return ""
-    return Markup(md.markdown(text, extensions=["extra", "smarty"]))
+    return Markup(render_markdown(text))
+
+
+@app.template_filter("glossary_links")
+def glossary_links_filter(text):
+    """Escape plain text and link the glossary terms it mentions."""
+    if not text:
+        return ""
+    automaton = app.config["glossary_links"].current()
+    return Markup(automaton.link_html(str(escape(text))))
 
 
 # --- Context processor for nav highlighting ---
 
 @app.context_processor
 def nav_context():
+    def listing_url(**position):
+        # Only the arguments the page cache keys on, so a cached page never
+        # links with one visitor's other parameters
+        args = [
+            (k, v)
+            for k, v in request.args.items()
+            if k in CACHE_ARGS and k not in ("page", "after", "before")
+        ]
+        args += position.items()
+        return request.path + "?" + "&".join(f"{k}={v}" for k, v in args)
+
     def url_for_page(page_num):
-        args = request.args.copy()
-        args["page"] = page_num
-        return request.path + "?" + "&".join(
-            f"{k}={v}" for k, v in args.items(multi=True)
-        )
+        return listing_url(page=page_num)
+
+    def url_for_cursor(direction, token):
+        return listing_url(**{direction: token})
 
     return {
         "current_path": request.path,
         "is_admin": session.get("admin", False),
         "url_for_page": url_for_page,
+        "url_for_cursor": url_for_cursor,
+        "numbered_page_limit": NUMBERED_PAGE_LIMIT,
+    }
+
+
+def listing_query(collection, q, facet_value):
+    """fetch_page() filter and projection arguments for a listing's search box
+    and facet."""
+    match = {FACET_FIELDS[collection]: facet_value} if facet_value else None
+    if not q:
+        return {"match": match, "projection": view(collection, "card")}
+    engine = app.config["search"]
+    metrics.count_search(ATLAS_INDEXES[collection], "atlas" if engine is None else "memory")
+    if engine is not None:
+        # The in-process index applies the facet filter itself
+        return {
+            "hits": engine.search(collection, q, facet_value or None),
+            "projection": view(collection, "card"),
+        }
+    return {
+        "match": match,
+        "search": text_search(ATLAS_INDEXES[collection], q, SEARCH_FIELDS[collection]),
+        "projection": view(collection, "search"),
     }
 
 
 # --- Static pages ---
 
 @app.route("/")
+@cached_page()
 def home():
     return render_template("index.html")
 
 
 @app.route("/about")
+@cached_page()
 def about():
     return render_template("about.html")
 
 
+# --- Listing and detail page steps ---
+
+def listing_args():
+    """fetch_page() arguments every public listing takes from the request."""
+    return {
+        "with_facets": True,
+        "after": request.args.get("after"),
+        "before": request.args.get("before"),
+        "count_cursor_pages": app.config["CURSOR_PAGE_TOTALS"],
+    }
+
+
+def listing_context(listing):
+    """Template variables for a listing's counts and pagination."""
+    return {
+        "total": listing["total"],
+        "page": listing["page"],
+        "total_pages": listing["total_pages"],
+        "next_cursor": listing["next_cursor"],
+        "prev_cursor": listing["prev_cursor"],
+    }
+
+
+def listing_page(collection, query, render):
+    """A listing view: ``query()`` returns fetch_page() arguments and template
+    variables, ``render(listing, context)`` the HTML.
+
+    asgi.py serves the same pages from the same ``query`` and ``render``.
+    """
+    # Until secondaries are sure to have a change, a page can be older than
+    # the version its validators would claim, so it is sent without them
+    settled = not app.config["versions"].unsettled([collection])
+    if settled:
+        validators = collection_validators(db, collection)
+        cached = not_modified(*validators)
+        if cached:
+            return cached
+    fetch, context = query()
+    listing = fetch_page(public_db[collection], **fetch)
+    html = render(listing, context)
+    if not settled:
+        return without_validators(html)
+    return with_validators(html, *validators)
+
+
+def detail_validators(doc, *extra):
+    """(response, validators) for a detail page: the response is a 404 or
+    304 to return as is, or None to go on and render ``doc``."""
+    if not doc:
+        return (render_template("404.html"), 404), None
+    validators = document_validators(doc, *extra)
+    return not_modified(*validators), validators
+
+
 # --- Glossary ---
 
-@app.route("/glossary")
-def glossary_index():
+def glossary_index_query():
     q = request.args.get("q", "").strip()
     category = request.args.get("category", "").strip()
     page = max(1, request.args.get("page", 1, type=int))
+    fetch = dict(
+        page=page,
+        per_page=GLOSSARY_PER_PAGE,
+        **listing_query("glossary", q, category),
+        sort=None if q else [("term", 1)],
+        **listing_args(),
+    )
+    return fetch, {"query": q, "selected_category": category}
 
-    if q:
-        # Atlas Search full-text query
-        pipeline = [
-            {
-                "$search": {
-                    "index": "glossary_search",
-                    "text": {
-                        "query": q,
-                        "path": ["term", "aka", "definition", "category"],
-                        "fuzzy": {"maxEdits": 1},
-                    },
-                }
-            },
-            {"$addFields": {"score": {"$meta": "searchScore"}}},
-        ]
-        if category:
-            pipeline.append({"$match": {"category": category}})
-        all_terms = list(db.glossary.aggregate(pipeline))
-        total = len(all_terms)
-        total_pages = math.ceil(total / GLOSSARY_PER_PAGE) or 1
-        page = min(page, total_pages)
-        skip = (page - 1) * GLOSSARY_PER_PAGE
-        terms = all_terms[skip : skip + GLOSSARY_PER_PAGE]
-    elif category:
-        total = db.glossary.count_documents({"category": category})
-        total_pages = math.ceil(total / GLOSSARY_PER_PAGE) or 1
-        page = min(page, total_pages)
-        skip = (page - 1) * GLOSSARY_PER_PAGE
-        terms = list(
-            db.glossary.find({"category": category})
-            .sort("term", 1)
-            .skip(skip)
-            .limit(GLOSSARY_PER_PAGE)
-        )
-    else:
-        total = db.glossary.count_documents({})
-        total_pages = math.ceil(total / GLOSSARY_PER_PAGE) or 1
-        page = min(page, total_pages)
-        skip = (page - 1) * GLOSSARY_PER_PAGE
-        terms = list(
-            db.glossary.find()
-            .sort("term", 1)
-            .skip(skip)
-            .limit(GLOSSARY_PER_PAGE)
-        )
-
-    categories = sorted(db.glossary.distinct("category"))
+
+def render_glossary_index(listing, context):
     return render_template(
         "glossary/index.html",
-        terms=terms,
-        total=total,
-        query=q,
-        selected_category=category,
-        categories=categories,
-        page=page,
-        total_pages=total_pages,
+        terms=listing["items"],
+        categories=listing["facets"],
+        **listing_context(listing),
+        **context,
     )
 
 
-@app.route("/glossary/<term_id>")
-def glossary_term(term_id):
-    term = db.glossary.find_one({"_id": ObjectId(term_id)})
-    if not term:
-        return render_template("404.html"), 404
+@app.route("/glossary")
+@cached_page("glossary")
+def glossary_index():
+    return listing_page("glossary", glossary_index_query, render_glossary_index)
+
+
+@app.route("/glossary/suggest")
+def glossary_suggest():
+    """Typeahead suggestions for the glossary search box, as JSON."""
+    q = request.args.get("q", "")
+    limit = min(max(1, request.args.get("limit", DEFAULT_LIMIT, type=int)), MAX_LIMIT)
+    fuzzy = request.args.get("fuzzy", "1") != "0"
+    suggestions = app.config["typeahead"].current().suggest(q, limit, fuzzy)
+    response = make_response(
+        {
+            "query": q,
+            "results": [
+                {"term": term, "match": name, "url": url_for("glossary_term", term_id=term_id)}
+                for term_id, term, name in suggestions
+            ],
+        }
+    )
+    response.cache_control.public = True
+    response.cache_control.max_age = SUGGEST_MAX_AGE
+    return response
+
 
-    # Fetch related terms
-    related = []
-    if term.get("related_terms"):
-        related = list(
-            db.glossary.find({"term": {"$in": term["related_terms"]}}).sort("term", 1)
-        )
+def render_glossary_term(term):
+    return render_template("glossary/term.html", term=term)
 
-    return render_template("glossary/term.html", term=term, related=related)
+
+@app.route("/glossary/<term_id>")
+@cached_page("glossary")
+def glossary_term(term_id):
+    term = public_db.glossary.find_one(
+        {"_id": ObjectId(term_id)}, view("glossary", "detail")
+    )
+    # Related terms are embedded at save time (see glossary.py), so the
+    # document's own timestamps cover everything the page shows.
+    response, validators = detail_validators(term)
+    if response:
+        return response
+    return with_validators(render_glossary_term(term), *validators)
 
 
 # --- Literature Reviews ---
 
-@app.route("/reviews")
-def reviews_index():
+def reviews_index_query():
     q = request.args.get("q", "").strip()
     tag = request.args.get("tag", "").strip()
     sort = request.args.get("sort", "newest").strip()
     page = max(1, request.args.get("page", 1, type=int))
 
-    sort_options = {
-        "newest": ("_id", -1),
-        "year_desc": ("year", -1),
-        "year_asc": ("year", 1),
-        "title": ("title", 1),
-        "author": ("authors", 1),
-    }
-    sort_field, sort_dir = sort_options.get(sort, ("_id", -1))
-
-    if q:
-        pipeline = [
-            {
-                "$search": {
-                    "index": "reviews_search",
-                    "text": {
-                        "query": q,
-                        "path": [
-                            "title",
-                            "authors",
-                            "summary",
-                            "key_findings",
-                            "tags",
-                            "standards_referenced",
-                        ],
-                        "fuzzy": {"maxEdits": 1},
-                    },
-                }
-            },
-            {"$addFields": {"score": {"$meta": "searchScore"}}},
-        ]
-        if tag:
-            pipeline.append({"$match": {"tags": tag}})
-        if sort != "newest":
-            pipeline.append({"$sort": {sort_field: sort_dir}})
-        all_reviews = list(db.reviews.aggregate(pipeline))
-        total = len(all_reviews)
-        total_pages = math.ceil(total / REVIEWS_PER_PAGE) or 1
-        page = min(page, total_pages)
-        skip = (page - 1) * REVIEWS_PER_PAGE
-        reviews = all_reviews[skip : skip + REVIEWS_PER_PAGE]
-    elif tag:
-        total = db.reviews.count_documents({"tags": tag})
-        total_pages = math.ceil(total / REVIEWS_PER_PAGE) or 1
-        page = min(page, total_pages)
-        skip = (page - 1) * REVIEWS_PER_PAGE
-        reviews = list(
-            db.reviews.find({"tags": tag})
-            .sort(sort_field, sort_dir)
-            .skip(skip)
-            .limit(REVIEWS_PER_PAGE)
-        )
-    else:
-        total = db.reviews.count_documents({})
-        total_pages = math.ceil(total / REVIEWS_PER_PAGE) or 1
-        page = min(page, total_pages)
-        skip = (page - 1) * REVIEWS_PER_PAGE
-        reviews = list(
-            db.reviews.find()
-            .sort(sort_field, sort_dir)
-            .skip(skip)
-            .limit(REVIEWS_PER_PAGE)
-        )
-
-    tags = sorted(db.reviews.distinct("tags"))
+    sort_field, sort_dir = REVIEW_SORTS.get(sort, REVIEW_SORTS["newest"])
+    fetch = dict(
+        page=page,
+        per_page=REVIEWS_PER_PAGE,
+        **listing_query("reviews", q, tag),
+        # Search results keep relevance order unless a sort is chosen
+        sort=None if q and sort == "newest" else [(sort_field, sort_dir)],
+        **listing_args(),
+    )
+    return fetch, {"query": q, "selected_tag": tag, "selected_sort": sort}
+
+
+def render_reviews_index(listing, context):
     return render_template(
         "reviews/index.html",
-        reviews=reviews,
-        total=total,
-        query=q,
-        selected_tag=tag,
-        selected_sort=sort,
-        tags=tags,
-        page=page,
-        total_pages=total_pages,
+        reviews=listing["items"],
+        tags=listing["facets"],
+        **listing_context(listing),
+        **context,
     )
 
 
+@app.route("/reviews")
+@cached_page("reviews")
+def reviews_index():
+    return listing_page("reviews", reviews_index_query, render_reviews_index)
+
+
+def render_review(review):
+    return render_template("reviews/review.html", review=review)
+
+
 @app.route("/reviews/<review_id>")
+@cached_page("reviews", VOCABULARY)
 def review_detail(review_id):
-    review = db.reviews.find_one({"_id": ObjectId(review_id)})
-    if not review:
-        return render_template("404.html"), 404
-    return render_template("reviews/review.html", review=review)
+    review = public_db.reviews.find_one(
+        {"_id": ObjectId(review_id)}, view("reviews", "detail")
+    )
+    # Summaries link glossary terms, so the vocabulary is a validator too
+    automaton = app.config["glossary_links"].current()
+    response, validators = detail_validators(review, automaton.digest)
+    if response:
+        return response
+    return with_validators(render_review(review), *validators)
 
 
 # --- Articles ---
 
-@app.route("/articles")
-def articles_index():
+def articles_index_query():
     q = request.args.get("q", "").strip()
     tag = request.args.get("tag", "").strip()
     sort = request.args.get("sort", "newest").strip()
     page = max(1, request.args.get("page", 1, type=int))
 
-    sort_options = {
-        "newest": ("published_date", -1),
-        "oldest": ("published_date", 1),
-        "title": ("title", 1),
-    }
-    sort_field, sort_dir = sort_options.get(sort, ("published_date", -1))
-
-    if q:
-        pipeline = [
-            {
-                "$search": {
-                    "index": "articles_search",
-                    "text": {
-                        "query": q,
-                        "path": ["title", "summary", "content", "tags"],
-                        "fuzzy": {"maxEdits": 1},
-                    },
-                }
-            },
-            {"$addFields": {"score": {"$meta": "searchScore"}}},
-        ]
-        if tag:
-            pipeline.append({"$match": {"tags": tag}})
-        if sort != "newest":
-            pipeline.append({"$sort": {sort_field: sort_dir}})
-        all_articles = list(db.articles.aggregate(pipeline))
-        total = len(all_articles)
-        total_pages = math.ceil(total / ARTICLES_PER_PAGE) or 1
-        page = min(page, total_pages)
-        skip = (page - 1) * ARTICLES_PER_PAGE
-        articles = all_articles[skip : skip + ARTICLES_PER_PAGE]
-    elif tag:
-        total = db.articles.count_documents({"tags": tag})
-        total_pages = math.ceil(total / ARTICLES_PER_PAGE) or 1
-        page = min(page, total_pages)
-        skip = (page - 1) * ARTICLES_PER_PAGE
-        articles = list(
-            db.articles.find({"tags": tag})
-            .sort(sort_field, sort_dir)
-            .skip(skip)
-            .limit(ARTICLES_PER_PAGE)
-        )
-    else:
-        total = db.articles.count_documents({})
-        total_pages = math.ceil(total / ARTICLES_PER_PAGE) or 1
-        page = min(page, total_pages)
-        skip = (page - 1) * ARTICLES_PER_PAGE
-        articles = list(
-            db.articles.find()
-            .sort(sort_field, sort_dir)
-            .skip(skip)
-            .limit(ARTICLES_PER_PAGE)
-        )
-
-    tags = sorted(db.articles.distinct("tags"))
+    sort_field, sort_dir = ARTICLE_SORTS.get(sort, ARTICLE_SORTS["newest"])
+    fetch = dict(
+        page=page,
+        per_page=ARTICLES_PER_PAGE,
+        **listing_query("articles", q, tag),
+        sort=None if q and sort == "newest" else [(sort_field, sort_dir)],
+        **listing_args(),
+    )
+    return fetch, {"query": q, "selected_tag": tag, "selected_sort": sort}
+
+
+def render_articles_index(listing, context):
     return render_template(
         "articles/index.html",
-        articles=articles,
-        total=total,
-        query=q,
-        selected_tag=tag,
-        selected_sort=sort,
-        tags=tags,
-        page=page,
-        total_pages=total_pages,
+        articles=listing["items"],
+        tags=listing["facets"],
+        **listing_context(listing),
+        **context,
+    )
+
+
+@app.route("/articles")
+@cached_page("articles")
+def articles_index():
+    return listing_page("articles", articles_index_query, render_articles_index)
+
+
+def heal_article(article, content, automaton):
+    """Re-render a stale article's HTML; returns the fields to store."""
+    article["content"] = content
+    render_article(article, automaton)
+    return {
+        "content_html": article["content_html"],
+        "content_html_version": article["content_html_version"],
+    }
+
+
+def heal_filter(article):
+    """Match the article only if unchanged since it was read, so HTML healed
+    from a lagging secondary never overwrites a newer save."""
+    return {"_id": article["_id"], "modified": article.get("modified")}
+
+
+def heal_stale_article(article, automaton):
+    """Re-render ``article``'s HTML in place and store it.
+
+    Stored HTML is normally current; documents saved by an older renderer or
+    against an older glossary vocabulary are healed so the next view does no
+    parsing.
+    """
+    source = public_db.articles.find_one({"_id": article["_id"]}, {"content": 1})
+    if source is None:
+        # Deleted since it was read; serve the HTML already loaded
+        return
+    db.articles.update_one(
+        heal_filter(article),
+        {"$set": heal_article(article, source.get("content", ""), automaton)},
     )
 
 
+def render_article_page(article):
+    return render_template("articles/article.html", article=article)
+
+
 @app.route("/articles/<slug>")
+@cached_page("articles", VOCABULARY)
 def article_detail(slug):
-    article = db.articles.find_one({"slug": slug})
-    if not article:
-        return render_template("404.html"), 404
-    return render_template("articles/article.html", article=article)
+    article = public_db.articles.find_one({"slug": slug}, view("articles", "detail"))
+    automaton = app.config["glossary_links"].current()
+    response, validators = detail_validators(article, automaton.digest)
+    if response:
+        return response
+    if is_stale(article, automaton):
+        heal_stale_article(article, automaton)
+    return with_validators(render_article_page(article), *validators)
 
 
 # --- Error handlers ---
@@ -0,0 +1,282 @@
+"""
+ASGI entry point: the public pages' MongoDB reads on pymongo's asyncio client.
+
+    uvicorn asgi:app --workers 4
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+
+A request for a public listing or detail page is first matched to its Flask
+endpoint on the event loop, which runs the page's MongoDB reads on an
+AsyncMongoClient, a listing's content versions and page query concurrently.
+The results ride along in the ASGI scope, and the request then goes through
+the ordinary Flask WSGI cycle on a2wsgi's thread pool (ASGI_THREADS
+threads), where the views below only check validators and render. Waiting on
+MongoDB holds no thread, so a worker keeps many requests in flight; hooks,
+error handling, rendering, compression and metrics run off the event loop
+exactly as under ``gunicorn app:app``, which remains the default.
+
+Pages the response cache already holds, in-process searches (whose index
+lives in the worker threads) and anything else are not read ahead; their
+views fall back to app.py's blocking reads. The views reuse the query,
+validator and render steps of app.py, so both modes produce the same HTML,
+headers, cache entries and validators.
+"""
+
+import asyncio
+import io
+import os
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from bson.objectid import ObjectId
+from flask import request
+from pymongo import AsyncMongoClient
+from werkzeug.exceptions import HTTPException
+
+from app import (
+    app as flask_app,
+    articles_index_query,
+    client_options,
+    detail_validators,
+    glossary_index_query,
+    heal_stale_article,
+    public_read_preference,
+    render_article_page,
+    render_articles_index,
+    render_glossary_index,
+    render_glossary_term,
+    render_review,
+    render_reviews_index,
+    reviews_index_query,
+)
+from autolink import VOCABULARY
+from cache import cache_key, cached_page
+from conditional import not_modified, versions_validators, with_validators, without_validators
+from listing import fetch_page_async
+from projections import view
+from rendering import is_stale
+from versions import get_versions_async
+
+# Threads running Flask requests; each holds a request only while it renders
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", "10"))
+
+# ASGI scope key for a request's prefetched (endpoint, result)
+PREFETCHED = "a11ybob.prefetched"
+
+# prefetched() for a request whose reads are left to the view
+NOT_PREFETCHED = object()
+
+_client = None
+_public_db = None
+
+
+def get_db():
+    """This process's asyncio database on the primary, connected on first use."""
+    global _client
+    if _client is None:
+        _client = AsyncMongoClient(flask_app.config["MONGO_URI"], **client_options())
+    return _client[flask_app.config["MONGO_DB"]]
+
+
+def get_public_db():
+    """get_db() with the public pages' read preference (see app.public_db)."""
+    global _public_db
+    if _public_db is None:
+        _public_db = get_db().with_options(read_preference=public_read_preference())
+    return _public_db
+
+
+# --- Reads on the event loop ---
+
+
+def _load_listing(collection, query):
+    if request.args.get("q", "").strip() and flask_app.config["search"] is not None:
+        # The in-process search index is built and queried on worker threads
+        return None
+    fetch, context = query()
+    return _gather_listing(collection, fetch, context)
+
+
+async def _gather_listing(collection, fetch, context):
+    versions, listing = await asyncio.gather(
+        get_versions_async(get_db(), [collection]),
+        fetch_page_async(get_public_db()[collection], **fetch),
+    )
+    return versions, listing, context
+
+
+def _load_document(collection, query):
+    return get_public_db()[collection].find_one(query, view(collection, "detail"))
+
+
+# Per endpoint: called with the URL values inside a request context, returns
+# a coroutine for the page's reads, or None to leave them to the view
+LOADERS = {
+    "glossary_index": lambda values: _load_listing("glossary", glossary_index_query),
+    "glossary_term": lambda values: _load_document(
+        "glossary", {"_id": ObjectId(values["term_id"])}
+    ),
+    "reviews_index": lambda values: _load_listing("reviews", reviews_index_query),
+    "review_detail": lambda values: _load_document(
+        "reviews", {"_id": ObjectId(values["review_id"])}
+    ),
+    "articles_index": lambda values: _load_listing("articles", articles_index_query),
+    "article_detail": lambda values: _load_document("articles", {"slug": values["slug"]}),
+}
+
+
+def _in_cache():
+    cache = flask_app.config.get("response_cache")
+    return cache is not None and cache_key() in cache
+
+
+async def prefetch(scope):
+    """(endpoint, result) of the reads for the page ``scope`` requests, or
+    None if it has none to run here."""
+    environ = build_environ(scope, io.BytesIO())
+    try:
+        endpoint, values = flask_app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return None
+    load = LOADERS.get(endpoint)
+    if load is None:
+        return None
+    try:
+        with flask_app.request_context(environ):
+            if _in_cache():
+                return None
+            pending = load(values)
+        if pending is None:
+            return None
+        return endpoint, await pending
+    except Exception:
+        # The view repeats the read and reports the error through Flask
+        return None
+
+
+# --- Views ---
+
+
+def prefetched():
+    """This request's prefetched result, or NOT_PREFETCHED."""
+    found = request.environ.get("asgi.scope", {}).get(PREFETCHED)
+    if found is None or found[0] != request.endpoint:
+        return NOT_PREFETCHED
+    return found[1]
+
+
+def listing_page(collection, loaded, render):
+    """app.listing_page() from prefetched (versions, listing, context)."""
+    versions, listing, context = loaded
+    settled = not flask_app.config["versions"].unsettled([collection])
+    if settled:
+        validators = versions_validators(versions)
+        cached = not_modified(*validators)
+        if cached:
+            return cached
+    html = render(listing, context)
+    if not settled:
+        return without_validators(html)
+    return with_validators(html, *validators)
+
+
+def _automaton():
+    return flask_app.config["glossary_links"].current()
+
+
+@cached_page("glossary")
+def glossary_index():
+    loaded = prefetched()
+    if loaded is NOT_PREFETCHED:
+        return SYNC_VIEWS["glossary_index"]()
+    return listing_page("glossary", loaded, render_glossary_index)
+
+
+@cached_page("glossary")
+def glossary_term(term_id):
+    term = prefetched()
+    if term is NOT_PREFETCHED:
+        return SYNC_VIEWS["glossary_term"](term_id)
+    response, validators = detail_validators(term)
+    if response:
+        return response
+    return with_validators(render_glossary_term(term), *validators)
+
+
+@cached_page("reviews")
+def reviews_index():
+    loaded = prefetched()
+    if loaded is NOT_PREFETCHED:
+        return SYNC_VIEWS["reviews_index"]()
+    return listing_page("reviews", loaded, render_reviews_index)
+
+
+@cached_page("reviews", VOCABULARY)
+def review_detail(review_id):
+    review = prefetched()
+    if review is NOT_PREFETCHED:
+        return SYNC_VIEWS["review_detail"](review_id)
+    response, validators = detail_validators(review, _automaton().digest)
+    if response:
+        return response
+    return with_validators(render_review(review), *validators)
+
+
+@cached_page("articles")
+def articles_index():
+    loaded = prefetched()
+    if loaded is NOT_PREFETCHED:
+        return SYNC_VIEWS["articles_index"]()
+    return listing_page("articles", loaded, render_articles_index)
+
+
+@cached_page("articles", VOCABULARY)
+def article_detail(slug):
+    article = prefetched()
+    if article is NOT_PREFETCHED:
+        return SYNC_VIEWS["article_detail"](slug)
+    automaton = _automaton()
+    response, validators = detail_validators(article, automaton.digest)
+    if response:
+        return response
+    if is_stale(article, automaton):
+        heal_stale_article(article, automaton)
+    return with_validators(render_article_page(article), *validators)
+
+
+# Flask endpoints served by the views above in this process
+ASYNC_VIEWS = {
+    "glossary_index": glossary_index,
+    "glossary_term": glossary_term,
+    "reviews_index": reviews_index,
+    "review_detail": review_detail,
+    "articles_index": articles_index,
+    "article_detail": article_detail,
+}
+# app.py's views without their @cached_page, for requests not prefetched
+SYNC_VIEWS = {name: flask_app.view_functions[name].__wrapped__ for name in ASYNC_VIEWS}
+flask_app.view_functions.update(ASYNC_VIEWS)
+
+_wsgi = WSGIMiddleware(flask_app, workers=ASGI_THREADS)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _client is not None:
+                await _client.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+        found = await prefetch(scope)
+        if found is not None:
+            scope = dict(scope, **{PREFETCHED: found})
+    await _wsgi(scope, receive, send)
@@ -0,0 +1,184 @@
+"""
+Fingerprinted, precompressed static assets and compressed HTML responses.
+
+build() copies every file in ``static/`` to ``static/build/`` under a name
+that includes a hash of its content (``css/style.css`` becomes
+``build/css/style.3f2a9c1b04d7.css``), writes gzip and, if the ``brotli``
+package is installed, brotli copies next to each, and records the mapping
+in ``static/build/manifest.json``. Run it at deploy time with
+``seed/build_assets.py``.
+
+init_app() makes ``url_for('static', filename=...)`` resolve to the
+fingerprinted name when the manifest has one, and serves those files with
+the smallest encoding the client accepts and a year-long immutable cache
+lifetime; a changed file gets a new URL. Without a manifest, static files
+are served as before.
+
+HTML and other text responses of at least COMPRESS_MIN_BYTES are compressed
+on the fly when the client accepts it.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUILD_DIR = "build"
+MANIFEST = "manifest.json"
+
+# Precompressed variants, best first: (Content-Encoding, file suffix)
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+# Fingerprinted files never change, so clients may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Responses compressed on the fly
+COMPRESSIBLE_TYPES = {
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "application/json",
+    "application/x-ndjson",
+}
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+
+def manifest_path(static_dir=STATIC_DIR):
+    return os.path.join(static_dir, BUILD_DIR, MANIFEST)
+
+
+def fingerprint(path, digest):
+    """``css/style.css`` -> ``build/css/style.<digest>.css``."""
+    stem, ext = os.path.splitext(path)
+    return f"{BUILD_DIR}/{stem}.{digest}{ext}"
+
+
+def _compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def build(static_dir=STATIC_DIR):
+    """Fingerprint and precompress every static file; returns the manifest."""
+    out_dir = os.path.join(static_dir, BUILD_DIR)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    encodings = [e for e in ENCODINGS if e[0] != "br" or brotli is not None]
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != out_dir)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            path = os.path.relpath(source, static_dir).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            target = fingerprint(path, hashlib.sha256(data).hexdigest()[:12])
+            manifest[path] = target
+            target_file = os.path.join(static_dir, *target.split("/"))
+            os.makedirs(os.path.dirname(target_file), exist_ok=True)
+            with open(target_file, "wb") as f:
+                f.write(data)
+            for encoding, suffix in encodings:
+                compressed = _compress(data, encoding)
+                if len(compressed) < len(data):
+                    with open(target_file + suffix, "wb") as f:
+                        f.write(compressed)
+    with open(manifest_path(static_dir), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return manifest
+
+
+def load_manifest(static_dir=STATIC_DIR):
+    """The build manifest, or an empty one if assets were not built."""
+    try:
+        with open(manifest_path(static_dir)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+# --- Serving ---
+
+
+def _send_fingerprinted(filename):
+    static_dir = current_app.static_folder
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding] and os.path.exists(
+            os.path.join(static_dir, filename + suffix)
+        ):
+            # send_file sets Content-Encoding from the suffix
+            response = send_from_directory(
+                static_dir, filename + suffix, max_age=IMMUTABLE_MAX_AGE
+            )
+            break
+    else:
+        response = send_from_directory(static_dir, filename, max_age=IMMUTABLE_MAX_AGE)
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def _compress_response(response):
+    threshold = current_app.config["COMPRESS_MIN_BYTES"]
+    if (
+        threshold <= 0
+        or response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    if request.accept_encodings["br"] and brotli is not None:
+        encoding = "br"
+    elif request.accept_encodings["gzip"]:
+        encoding = "gzip"
+    else:
+        return response
+    data = response.get_data()
+    if len(data) < threshold:
+        return response
+    if encoding == "br":
+        # Quality 5 is close to gzip's speed with smaller output
+        response.set_data(brotli.compress(data, quality=5))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers["Content-Encoding"] = encoding
+    # The compressed bytes differ, so a strong validator would be wrong
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """Serve fingerprinted assets and compress text responses for ``app``."""
+    manifest = load_manifest(app.static_folder)
+    fingerprinted = set(manifest.values())
+    send_static = app.view_functions["static"]
+
+    @app.url_defaults
+    def fingerprinted_static(endpoint, values):
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = manifest[values["filename"]]
+
+    def static(filename):
+        if filename in fingerprinted:
+            return _send_fingerprinted(filename)
+        return send_static(filename=filename)
+
+    app.view_functions["static"] = static
+    app.after_request(_compress_response)
@@ -0,0 +1,242 @@
+"""
+Automatic links from article and review text to glossary terms.
+
+Every glossary ``term`` and ``aka`` name is compiled into one Aho-Corasick
+automaton. link_html() walks rendered HTML once, leaves code, preformatted
+text and existing links alone, and wraps each whole-word, case-insensitive
+mention in a link to the term's page, preferring the leftmost and then the
+longest match. Quote characters are compared folded, so "Fitts's law" also
+matches text escaped to ``Fitts&#39;s`` or curled to ``Fitts&rsquo;s``. The
+cost is linear in the length of the text, however large the vocabulary (see
+``seed/bench_autolink.py``).
+
+Links point at LINK_PREFIX plus the term id unless another prefix is given
+(GLOSSARY_LINK_PREFIX in config.py); the prefix is part of the digest, so
+stored article HTML linked under another prefix is stale.
+
+The automaton changes only when the vocabulary does: admin edits that add,
+remove or rename a term or alias bump the VOCABULARY content version, and
+GlossaryLinker rebuilds when it sees a new one.
+"""
+
+import hashlib
+import html
+import re
+import threading
+from collections import deque
+
+# Content version bumped when glossary names change (not on every edit)
+VOCABULARY = "glossary_vocabulary"
+
+# Where glossary term pages are served, by default
+LINK_PREFIX = "/glossary/"
+
+# Elements whose text is never linked
+SKIP_ELEMENTS = {"a", "code", "pre", "script", "style"}
+
+_MARKUP = re.compile(r"(<!--.*?-->|<[^>]*>)", re.S)
+_TAG_NAME = re.compile(r"</?\s*([a-zA-Z0-9]+)")
+
+# Quote characters and the character references escape() and Markdown's
+# smarty extension write for them
+_QUOTES = re.compile(
+    r"[\u2018\u2019]|&(?:#39|#x27|apos|lsquo|rsquo|#8216|#8217|#34|#x22|quot);", re.I
+)
+_QUOTE_FOLDS = {"&#34;": '"', "&#x22;": '"', "&quot;": '"'}
+
+
+def _is_word(ch):
+    return ch.isalnum() or ch == "_"
+
+
+def _starts_word(text, start):
+    # Also rejects the name of a character reference such as &amp; or &#38;
+    before = text[start - 1]
+    if _is_word(before) or before == "&":
+        return False
+    return not (before == "#" and start > 1 and text[start - 2] == "&")
+
+
+def _fold_quotes(text):
+    """``text`` with quotes folded to plain ' and ", and for each character of
+    the result (and its end) the offset in ``text``; None if nothing changed."""
+    if "&" not in text and "\u2018" not in text and "\u2019" not in text:
+        return text, None
+    pieces = []
+    offsets = []
+    last = 0
+    for match in _QUOTES.finditer(text):
+        start = match.start()
+        pieces.append(text[last:start])
+        pieces.append(_QUOTE_FOLDS.get(match.group(0).lower(), "'"))
+        offsets.extend(range(last, start + 1))
+        last = match.end()
+    if not offsets:
+        return text, None
+    pieces.append(text[last:])
+    offsets.extend(range(last, len(text) + 1))
+    return "".join(pieces), offsets
+
+
+def _lower(text):
+    # Keep offsets aligned with the original for the rare characters whose
+    # lowercase form is longer.
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class Automaton:
+    """Aho-Corasick matcher over lowercase patterns, each with a target id."""
+
+    def __init__(self, patterns, digest="", prefix=LINK_PREFIX):
+        self.digest = digest
+        self.prefix = prefix
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [None]
+        # Nearest proper suffix state that ends a pattern
+        self._suffix = [0]
+        for pattern, target in patterns.items():
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(None)
+                    self._suffix.append(0)
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state] = (len(pattern), target)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = fail
+                self._suffix[nxt] = fail if self._out[fail] else self._suffix[fail]
+
+    def __len__(self):
+        return sum(1 for out in self._out if out)
+
+    def find(self, text):
+        """Non-overlapping whole-word matches as (start, end, target) tuples."""
+        goto, fail, out, suffix = self._goto, self._fail, self._out, self._suffix
+        folded, offsets = _fold_quotes(text)
+        lowered = _lower(folded)
+        n = len(lowered)
+        found = []
+        state = 0
+        for i, ch in enumerate(lowered):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            end = i + 1
+            if end < n and _is_word(lowered[end]):
+                continue
+            node = state if out[state] else suffix[state]
+            while node:
+                length, target = out[node]
+                start = end - length
+                if start == 0 or _starts_word(lowered, start):
+                    # Leftmost wins; a longer match covering earlier ones
+                    # from the same or an earlier start replaces them.
+                    keep = len(found)
+                    while keep and found[keep - 1][0] >= start:
+                        keep -= 1
+                    if not keep or found[keep - 1][1] <= start:
+                        del found[keep:]
+                        found.append((start, end, target))
+                        break
+                    # It overlaps an earlier match; a shorter one may not
+                node = suffix[node]
+        if offsets:
+            return [(offsets[start], offsets[end], target) for start, end, target in found]
+        return found
+
+    def link_text(self, text):
+        """Wrap matches in an HTML-escaped text fragment with glossary links."""
+        matches = self.find(text)
+        if not matches:
+            return text
+        parts = []
+        last = 0
+        prefix = html.escape(self.prefix)
+        for start, end, target in matches:
+            parts.append(text[last:start])
+            parts.append(
+                f'<a href="{prefix}{target}" class="glossary-link">{text[start:end]}</a>'
+            )
+            last = end
+        parts.append(text[last:])
+        return "".join(parts)
+
+    def link_html(self, markup):
+        """Link glossary mentions in the text of an HTML fragment."""
+        if not len(self._goto[0]):
+            return markup
+        parts = []
+        skip = 0
+        for i, piece in enumerate(_MARKUP.split(markup)):
+            if i % 2:
+                parts.append(piece)
+                tag = _TAG_NAME.match(piece)
+                if tag and tag.group(1).lower() in SKIP_ELEMENTS and not piece.endswith("/>"):
+                    skip = max(0, skip - 1) if piece.startswith("</") else skip + 1
+            elif skip or not piece:
+                parts.append(piece)
+            else:
+                parts.append(self.link_text(piece))
+        return "".join(parts)
+
+
+def vocabulary(doc):
+    """The names a glossary document contributes, for change detection."""
+    if not doc:
+        return None
+    return (doc.get("term"), tuple(doc.get("aka") or ()))
+
+
+def build(db, prefix=LINK_PREFIX):
+    """Compile the current glossary vocabulary into an Automaton linking
+    under ``prefix``."""
+    patterns = {}
+    for doc in db.glossary.find({}, {"term": 1, "aka": 1}).sort("term", 1):
+        for name in [doc.get("term")] + list(doc.get("aka") or []):
+            if not name or not name.strip():
+                continue
+            # Matched against HTML text, so escape like the renderer does
+            pattern = _lower(_fold_quotes(html.escape(name.strip(), quote=False))[0])
+            patterns.setdefault(pattern, str(doc["_id"]))
+    digest = hashlib.sha1(
+        "\n".join([prefix] + [f"{p}\0{t}" for p, t in sorted(patterns.items())]).encode()
+    ).hexdigest()[:12]
+    return Automaton(patterns, digest, prefix)
+
+
+class GlossaryLinker:
+    """This process's automaton, rebuilt when the VOCABULARY version moves."""
+
+    def __init__(self, db, tracker, prefix=LINK_PREFIX):
+        self.db = db
+        self.tracker = tracker
+        self.prefix = prefix
+        self._automaton = None
+        self._built_version = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        version = self.tracker.current().get(VOCABULARY, 0)
+        with self._lock:
+            if self._automaton is None or self._built_version != version:
+                self._automaton = build(self.db, self.prefix)
+                self._built_version = version
+            return self._automaton
@@ -0,0 +1,239 @@
+"""
+Streaming bulk import and export of glossary terms, reviews and articles.
+
+Records are NDJSON (one JSON object per line) or CSV with a header row. In
+CSV, list fields hold one item per line of a quoted cell, as in the admin
+form textareas. Imports validate each record with the admin form rules and
+write unordered bulk upserts in batches, keyed on KEY_FIELDS, so re-importing
+a file updates records instead of duplicating them; a key repeated within a
+file is written after its earlier record, which it then updates. Articles are
+rendered to HTML on the way in (see rendering.py). Exports walk a cursor
+and yield one chunk per record, so memory use does not grow with the
+collection.
+
+See ``seed/import_export.py`` for the command line and /admin/import for uploads.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from rendering import render_article
+
+FORMATS = ("ndjson", "csv")
+
+# The field that identifies a record across imports
+KEY_FIELDS = {
+    "glossary": "term",
+    "reviews": "doi",
+    "articles": "slug",
+}
+
+# Fields written by export and accepted by import, in column order
+FIELDS = {
+    "glossary": ["term", "aka", "definition", "category", "related_terms", "sources"],
+    "reviews": [
+        "title",
+        "authors",
+        "year",
+        "publication",
+        "doi",
+        "tags",
+        "standards_referenced",
+        "summary",
+        "key_findings",
+        "relevance",
+        "rating",
+    ],
+    "articles": ["title", "slug", "author", "published_date", "tags", "summary", "content"],
+}
+
+BATCH_SIZE = 1000
+
+# Stop collecting error details after this many; the count keeps going
+MAX_ERRORS = 1000
+
+
+def format_for(filename, default="ndjson"):
+    """Guess the record format from a file name."""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    return default
+
+
+def _form_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "\n".join(_form_value(v) for v in value)
+    return str(value)
+
+
+def as_form(record):
+    """Present a record the way the admin forms submit it."""
+    return {key: _form_value(value) for key, value in record.items()}
+
+
+# --- Reading ---
+
+
+def read_records(stream, fmt):
+    """Yield (line number, record dict or error message) from a text stream.
+
+    Raises ValueError if the stream cannot be decoded or parsed as a whole.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        try:
+            for row in reader:
+                yield reader.line_num, row
+        except csv.Error as e:
+            raise ValueError(f"line {reader.line_num}: {e}") from e
+        return
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, "Each line must be a JSON object."
+            continue
+        yield line_number, record
+
+
+# --- Importing ---
+
+
+class ImportReport:
+    """Counts and per-record errors for one import."""
+
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line_number, key, messages):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"line": line_number, "key": key, "messages": messages})
+
+    @property
+    def imported(self):
+        return self.inserted + self.updated
+
+    def summary(self):
+        return (
+            f"{self.received} record(s) read: {self.inserted} added, "
+            f"{self.updated} updated, {self.failed} rejected."
+        )
+
+
+def _flush(collection, batch, report):
+    if not batch:
+        return
+    ops = [op for _, _, op in batch]
+    try:
+        result = collection.bulk_write(ops, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for write_error in details.get("writeErrors", []):
+            line_number, key, _ = batch[write_error["index"]]
+            report.error(line_number, key, [write_error.get("errmsg", "Write failed.")])
+    report.inserted += details.get("nUpserted", 0)
+    report.updated += details.get("nMatched", 0)
+
+
+def import_records(db, collection, records, validate, automaton=None, batch_size=BATCH_SIZE):
+    """Validate and upsert ``records`` from read_records() into ``collection``.
+
+    ``validate`` is the admin form validator for the collection; it receives
+    each record as form data and returns (document, errors). Articles are
+    rendered with the glossary ``automaton``, if given. Returns an
+    ImportReport.
+    """
+    key_field = KEY_FIELDS[collection]
+    target = db[collection]
+    report = ImportReport()
+    batch = []
+    keys = set()
+    for line_number, record in records:
+        report.received += 1
+        if isinstance(record, str):
+            report.error(line_number, None, [record])
+            continue
+        doc, errors = validate(as_form(record))
+        key = doc.get(key_field)
+        if not key and not errors:
+            errors = [f"{key_field} is required to import a record."]
+        if errors:
+            report.error(line_number, key, errors)
+            continue
+        if collection == "articles":
+            render_article(doc, automaton)
+        now = datetime.now(timezone.utc)
+        doc["updated"] = now.strftime("%Y-%m-%d")
+        doc["modified"] = now
+        # Unordered upserts of one key in a batch could both insert
+        if key in keys:
+            _flush(target, batch, report)
+            batch = []
+            keys = set()
+        keys.add(key)
+        batch.append(
+            (
+                line_number,
+                key,
+                UpdateOne(
+                    {key_field: key},
+                    {"$set": doc, "$setOnInsert": {"created": doc["updated"]}},
+                    upsert=True,
+                ),
+            )
+        )
+        if len(batch) >= batch_size:
+            _flush(target, batch, report)
+            batch = []
+            keys = set()
+    _flush(target, batch, report)
+    return report
+
+
+# --- Exporting ---
+
+
+def export_chunks(db, collection, fmt):
+    """Yield the collection as NDJSON or CSV text, one record per chunk."""
+    fields = FIELDS[collection]
+    key_field = KEY_FIELDS[collection]
+    # The key field is indexed in every collection, so this sort streams
+    cursor = db[collection].find(
+        {}, dict.fromkeys(fields, 1), batch_size=BATCH_SIZE
+    ).sort(key_field, 1)
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for doc in cursor:
+            writer.writerow([_form_value(doc.get(field)) for field in fields])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+        return
+    for doc in cursor:
+        record = {field: doc[field] for field in fields if field in doc}
+        yield json.dumps(record, ensure_ascii=False) + "\n"
@@ -0,0 +1,134 @@
+"""
+Rendered-page cache for the public routes.
+
+Views decorated with @cached_page(collections...) are served from a per-process
+LRU cache bounded by total body size. Entries are keyed on the path plus the
+normalized query arguments and remember the content version of each
+collection they were rendered from; an entry is discarded as soon as the
+VersionTracker reports a newer version, so an admin write in any worker
+invalidates stale pages in every worker. Admin sessions bypass the cache.
+"""
+
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from werkzeug.wrappers import Response
+
+# Query arguments that change what a public page renders
+CACHE_ARGS = ("q", "category", "tag", "sort", "page", "after", "before")
+
+# Response headers replayed from a cache entry
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+
+
+def cache_key():
+    args = []
+    for name in CACHE_ARGS:
+        value = request.args.get(name, "").strip()
+        if name == "page" and value in ("", "1"):
+            continue
+        if value:
+            args.append((name, value))
+    return (request.path, tuple(args))
+
+
+class _Entry:
+    __slots__ = ("versions", "status", "headers", "body")
+
+    def __init__(self, versions, response):
+        self.versions = versions
+        self.status = response.status_code
+        self.headers = [(k, v) for k, v in response.headers if k in CACHED_HEADERS]
+        self.body = response.get_data()
+
+    def response(self):
+        return Response(self.body, status=self.status, headers=self.headers)
+
+
+class ResponseCache:
+    """LRU cache of rendered responses, bounded by total body bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.versions != versions:
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def __contains__(self, key):
+        # Presence only; get() also checks the entry's versions
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, versions, response):
+        entry = _Entry(versions, response)
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            self._size += len(entry.body)
+            while self._size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry.body)
+
+
+def _lookup(collections):
+    """(cache, key, versions, cached response) for this request; the cache is
+    None when it must be bypassed."""
+    cache = current_app.config.get("response_cache")
+    if cache is None or session.get("admin") or session.get("_flashes"):
+        return None, None, None, None
+
+    tracker = current_app.config["versions"]
+    current = tracker.current()
+    if tracker.unsettled(collections):
+        # Pages read from secondaries may not have the change yet
+        return None, None, None, None
+    versions = {name: current.get(name, 0) for name in collections}
+    key = cache_key()
+    entry = cache.get(key, versions)
+    if entry is not None:
+        return cache, key, versions, entry.response().make_conditional(request)
+    return cache, key, versions, None
+
+
+def _store(cache, key, versions, rv):
+    response = make_response(rv)
+    if response.status_code == 200:
+        cache.put(key, versions, response)
+    return response
+
+
+def cached_page(*collections):
+    """Cache a public view; ``collections`` are the ones its output reads."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache, key, versions, cached = _lookup(collections)
+            if cache is None:
+                return view(*args, **kwargs)
+            if cached is not None:
+                return cached
+            return _store(cache, key, versions, view(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
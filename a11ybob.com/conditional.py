@@ -0,0 +1,115 @@
+"""
+Conditional GET support for the public pages.
+
+Pages get an ETag built from what they were rendered from (a document's id,
+``updated`` and ``modified`` stamps, or the content versions of the
+collections a listing reads) plus TEMPLATE_VERSION, and a Last-Modified date.
+TEMPLATE_VERSION also covers the static asset manifest, since pages link to
+fingerprinted asset URLs.
+Routes check not_modified() before querying further or rendering, and answer
+304 when the client's copy is still current.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timezone
+
+from flask import make_response, request, session
+
+from rendering import RENDERER_VERSION
+from versions import get_versions
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+ASSET_MANIFEST = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "static", "build", "manifest.json"
+)
+
+
+def _template_digest():
+    digest = hashlib.sha1(RENDERER_VERSION.encode())
+    for root, dirs, files in os.walk(TEMPLATE_DIR):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, TEMPLATE_DIR).encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    if os.path.exists(ASSET_MANIFEST):
+        with open(ASSET_MANIFEST, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+# Changes whenever a template, the Markdown renderer or a static asset changes
+TEMPLATE_VERSION = _template_digest()
+
+
+def _aware(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def _etag(parts):
+    # Admins see extra navigation, so their pages are a separate variant
+    parts = list(parts) + [TEMPLATE_VERSION, "admin" if session.get("admin") else ""]
+    return hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:32]
+
+
+def document_validators(doc, *extra):
+    """ETag and Last-Modified for a page rendered from one document."""
+    last_modified = doc.get("modified")
+    if last_modified is None and doc.get("updated"):
+        try:
+            last_modified = datetime.strptime(doc["updated"], "%Y-%m-%d")
+        except ValueError:
+            pass
+    parts = [doc["_id"], doc.get("updated", ""), doc.get("modified", "")]
+    return _etag(parts + list(extra)), _aware(last_modified)
+
+
+def collection_validators(db, *collections):
+    """ETag and Last-Modified for a page rendered from whole collections."""
+    return versions_validators(get_versions(db, collections))
+
+
+def versions_validators(versions):
+    """collection_validators() from already fetched get_versions() records."""
+    parts = [f"{name}:{v['version']}" for name, v in sorted(versions.items())]
+    dates = [v["updated_at"] for v in versions.values() if v["updated_at"]]
+    return _etag(parts), (_aware(max(dates)) if dates else None)
+
+
+def not_modified(etag, last_modified):
+    """A 304 response if the client's cached copy is current, else None."""
+    if session.get("_flashes"):
+        # A pending flash message has to be rendered into the page
+        return None
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        fresh = last_modified <= request.if_modified_since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return with_validators(make_response("", 304), etag, last_modified)
+
+
+def with_validators(response, etag, last_modified):
+    """Attach validators to a response; caches must revalidate before reuse."""
+    response = make_response(response)
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def without_validators(response):
+    """A response that clients must not reuse without fetching it again."""
+    response = make_response(response)
+    response.cache_control.no_cache = True
+    return response
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,4 +9,73 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-key-change-in-production")
     MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
     MONGO_DB = os.environ.get("MONGO_DB", "a11y_paradise")
+
+    # Connection pool per server: size bounds, how long a request may wait
+    # for a free connection (0 waits until the socket timeout) and how long
+    # idle connections are kept (0 keeps them). gunicorn.conf.py defaults
+    # the size to twice each worker's threads
+    MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0"))
+    MONGO_MAX_IDLE_TIME_MS = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "0"))
+    # Wire compression, in order of preference: any of zstd, snappy, zlib
+    # (zstd and snappy need the zstandard and python-snappy packages)
+    MONGO_COMPRESSORS = os.environ.get("MONGO_COMPRESSORS", "")
+
+    # Read preference for the public pages, and how far behind the primary a
+    # secondary may be to serve them (at least 90). Admin pages and all
+    # writes always use the primary. Anything but "primary" is a trade: it
+    # moves read load to secondaries, but for the staleness bound plus
+    # CONTENT_VERSION_CHECK_SECONDS after every admin write (about 91s by
+    # default) the changed collections' pages skip the response cache and
+    # are sent without validators, since a lagging secondary could serve
+    # older content than they would claim. Opt in per environment.
+    MONGO_PUBLIC_READ_PREFERENCE = os.environ.get("MONGO_PUBLIC_READ_PREFERENCE", "primary")
+    MONGO_MAX_STALENESS_SECONDS = int(os.environ.get("MONGO_MAX_STALENESS_SECONDS", "90"))
     ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "")
+    # Cursor (after/before) listing pages skip the total count unless enabled
+    CURSOR_PAGE_TOTALS = os.environ.get("CURSOR_PAGE_TOTALS", "").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    # Full-text search: "atlas" ($search) or "memory" (in-process index)
+    SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "atlas")
+
+    # Rendered-page cache size per worker (0 disables it; gunicorn.conf.py
+    # splits 64 MB between the workers by default) and how often each
+    # worker re-reads content versions to notice writes made elsewhere
+    RESPONSE_CACHE_MAX_BYTES = int(
+        os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+    )
+    CONTENT_VERSION_CHECK_SECONDS = float(
+        os.environ.get("CONTENT_VERSION_CHECK_SECONDS", "1")
+    )
+
+    # Requests taking at least this long are logged with their MongoDB
+    # command shapes (0 disables the log)
+    SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "500"))
+
+    # Per-process metric snapshots merged by /metrics, how often each worker
+    # writes its own, and the bearer token scrapers send (without one, only
+    # a logged-in admin can read /metrics)
+    METRICS_DIR = os.environ.get(
+        "METRICS_DIR", os.path.join(tempfile.gettempdir(), "a11y-paradise-metrics")
+    )
+    METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", "1"))
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+    # Compiled templates, kept across worker starts and deploys and filled
+    # ahead of time by seed/compile_templates.py (empty disables the cache)
+    JINJA_CACHE_DIR = os.environ.get(
+        "JINJA_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".jinja_cache"),
+    )
+
+    # Where glossary term links in article and review text point; stored
+    # article HTML is re-rendered when this changes
+    GLOSSARY_LINK_PREFIX = os.environ.get("GLOSSARY_LINK_PREFIX", "/glossary/")
+
+    # HTML and other text responses at least this large are compressed
+    # when the client accepts it (0 disables)
+    COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
@@ -0,0 +1,76 @@
+"""
+A MongoDB database handle that is safe to create before forking.
+
+A MongoClient starts monitoring threads and opens sockets, neither of which
+survive fork(), so a client made in a gunicorn master that preloads the app
+cannot be shared with its workers. LazyDatabase stands in for the pymongo
+Database: attribute and item access go to a real one, created on first use
+in each process, so every worker connects only after it has been forked.
+with_options() gives a lazy handle with another read preference on the same
+client and connection pools.
+"""
+
+import abc
+import os
+import threading
+
+from pymongo import MongoClient
+
+
+class _Lazy(abc.ABC):
+    def __init__(self, name):
+        self.name = name
+        self._database = None
+        self._pid = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._forked)
+
+    def _forked(self):
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _connect(self):
+        """A new pymongo Database for this process."""
+
+    def get(self):
+        """This process's pymongo Database."""
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._database = self._connect()
+                    self._pid = pid
+        return self._database
+
+    def with_options(self, **options):
+        """A lazy Database.with_options() of this handle."""
+        return _LazyView(self, options)
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def __getitem__(self, name):
+        return self.get()[name]
+
+
+class LazyDatabase(_Lazy):
+    """A pymongo Database connected on first use in each process."""
+
+    def __init__(self, uri, name, options):
+        super().__init__(name)
+        self.uri = uri
+        # Called for fresh MongoClient keyword arguments in each process
+        self.options = options
+
+    def _connect(self):
+        return MongoClient(self.uri, **self.options())[self.name]
+
+
+class _LazyView(_Lazy):
+    def __init__(self, base, options):
+        super().__init__(base.name)
+        self.base = base
+        self.options = options
+
+    def _connect(self):
+        return self.base.get().with_options(**self.options)
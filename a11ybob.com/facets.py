@@ -0,0 +1,109 @@
+"""
+Materialized facet counts for the listing filter dropdowns.
+
+The ``facets`` collection holds one document per collection/field/value with
+the number of documents carrying that value:
+
+    {"collection": "reviews", "field": "tags", "value": "wcag", "count": 4}
+
+Admin writes keep it current with apply_change(); rebuild() recomputes it from
+scratch (see ``seed/rebuild_facets.py``). Listing pages read it through
+listing.fetch_page() with one indexed lookup.
+"""
+
+from collections import Counter
+
+from pymongo import DeleteMany, UpdateOne
+
+FACET_FIELDS = {
+    "glossary": "category",
+    "reviews": "tags",
+    "articles": "tags",
+}
+
+
+def _values(doc, field):
+    if not doc:
+        return set()
+    value = doc.get(field)
+    if value is None:
+        return set()
+    return set(value) if isinstance(value, list) else {value}
+
+
+def _key(collection, field, value):
+    return {"collection": collection, "field": field, "value": value}
+
+
+def apply_change(db, collection, old, new):
+    """Adjust counts for a create (old is None), update or delete (new is None)."""
+    field = FACET_FIELDS.get(collection)
+    if not field:
+        return
+    delta = Counter(_values(new, field))
+    delta.subtract(_values(old, field))
+    ops = [
+        UpdateOne(_key(collection, field, value), {"$inc": {"count": n}}, upsert=True)
+        for value, n in delta.items()
+        if n
+    ]
+    if not ops:
+        return
+    ops.append(DeleteMany({"collection": collection, "field": field, "count": {"$lte": 0}}))
+    db.facets.bulk_write(ops, ordered=True)
+
+
+def rebuild(db, collection):
+    """Recompute every facet count for ``collection`` from its documents."""
+    field = FACET_FIELDS[collection]
+    counts = {
+        row["_id"]: row["count"]
+        for row in db[collection].aggregate(
+            [
+                {"$unwind": f"${field}"},
+                # Count each document once per value, as apply_change() does
+                {"$group": {"_id": {"doc": "$_id", "value": f"${field}"}}},
+                {"$group": {"_id": "$_id.value", "count": {"$sum": 1}}},
+            ]
+        )
+        if row["_id"] is not None
+    }
+    ops = [
+        UpdateOne(_key(collection, field, value), {"$set": {"count": n}}, upsert=True)
+        for value, n in counts.items()
+    ]
+    ops.append(
+        DeleteMany(
+            {
+                "collection": collection,
+                "field": field,
+                "value": {"$nin": list(counts)},
+            }
+        )
+    )
+    db.facets.bulk_write(ops, ordered=True)
+    return len(counts)
+
+
+def facet_pipeline(collection, output_key):
+    """Pipeline over ``facets`` returning one document with the sorted values.
+
+    Meant for $unionWith; the output document has ``output_key`` set to a list
+    of {"value", "count"} entries.
+    """
+    return [
+        {
+            "$match": {
+                "collection": collection,
+                "field": FACET_FIELDS[collection],
+                "count": {"$gt": 0},
+            }
+        },
+        {"$sort": {"value": 1}},
+        {
+            "$group": {
+                "_id": None,
+                output_key: {"$push": {"value": "$value", "count": "$count"}},
+            }
+        },
+    ]
@@ -0,0 +1,134 @@
+"""
+Cross-references between glossary terms.
+
+Editors list related terms by name in ``related_terms``. When a term is saved
+those names are resolved to ``related``, a list of {"_id", "term"} entries in
+name order, so the term page renders its related terms from the document
+itself. Renames and deletions are pushed to every referencing term with
+cascade(); names that match no term are reported by dangling_references().
+"""
+
+from pymongo import UpdateMany, UpdateOne
+
+
+def resolve(db, names):
+    """Resolve related-term names to sorted {"_id", "term"} entries."""
+    if not names:
+        return []
+    found = {
+        doc["term"]: doc["_id"]
+        for doc in db.glossary.find({"term": {"$in": names}}, {"term": 1})
+    }
+    return sorted(
+        ({"_id": found[name], "term": name} for name in dict.fromkeys(names) if name in found),
+        key=lambda entry: entry["term"],
+    )
+
+
+def _keep_sorted():
+    return {"$push": {"related": {"$each": [], "$sort": {"term": 1}}}}
+
+
+def cascade(db, old, new):
+    """Update the terms that refer to a created, renamed or deleted term.
+
+    ``old`` is None for a create and ``new`` is None for a delete. All changes
+    go out in one bulk write; referencing terms get a fresh ``modified`` time
+    so their validators change with their content.
+    """
+    ops = []
+    if new is None:
+        term_id = old["_id"]
+        ops.append(
+            UpdateMany(
+                {"related._id": term_id},
+                {"$pull": {"related": {"_id": term_id}}, "$currentDate": {"modified": True}},
+            )
+        )
+    else:
+        term_id, name = new["_id"], new["term"]
+        if old is not None and old["term"] != name:
+            ops += [
+                UpdateMany(
+                    {"related_terms": old["term"]},
+                    {"$set": {"related_terms.$[name]": name}},
+                    array_filters=[{"name": old["term"]}],
+                ),
+                UpdateMany(
+                    {"related._id": term_id},
+                    {"$set": {"related.$[ref].term": name}, "$currentDate": {"modified": True}},
+                    array_filters=[{"ref._id": term_id}],
+                ),
+                UpdateMany({"related._id": term_id}, _keep_sorted()),
+            ]
+        if old is None or old["term"] != name:
+            # Terms that named this one before it existed (or under this name)
+            ops.append(
+                UpdateMany(
+                    {"related_terms": name, "related._id": {"$ne": term_id}},
+                    {
+                        "$push": {
+                            "related": {
+                                "$each": [{"_id": term_id, "term": name}],
+                                "$sort": {"term": 1},
+                            }
+                        },
+                        "$currentDate": {"modified": True},
+                    },
+                )
+            )
+    if ops:
+        db.glossary.bulk_write(ops, ordered=True)
+
+
+def relink_all(db):
+    """Recompute ``related`` for every term; returns the number changed.
+
+    Changed terms get a fresh ``modified`` time, as in cascade(); callers
+    bump the glossary content version when any changed.
+    """
+    terms = list(db.glossary.find({}, {"term": 1, "related_terms": 1, "related": 1}))
+    ids = {doc["term"]: doc["_id"] for doc in terms}
+    ops = []
+    for doc in terms:
+        names = dict.fromkeys(doc.get("related_terms") or [])
+        related = sorted(
+            ({"_id": ids[name], "term": name} for name in names if name in ids),
+            key=lambda entry: entry["term"],
+        )
+        if related != doc.get("related"):
+            ops.append(
+                UpdateOne(
+                    {"_id": doc["_id"]},
+                    {"$set": {"related": related}, "$currentDate": {"modified": True}},
+                )
+            )
+    if ops:
+        db.glossary.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def dangling_references(db):
+    """Terms whose related-term names do not match any glossary term.
+
+    Returns a list of {"_id", "term", "missing"} documents sorted by term.
+    """
+    return list(
+        db.glossary.aggregate(
+            [
+                {
+                    "$project": {
+                        "term": 1,
+                        "missing": {
+                            "$setDifference": [
+                                {"$ifNull": ["$related_terms", []]},
+                                {"$ifNull": ["$related.term", []]},
+                            ]
+                        },
+                    }
+                },
+                {"$match": {"missing.0": {"$exists": True}}},
+                {"$sort": {"term": 1}},
+            ]
+        )
+    )
@@ -0,0 +1,131 @@
+"""
+Production gunicorn settings.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+
+Workers default to one per CPU of the container's cgroup quota (or the CPUs
+this process may run on), capped at MAX_WORKERS, and 2 when neither can be
+read; set WEB_CONCURRENCY and GUNICORN_THREADS to override. Every worker has
+its own MongoDB pool and response cache, so unless they are set explicitly,
+each worker's pool is sized to its threads and the response cache budget is
+split between the workers. With GUNICORN_PRELOAD (on
+by default) the master imports the app and compiles every template once,
+then freezes those objects out of the garbage collector so forked workers
+keep sharing the pages copy-on-write. Without preloading, each worker loads
+templates from the bytecode cache filled at build time by
+seed/compile_templates.py instead of compiling them. The MongoDB client is created lazily in
+each worker after the fork (see database.py).
+
+Workers are recycled after a few thousand requests, with jitter so they do
+not all restart at once, and get a grace period to finish in-flight requests
+on restarts and deploys.
+"""
+
+import gc
+import math
+import os
+import shutil
+
+DEFAULT_WORKERS = 2
+MAX_WORKERS = 8
+
+# Response cache memory shared out between the workers
+CACHE_BUDGET_BYTES = 64 * 1024 * 1024
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().split()
+    except OSError:
+        return None
+
+
+def _quota():
+    """CPUs allowed by the cgroup (v2, then v1) CPU quota, or None."""
+    fields = _read("/sys/fs/cgroup/cpu.max")
+    if fields and fields[0] != "max":
+        quota, period = int(fields[0]), int(fields[1])
+    else:
+        quota = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+        period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if not quota or not period or int(quota[0]) <= 0:
+            return None
+        quota, period = int(quota[0]), int(period[0])
+    return max(1, math.ceil(quota / period))
+
+
+def _cpus():
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count()
+    quota = _quota()
+    if quota is None:
+        return cpus
+    return min(quota, cpus) if cpus else quota
+
+
+def _workers():
+    cpus = _cpus()
+    if not cpus:
+        return DEFAULT_WORKERS
+    return max(1, min(cpus, MAX_WORKERS))
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Threads overlap MongoDB round trips; processes use more than one CPU
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY") or _workers())
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+# Read by config.py when the app is loaded; a thread holds one connection at
+# a time, and the cache limit applies per worker
+os.environ.setdefault("MONGO_MAX_POOL_SIZE", str(threads * 2))
+os.environ.setdefault("RESPONSE_CACHE_MAX_BYTES", str(CACHE_BUDGET_BYTES // workers))
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1").lower() in ("1", "true", "yes")
+
+# Recycle workers to bound slow memory growth
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = max_requests // 10
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+
+
+def on_starting(server):
+    # Metric snapshots from the previous run would be added to this one's
+    from config import Config
+
+    shutil.rmtree(Config.METRICS_DIR, ignore_errors=True)
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from app import compile_templates
+
+    compile_templates()
+    # Everything loaded so far lives as long as the workers do; keeping it
+    # out of collections stops them touching, and so copying, shared pages
+    gc.freeze()
+
+
+def worker_exit(server, worker):
+    from app import app
+
+    app.extensions["metrics"].flush(force=True)
+
+
+def child_exit(server, worker):
+    # Runs in the master once the worker has gone, even if it was killed
+    import metrics
+    from config import Config
+
+    metrics.retire(Config.METRICS_DIR, worker.pid)
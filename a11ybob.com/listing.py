@@ -0,0 +1,440 @@
+"""
+Shared listing engine for the public index pages.
+
+fetch_page() gets one page of documents, the total number of matches and the
+facet values for the filter dropdown in a single aggregation. The page window
+comes from the main pipeline; the total and the facet values (read from the
+materialized ``facets`` collection) are appended with $unionWith sub-pipelines,
+each planned against its own indexes, so only the requested page crosses the
+wire. Search counts use $searchMeta (Atlas, MongoDB
+6.0+) when no post-search filter applies.
+
+Searches either run as Atlas $search stages (``search``) or arrive as a ranked
+list of ids from the in-process backend in search.py (``hits``).
+
+``projection`` (see projections.py) trims each page's documents to the fields
+the page shows; it is applied after the window, so $search, $match and $sort
+still see whole documents.
+
+Pages are addressed either by number (skip/limit, for shallow pages) or by an
+opaque ``after``/``before`` cursor that seeks on the sort key plus ``_id``, so
+deep pages cost the same as the first one.
+
+fetch_page_async() does the same with pymongo's AsyncMongoClient (see asgi.py).
+"""
+
+import base64
+import binascii
+import math
+import re
+from datetime import datetime
+
+from bson import Decimal128, ObjectId, json_util
+from bson.errors import BSONError
+
+from facets import facet_pipeline
+
+TOTAL_KEY = "_listing_total"
+FACETS_KEY = "_listing_facets"
+
+# Sort keys that cursors may seek on. Each must hold a single scalar per
+# document (not an array) and be backed by a (field, _id) index.
+KEYSET_FIELDS = {"_id", "term", "published_date", "year", "title"}
+
+
+def text_search(index, query, paths):
+    """Build an Atlas Search $search body for a fuzzy text query."""
+    return {
+        "index": index,
+        "text": {
+            "query": query,
+            "path": paths,
+            "fuzzy": {"maxEdits": 1},
+        },
+    }
+
+
+def prefix_filter(field, text):
+    """Match ``field`` values starting with ``text``.
+
+    Anchored, case-sensitive regexes are answered from an index on ``field``,
+    so the common capitalisations are tried as separate index ranges rather
+    than with a case-insensitive scan.
+    """
+    if not text:
+        return None
+    variants = dict.fromkeys([text, text.lower(), text.capitalize(), text.upper()])
+    clauses = [{field: {"$regex": "^" + re.escape(v)}} for v in variants]
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def _head(collection_filter, search, with_score=True):
+    if not search:
+        return [{"$match": collection_filter or {}}]
+    stages = [{"$search": search}]
+    if with_score:
+        stages.append({"$addFields": {"score": {"$meta": "searchScore"}}})
+    if collection_filter:
+        stages.append({"$match": collection_filter})
+    return stages
+
+
+def count_pipeline(collection_filter, search):
+    """Pipeline producing one document with the match count under TOTAL_KEY."""
+    if search and not collection_filter:
+        return [
+            {"$searchMeta": dict(search, count={"type": "total"})},
+            {"$project": {"_id": 0, TOTAL_KEY: "$count.total"}},
+        ]
+    if not search and not collection_filter:
+        # Unfiltered: read the collection's record count instead of scanning
+        return [
+            {"$collStats": {"count": {}}},
+            {"$group": {"_id": None, TOTAL_KEY: {"$sum": "$count"}}},
+        ]
+    return _head(collection_filter, search, with_score=False) + [
+        {"$count": TOTAL_KEY}
+    ]
+
+
+def with_tiebreaker(sort):
+    """Append ``_id`` to a sort so that every document has a unique position."""
+    if not sort:
+        return sort
+    sort = list(sort)
+    if sort[-1][0] != "_id":
+        sort.append(("_id", sort[-1][1]))
+    return sort
+
+
+def _keyset_capable(sort):
+    return bool(sort) and all(field in KEYSET_FIELDS for field, _ in sort)
+
+
+def encode_cursor(sort, doc):
+    """Opaque token holding the sort-key values of ``doc``."""
+    payload = {
+        "k": [field for field, _ in sort],
+        "v": [doc.get(field) for field, _ in sort],
+    }
+    raw = json_util.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+# Types a sort-key value in a cursor may have; anything else (documents,
+# arrays, regexes) could change the meaning of the keyset filter
+CURSOR_VALUE_TYPES = (type(None), bool, int, float, str, datetime, ObjectId, Decimal128)
+
+
+def decode_cursor(sort, token):
+    """Return the sort-key values in ``token``, or None if it is unusable."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json_util.loads(raw)
+    except (binascii.Error, ValueError, TypeError, ArithmeticError, BSONError):
+        return None
+    if not isinstance(payload, dict) or payload.get("k") != [f for f, _ in sort]:
+        return None
+    values = payload.get("v")
+    if not isinstance(values, list) or len(values) != len(sort):
+        return None
+    for (field, _), value in zip(sort, values):
+        if not isinstance(value, CURSOR_VALUE_TYPES):
+            return None
+        if field == "_id" and not isinstance(value, ObjectId):
+            return None
+    return values
+
+
+def _beyond(field, direction, value):
+    """Filter for values strictly after ``value`` in ``direction`` order.
+
+    Null and missing values sort before everything else, but range operators
+    never match them, so they are handled explicitly.
+    """
+    if direction > 0:
+        if value is None:
+            return {field: {"$ne": None}}
+        return {field: {"$gt": value}}
+    if value is None:
+        return None
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def keyset_filter(sort, values):
+    """Match documents that sort after ``values`` under ``sort``."""
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        beyond = _beyond(field, direction, values[i])
+        if beyond is None:
+            continue
+        equal = [{f: values[j]} for j, (f, _) in enumerate(sort[:i])]
+        clauses.append({"$and": equal + [beyond]} if equal else beyond)
+    return {"$or": clauses} if clauses else {"_id": {"$exists": False}}
+
+
+def _combine(*filters):
+    filters = [f for f in filters if f]
+    if not filters:
+        return None
+    return filters[0] if len(filters) == 1 else {"$and": filters}
+
+
+def build_pipeline(collection, *, page, per_page, match=None, search=None,
+                   sort=None, with_facets=False, seek=None, count=True,
+                   projection=None):
+    """Build the single aggregation behind fetch_page().
+
+    With ``seek`` (a keyset filter) the window starts at the filter instead of
+    at ``(page - 1) * per_page`` and one extra document is fetched so the
+    caller can tell whether another page follows.
+    """
+    pipeline = _head(_combine(match, seek), search)
+    if sort:
+        pipeline.append({"$sort": dict(sort)})
+    if seek:
+        pipeline.append({"$limit": per_page + 1})
+    else:
+        pipeline.append({"$skip": (page - 1) * per_page})
+        pipeline.append({"$limit": per_page})
+    if projection:
+        pipeline.append({"$project": projection})
+    if count:
+        pipeline.append(
+            {
+                "$unionWith": {
+                    "coll": collection.name,
+                    "pipeline": count_pipeline(match, search),
+                }
+            }
+        )
+    if with_facets:
+        pipeline.append(
+            {
+                "$unionWith": {
+                    "coll": "facets",
+                    "pipeline": facet_pipeline(collection.name, FACETS_KEY),
+                }
+            }
+        )
+    return pipeline
+
+
+def _split(docs):
+    items, total, facets = [], 0, []
+    for doc in docs:
+        if TOTAL_KEY in doc:
+            total = doc[TOTAL_KEY]
+        elif FACETS_KEY in doc:
+            facets = doc[FACETS_KEY]
+        else:
+            items.append(doc)
+    return items, total, facets
+
+
+def _run(collection, pipeline):
+    return _split(collection.aggregate(pipeline))
+
+
+async def _run_async(collection, pipeline):
+    return _split(await (await collection.aggregate(pipeline)).to_list())
+
+
+# The page logic is written once as a generator that yields (collection,
+# pipeline) and receives (items, total, facets), so the blocking and the
+# asyncio clients share it.
+
+
+def _drive(steps):
+    result = None
+    while True:
+        try:
+            collection, pipeline = steps.send(result)
+        except StopIteration as done:
+            return done.value
+        result = _run(collection, pipeline)
+
+
+async def _drive_async(steps):
+    result = None
+    while True:
+        try:
+            collection, pipeline = steps.send(result)
+        except StopIteration as done:
+            return done.value
+        result = await _run_async(collection, pipeline)
+
+
+def fetch_page(collection, **options):
+    """Fetch one listing page in a single round trip.
+
+    ``match`` filters the collection (after ``search`` when both are given),
+    ``sort`` is a list of (field, direction) pairs, or None to keep search
+    relevance order, and ``with_facets`` adds the collection's facet values and
+    counts (a list of {"value", "count"} dicts) for the filter dropdown.
+    ``projection`` limits the fields returned for each item.
+
+    ``hits`` replaces ``match`` and ``search`` with the ranked, already
+    filtered ids of an in-process search; the total is then known up front.
+
+    ``after``/``before`` are cursor tokens from a previous page; they switch
+    to keyset mode when the sort allows it. In keyset mode ``page`` is None,
+    and ``total``/``total_pages`` are None unless ``count_cursor_pages``.
+
+    Returns a dict with items, total, page, total_pages, facets, and the
+    next_cursor/prev_cursor tokens for the neighbouring pages.
+    """
+    return _drive(_page_steps(collection, **options))
+
+
+async def fetch_page_async(collection, **options):
+    """fetch_page() for an asyncio (AsyncMongoClient) collection."""
+    return await _drive_async(_page_steps(collection, **options))
+
+
+def _page_steps(collection, *, page, per_page, match=None, search=None,
+                hits=None, sort=None, with_facets=False, after=None,
+                before=None, count_cursor_pages=True, projection=None):
+    known_total = None
+    if hits is not None:
+        known_total = len(hits)
+        if not sort:
+            return (yield from _ranked_page_steps(
+                collection, hits, page=page, per_page=per_page,
+                with_facets=with_facets, projection=projection,
+            ))
+        match, search = {"_id": {"$in": hits}}, None
+
+    sort = with_tiebreaker(sort)
+    keyset = _keyset_capable(sort)
+    if projection and sort:
+        # Cursors are built from the sort-key values of the returned items
+        projection = dict(projection, **{field: 1 for field, _ in sort})
+    options = dict(
+        per_page=per_page,
+        match=match,
+        search=search,
+        with_facets=with_facets,
+        projection=projection,
+    )
+
+    token = (after or before) if keyset else None
+    values = decode_cursor(sort, token) if token else None
+    if values is not None:
+        return (yield from _cursor_page_steps(
+            collection, sort, values, forward=bool(after),
+            count=count_cursor_pages, known_total=known_total, **options
+        ))
+
+    options["count"] = known_total is None
+    items, total, facets = yield (
+        collection, build_pipeline(collection, page=page, sort=sort, **options)
+    )
+    if known_total is not None:
+        total = known_total
+    total_pages = math.ceil(total / per_page) or 1
+    if page > total_pages:
+        # Only an out-of-range page number costs a second round trip.
+        page = total_pages
+        items, total, facets = yield (
+            collection, build_pipeline(collection, page=page, sort=sort, **options)
+        )
+        if known_total is not None:
+            total = known_total
+
+    next_cursor = prev_cursor = None
+    if keyset and items:
+        if page < total_pages:
+            next_cursor = encode_cursor(sort, items[-1])
+        if page > 1:
+            prev_cursor = encode_cursor(sort, items[0])
+
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "total_pages": total_pages,
+        "facets": facets,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
+
+
+def _ranked_page_steps(collection, hits, *, page, per_page, with_facets,
+                       projection=None):
+    # Relevance order is the order of ``hits``: slice the page window here and
+    # fetch just those documents.
+    total = len(hits)
+    total_pages = math.ceil(total / per_page) or 1
+    page = min(page, total_pages)
+    window = hits[(page - 1) * per_page : page * per_page]
+    items, _, facets = yield (
+        collection,
+        build_pipeline(
+            collection,
+            page=1,
+            per_page=per_page,
+            match={"_id": {"$in": window}},
+            with_facets=with_facets,
+            count=False,
+            projection=projection,
+        ),
+    )
+    rank = {doc_id: i for i, doc_id in enumerate(window)}
+    items.sort(key=lambda doc: rank[doc["_id"]])
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "total_pages": total_pages,
+        "facets": facets,
+        "next_cursor": None,
+        "prev_cursor": None,
+    }
+
+
+def _cursor_page_steps(collection, sort, values, *, forward, count,
+                       known_total=None, **options):
+    # Paging backwards walks the reversed sort and flips the result.
+    walk = sort if forward else [(field, -direction) for field, direction in sort]
+    items, total, facets = yield (
+        collection,
+        build_pipeline(
+            collection,
+            page=None,
+            sort=walk,
+            seek=keyset_filter(walk, values),
+            count=count and known_total is None,
+            **options,
+        ),
+    )
+    has_more = len(items) > options["per_page"]
+    items = items[: options["per_page"]]
+    if not forward:
+        items.reverse()
+
+    next_cursor = prev_cursor = None
+    if items:
+        # The page we came from is always on the other side of the cursor.
+        if has_more or not forward:
+            next_cursor = encode_cursor(sort, items[-1])
+        if has_more or forward:
+            prev_cursor = encode_cursor(sort, items[0])
+
+    if known_total is not None:
+        total = known_total
+    total_pages = None
+    if count:
+        total_pages = math.ceil(total / options["per_page"]) or 1
+    else:
+        total = None
+
+    return {
+        "items": items,
+        "total": total,
+        "page": None,
+        "total_pages": total_pages,
+        "facets": facets,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
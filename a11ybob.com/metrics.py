@@ -0,0 +1,419 @@
+"""
+Prometheus metrics for the app, served at /metrics in the text format.
+
+Each process counts into plain dicts under one lock, which costs a dict
+update per observation. Gunicorn workers do not share memory, so every
+process also writes a snapshot of its metrics to its own file in METRICS_DIR
+(at most every METRICS_FLUSH_SECONDS, after a request, and at exit), and
+/metrics sums the snapshots of all processes. Other workers' figures can lag
+by the flush interval. When a worker exits, retire() folds its counters and
+histograms into one file of totals from exited processes and deletes its
+snapshot (gunicorn.conf.py calls it from the master), so totals never go
+backwards and the directory does not grow as workers are recycled; gauges
+only count live processes. Empty METRICS_DIR when the server restarts, or
+the previous run's totals are included too.
+
+Collected:
+
+    http_requests_total                   route, method, status
+    http_request_duration_seconds         route (histogram)
+    mongodb_command_duration_seconds      collection, command (histogram)
+    mongodb_pool_checkouts_total          address
+    mongodb_pool_checkout_failures_total  address, reason
+    mongodb_pool_checkout_wait_seconds    address (histogram)
+    mongodb_pool_connections              address (gauge, open connections)
+    mongodb_pool_checked_out              address (gauge)
+    render_duration_seconds               stage: template or markdown (histogram)
+    search_queries_total                  index, backend
+
+/metrics answers ``Authorization: Bearer <METRICS_TOKEN>`` when a token is
+set, and a logged-in admin; everyone else gets a 401.
+"""
+
+import atexit
+import json
+import os
+import secrets
+import threading
+import time
+import uuid
+
+from flask import current_app, request, session
+from pymongo import monitoring
+
+import timing
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    "http_requests_total": ("counter", "Requests handled.", None),
+    "http_request_duration_seconds": ("histogram", "Request latency.", LATENCY_BUCKETS),
+    "mongodb_command_duration_seconds": (
+        "histogram",
+        "MongoDB command latency.",
+        LATENCY_BUCKETS,
+    ),
+    "mongodb_pool_checkouts_total": ("counter", "Connections checked out of the pool.", None),
+    "mongodb_pool_checkout_failures_total": ("counter", "Failed pool checkouts.", None),
+    "mongodb_pool_checkout_wait_seconds": (
+        "histogram",
+        "Time spent waiting to check out a pooled connection.",
+        LATENCY_BUCKETS,
+    ),
+    "mongodb_pool_connections": ("gauge", "Open pooled connections.", None),
+    "mongodb_pool_checked_out": ("gauge", "Pooled connections in use.", None),
+    "render_duration_seconds": (
+        "histogram",
+        "Template and Markdown render time per request.",
+        LATENCY_BUCKETS,
+    ),
+    "search_queries_total": ("counter", "Full-text searches.", None),
+}
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registry:
+    """This process's metric values."""
+
+    def __init__(self):
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, _labels(labels))
+        with self._lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # One count per bucket plus +Inf, then the sum
+                counts = self.values[key] = [0] * (len(buckets) + 1) + [0.0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    break
+            else:
+                i = len(buckets)
+            counts[i] += 1
+            counts[-1] += value
+
+    def reset(self):
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                [name, list(labels), list(value) if isinstance(value, list) else value]
+                for (name, labels), value in self.values.items()
+            ]
+
+
+registry = Registry()
+
+# A forked worker starts from zero; the parent's counts are its own
+os.register_at_fork(after_in_child=registry.reset)
+
+
+# --- MongoDB listeners ---
+
+
+def _address(address):
+    return "%s:%s" % address if isinstance(address, tuple) else str(address)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Command latency by collection and command name."""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[(event.connection_id, event.request_id)] = (
+            collection if isinstance(collection, str) else ""
+        )
+
+    def _finished(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        registry.observe(
+            "mongodb_command_duration_seconds",
+            {"collection": collection, "command": event.command_name},
+            event.duration_micros / 1e6,
+        )
+
+    succeeded = failed = _finished
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Checkouts, checkout waits and pool size per server."""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        registry.inc("mongodb_pool_connections", {"address": _address(event.address)})
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        registry.inc("mongodb_pool_connections", {"address": _address(event.address)}, -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        address = _address(event.address)
+        registry.inc(
+            "mongodb_pool_checkout_failures_total", {"address": address, "reason": event.reason}
+        )
+
+    def connection_checked_out(self, event):
+        address = {"address": _address(event.address)}
+        registry.inc("mongodb_pool_checkouts_total", address)
+        registry.inc("mongodb_pool_checked_out", address)
+        if event.duration is not None:
+            registry.observe("mongodb_pool_checkout_wait_seconds", address, event.duration)
+
+    def connection_checked_in(self, event):
+        registry.inc("mongodb_pool_checked_out", {"address": _address(event.address)}, -1)
+
+
+def listeners():
+    """Event listeners to pass to MongoClient."""
+    return [CommandMetrics(), PoolMetrics()]
+
+
+def count_search(index, backend):
+    registry.inc("search_queries_total", {"index": index, "backend": backend})
+
+
+# --- Multi-process snapshots ---
+
+# Totals from exited processes, written only by retire()
+RETIRED_FILE = "retired.json"
+
+
+class Snapshots:
+    """Writes this process's snapshot and merges everyone's."""
+
+    def __init__(self, directory, interval):
+        self.directory = directory
+        self.interval = interval
+        self._new_file()
+        os.register_at_fork(after_in_child=self._new_file)
+
+    def _new_file(self):
+        # A fresh name per process, so a reused pid never overwrites the
+        # totals of the worker that had it before
+        self._path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+        self._flushed = 0.0
+        self._lock = threading.Lock()
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._flushed < self.interval:
+            return
+        with self._lock:
+            self._flushed = now
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = self._path + ".tmp"
+            with open(temporary, "w") as f:
+                json.dump({"pid": os.getpid(), "values": registry.snapshot()}, f)
+            os.replace(temporary, self._path)
+
+    def collect(self):
+        """Every process's values summed into {(name, labels): value}."""
+        merged = {}
+        # Read before listing, so a snapshot being retired is counted once
+        retired = _load(os.path.join(self.directory, RETIRED_FILE))
+        if retired is not None:
+            _add(merged, retired["values"], live=False)
+        absorbed = set(retired["absorbed"]) if retired else set()
+        for filename in os.listdir(self.directory):
+            if filename in absorbed or filename == RETIRED_FILE:
+                continue
+            if not filename.endswith(".json"):
+                continue
+            data = _load(os.path.join(self.directory, filename))
+            if data is not None:
+                _add(merged, data["values"], live=_alive(data["pid"]))
+        return merged
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _add(merged, values, live):
+    for name, labels, value in values:
+        if name not in METRICS or (METRICS[name][0] == "gauge" and not live):
+            continue
+        key = (name, tuple(tuple(pair) for pair in labels))
+        if isinstance(value, list):
+            current = merged.setdefault(key, [0] * len(value))
+            merged[key] = [a + b for a, b in zip(current, value)]
+        else:
+            merged[key] = merged.get(key, 0) + value
+
+
+def retire(directory, pid):
+    """Fold the snapshots of exited process ``pid`` into the retired totals
+    and delete them. Call from one process only (the server master)."""
+    path = os.path.join(directory, RETIRED_FILE)
+    retired = _load(path) or {"values": [], "absorbed": []}
+    # Files absorbed earlier and since deleted need no more skipping
+    absorbed = [
+        name for name in retired["absorbed"] if os.path.exists(os.path.join(directory, name))
+    ]
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    mine = [
+        name
+        for name in names
+        if name.startswith(f"{pid}-") and name.endswith(".json") and name not in absorbed
+    ]
+    if not mine:
+        return
+    merged = {}
+    _add(merged, retired["values"], live=False)
+    for name in mine:
+        data = _load(os.path.join(directory, name))
+        if data is not None:
+            _add(merged, data["values"], live=False)
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(
+            {
+                "values": [[name, list(labels), value] for (name, labels), value in merged.items()],
+                "absorbed": absorbed + mine,
+            },
+            f,
+        )
+    os.replace(temporary, path)
+    for name in mine:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def _alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# --- Exposition ---
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 9))
+    return str(value)
+
+
+def exposition(merged):
+    """Render merged values in the Prometheus text format."""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (n, labels), value in merged.items() if n == name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in series:
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ("+Inf",), value[:-1]):
+                cumulative += count
+                le = labels + (("le", bound if bound == "+Inf" else repr(float(bound))),)
+                lines.append(f"{name}_bucket{_format_labels(le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Flask integration ---
+
+
+def init_app(app):
+    """Record request metrics for ``app`` and serve them at /metrics."""
+    snapshots = Snapshots(app.config["METRICS_DIR"], app.config["METRICS_FLUSH_SECONDS"])
+    app.extensions["metrics"] = snapshots
+    atexit.register(snapshots.flush, force=True)
+
+    @app.after_request
+    def record_request(response):
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        registry.inc(
+            "http_requests_total",
+            {"route": route, "method": request.method, "status": str(response.status_code)},
+        )
+        timings = timing.current()
+        if timings is not None:
+            registry.observe(
+                "http_request_duration_seconds", {"route": route}, timings.elapsed()
+            )
+            for stage, span in (("template", "render"), ("markdown", "markdown")):
+                if timings.totals[span]:
+                    registry.observe(
+                        "render_duration_seconds", {"stage": stage}, timings.totals[span]
+                    )
+        snapshots.flush()
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        token = current_app.config["METRICS_TOKEN"]
+        authorization = request.headers.get("Authorization", "")
+        scraper = bool(token) and secrets.compare_digest(authorization, f"Bearer {token}")
+        if not (scraper or session.get("admin")):
+            return "Unauthorized\n", 401, {"Content-Type": "text/plain"}
+        snapshots.flush(force=True)
+        return (
+            exposition(snapshots.collect()),
+            200,
+            {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
@@ -0,0 +1,104 @@
+"""
+Named field projections for each way a collection is displayed.
+
+Every query that feeds a page asks for just the fields its template uses:
+
+    card    listing-page cards; long text is cut to what the card shows
+    search  a card plus the Atlas Search relevance score
+    detail  the public detail page (validators included)
+    admin   the admin list tables
+
+Projections are inclusion documents usable in both find() and a $project
+stage. Editing forms and admin writes still load whole documents.
+"""
+
+# Longest text a card shows, plus one character so templates can tell that
+# it was cut and add an ellipsis.
+GLOSSARY_CARD_DEFINITION = 201
+REVIEW_CARD_SUMMARY = 251
+
+_VALIDATORS = {"updated": 1, "modified": 1}
+
+
+def _truncated(field, length):
+    return {"$substrCP": [{"$ifNull": [f"${field}", ""]}, 0, length]}
+
+
+PROJECTIONS = {
+    "glossary": {
+        "card": {
+            "term": 1,
+            "aka": 1,
+            "category": 1,
+            "definition": _truncated("definition", GLOSSARY_CARD_DEFINITION),
+        },
+        "detail": {
+            "term": 1,
+            "aka": 1,
+            "definition": 1,
+            "category": 1,
+            "related": 1,
+            "sources": 1,
+            "related_content": 1,
+            **_VALIDATORS,
+        },
+        "admin": {"term": 1, "category": 1},
+    },
+    "reviews": {
+        "card": {
+            "title": 1,
+            "authors": 1,
+            "year": 1,
+            "publication": 1,
+            "tags": 1,
+            "summary": _truncated("summary", REVIEW_CARD_SUMMARY),
+        },
+        "detail": {
+            "title": 1,
+            "authors": 1,
+            "year": 1,
+            "publication": 1,
+            "doi": 1,
+            "tags": 1,
+            "standards_referenced": 1,
+            "summary": 1,
+            "key_findings": 1,
+            "relevance": 1,
+            "related_content": 1,
+            **_VALIDATORS,
+        },
+        "admin": {"title": 1, "authors": 1, "year": 1},
+    },
+    "articles": {
+        "card": {
+            "title": 1,
+            "slug": 1,
+            "author": 1,
+            "published_date": 1,
+            "summary": 1,
+            "tags": 1,
+        },
+        # The Markdown source is only needed to re-render stale HTML
+        "detail": {
+            "title": 1,
+            "slug": 1,
+            "author": 1,
+            "published_date": 1,
+            "summary": 1,
+            "tags": 1,
+            "content_html": 1,
+            "content_html_version": 1,
+            "related_content": 1,
+            **_VALIDATORS,
+        },
+        "admin": {"title": 1, "author": 1, "published_date": 1},
+    },
+}
+
+for _views in PROJECTIONS.values():
+    _views["search"] = dict(_views["card"], score=1)
+
+
+def view(collection, name):
+    """The projection for displaying ``collection`` documents as ``name``."""
+    return PROJECTIONS[collection][name]
@@ -0,0 +1,499 @@
+"""
+Related-content recommendations from TF-IDF cosine similarity.
+
+Every glossary term, review and article is turned into a TF-IDF vector over
+its text fields (titles and tags weighted up), and its TOP_K most similar
+documents from any of the three collections are stored on it as
+``related_content``, a list of {"collection", "_id", "title", "score"}
+entries (plus "slug" for articles) in descending score order. Detail pages
+render them from the document itself.
+
+rebuild() fits the vocabulary and IDF weights on the whole corpus, saves them
+in the ``related_model`` collection and computes all neighbours with blocked
+matrix products over sparse vectors, a block at a time (see
+``seed/build_related.py``). It also stores every document's sparse vector in
+``related_vectors``, and apply_change() keeps that entry current on each
+admin save. The edited document and every document recommending it are then
+recomputed against the stored vectors sharing a term with them, found
+through the index on ``terms``, so an edit never reads the corpus text; the
+edited document is pushed into other documents' lists where it now ranks.
+Terms new since the last rebuild are ignored, and bulk-imported documents
+are left out of other documents' candidates, until the next one.
+
+Changed documents get a fresh ``modified`` time, so their validators change
+with their content; callers bump the content versions of the collections
+returned.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+# numpy is imported where it is used, so serving pages never loads it
+
+FIELD = "related_content"
+MODEL_ID = "tfidf"
+VECTORS = "related_vectors"
+
+# Text each collection is compared on, with per-field term weights
+TEXT_FIELDS = {
+    "glossary": {"term": 3, "aka": 2, "category": 2, "definition": 1},
+    "reviews": {"title": 3, "tags": 2, "summary": 1, "key_findings": 1},
+    "articles": {"title": 3, "tags": 2, "summary": 1, "content": 1},
+}
+TITLE_FIELDS = {"glossary": "term", "reviews": "title", "articles": "title"}
+
+TOP_K = 5
+MIN_SCORE = 0.05
+
+# Vocabulary: terms in at least MIN_DF documents and at most MAX_DF of them,
+# the MAX_FEATURES most common kept
+MAX_FEATURES = 4096
+MIN_DF = 2
+MAX_DF = 0.5
+
+# Cells of each dense block of vectors (documents x features, float32, so 4
+# bytes each); rebuild() holds two blocks and their similarity matrix at once
+BLOCK_CELLS = 8 * 1024 * 1024
+
+# Documents vectorized or stored vectors scored at a time
+SCAN_BATCH = 1000
+
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    """
+    a about after all also an and any are as at be been but by can could do
+    does for from has have how if in into is it its may more most must no not
+    of on or other our over should so such than that the their them then there
+    these they this those through to under up use used using was we were what
+    when where which while who will with would you your
+    """.split()
+)
+
+
+def tokens(text):
+    return [t for t in TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def _text(value):
+    if not value:
+        return ""
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value)
+    return str(value)
+
+
+def term_counts(collection, doc):
+    """Field-weighted term counts for a document."""
+    counts = Counter()
+    for field, weight in TEXT_FIELDS[collection].items():
+        for token in tokens(_text(doc.get(field))):
+            counts[token] += weight
+    return counts
+
+
+def _source(collection, doc):
+    # Everything a document's vector and its entries in other lists use
+    fields = [*TEXT_FIELDS[collection], TITLE_FIELDS[collection], "slug"]
+    return [doc.get(field) for field in fields]
+
+
+def _projection(collection):
+    return {**dict.fromkeys(TEXT_FIELDS[collection], 1), "slug": 1, FIELD: 1}
+
+
+def _entry(collection, doc, score):
+    entry = {
+        "collection": collection,
+        "_id": doc["_id"],
+        "title": doc.get(TITLE_FIELDS[collection], ""),
+        "score": round(float(score), 4),
+    }
+    if collection == "articles":
+        entry["slug"] = doc.get("slug", "")
+    return entry
+
+
+def _scan(db):
+    """Yield (collection, doc) for every document, text fields only."""
+    for collection in TEXT_FIELDS:
+        cursor = db[collection].find({}, _projection(collection), batch_size=SCAN_BATCH)
+        for doc in cursor:
+            yield collection, doc
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- Model ---
+
+
+class Model:
+    """Vocabulary and IDF weights fitted on the corpus, and the number of
+    recommendations kept per document."""
+
+    def __init__(self, vocabulary, idf, k=TOP_K):
+        import numpy as np
+
+        self.k = k
+        self.index = {term: i for i, term in enumerate(vocabulary)}
+        self.idf = np.asarray(idf, dtype=np.float32)
+
+    @classmethod
+    def fit(cls, counts, k=TOP_K, max_features=MAX_FEATURES):
+        """Fit on per-document term Counters, read once from any iterable."""
+        n = 0
+        df = Counter()
+        for c in counts:
+            n += 1
+            df.update(c.keys())
+        ceiling = max(MIN_DF, MAX_DF * n)
+        kept = sorted(
+            (term for term, d in df.items() if MIN_DF <= d <= ceiling),
+            key=lambda term: (-df[term], term),
+        )[:max_features]
+        idf = [math.log((1 + n) / (1 + df[term])) + 1 for term in kept]
+        return cls(kept, idf, k)
+
+    def vectors(self, counts):
+        """L2-normalized TF-IDF rows, one per Counter, as a float32 matrix."""
+        import numpy as np
+
+        matrix = np.zeros((len(counts), len(self.index)), dtype=np.float32)
+        for row, c in enumerate(counts):
+            for term, count in c.items():
+                col = self.index.get(term)
+                if col is not None:
+                    matrix[row, col] = 1 + math.log(count)
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        matrix /= norms
+        return matrix
+
+
+def load_model(db):
+    """The saved Model, or None before the first rebuild()."""
+    doc = db.related_model.find_one({"_id": MODEL_ID})
+    if doc is None:
+        return None
+    return Model(doc["vocabulary"], doc["idf"], doc["k"])
+
+
+def _vector_id(collection, doc_id):
+    return f"{collection}:{doc_id}"
+
+
+def _vector(collection, doc, row):
+    """The related_vectors document for ``doc`` with TF-IDF ``row``."""
+    import numpy as np
+
+    columns = np.flatnonzero(row)
+    return {
+        "_id": _vector_id(collection, doc["_id"]),
+        "collection": collection,
+        "doc_id": doc["_id"],
+        "title": doc.get(TITLE_FIELDS[collection], ""),
+        "slug": doc.get("slug", ""),
+        "terms": [int(c) for c in columns],
+        "weights": [float(row[c]) for c in columns],
+    }
+
+
+def _candidates(db, columns):
+    """Yield (collection, doc, terms, weights) for the stored vectors
+    sharing any of ``columns``; ``doc`` holds what _entry() reads."""
+    import numpy as np
+
+    cursor = db[VECTORS].find({"terms": {"$in": columns}}, batch_size=SCAN_BATCH)
+    for vector in cursor:
+        collection = vector["collection"]
+        doc = {
+            "_id": vector["doc_id"],
+            TITLE_FIELDS[collection]: vector["title"],
+            "slug": vector["slug"],
+        }
+        yield collection, doc, vector["terms"], np.asarray(vector["weights"], dtype=np.float32)
+
+
+def _save_model(db, model, documents):
+    vocabulary = sorted(model.index, key=model.index.get)
+    db.related_model.replace_one(
+        {"_id": MODEL_ID},
+        {
+            "vocabulary": vocabulary,
+            "idf": [float(v) for v in model.idf],
+            "k": model.k,
+            "documents": documents,
+            "built_at": datetime.now(timezone.utc),
+        },
+        upsert=True,
+    )
+
+
+# --- Neighbours ---
+
+
+def top_k(scores, k):
+    """Column indices of the k highest scores in each row, best first."""
+    import numpy as np
+
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.intp)
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+def _write(db, updates):
+    """Apply {collection: [UpdateOne]}; returns the collections changed."""
+    changed = set()
+    for collection, ops in updates.items():
+        if ops and db[collection].bulk_write(ops, ordered=False).modified_count:
+            changed.add(collection)
+    return changed
+
+
+def _set_op(doc_id, entries):
+    return UpdateOne(
+        {"_id": doc_id},
+        {"$set": {FIELD: entries}, "$currentDate": {"modified": True}},
+    )
+
+
+class _Rows:
+    """Sparse float32 rows (CSR arrays), turned dense a block at a time."""
+
+    def __init__(self, width):
+        import numpy as np
+
+        self.width = width
+        self.indptr = [np.zeros(1, dtype=np.int64)]
+        self.indices = []
+        self.data = []
+        self._end = 0
+
+    def append(self, matrix):
+        import numpy as np
+
+        rows, columns = np.nonzero(matrix)
+        lengths = np.bincount(rows, minlength=matrix.shape[0])
+        self.indptr.append(self._end + np.cumsum(lengths))
+        self._end += len(rows)
+        self.indices.append(columns.astype(np.int32))
+        self.data.append(matrix[rows, columns])
+
+    def freeze(self):
+        import numpy as np
+
+        self.indptr = np.concatenate(self.indptr)
+        self.indices = np.concatenate(self.indices or [np.zeros(0, dtype=np.int32)])
+        self.data = np.concatenate(self.data or [np.zeros(0, dtype=np.float32)])
+
+    def dense(self, start, stop):
+        import numpy as np
+
+        block = np.zeros((stop - start, self.width), dtype=np.float32)
+        lo, hi = self.indptr[start], self.indptr[stop]
+        rows = np.repeat(np.arange(stop - start), np.diff(self.indptr[start : stop + 1]))
+        block[rows, self.indices[lo:hi]] = self.data[lo:hi]
+        return block
+
+
+def rebuild(db, k=TOP_K, max_features=MAX_FEATURES, log=None):
+    """Refit the model and recompute every document's recommendations.
+
+    The corpus is read twice, for document frequencies and then for vectors,
+    which are kept sparse; similarities are computed between dense blocks of
+    at most BLOCK_CELLS cells, so memory grows with the corpus's nonzero weights
+    rather than documents x features. Returns the collections whose
+    documents changed.
+    """
+    import numpy as np
+
+    counts = (term_counts(collection, doc) for collection, doc in _scan(db))
+    model = Model.fit(counts, k, max_features)
+    width = len(model.index)
+
+    # What each document's entry in other lists shows, by row
+    entries = []
+    rows = _Rows(width)
+    db[VECTORS].delete_many({})
+    for batch in _batches(_scan(db), SCAN_BATCH):
+        matrix = model.vectors([term_counts(collection, doc) for collection, doc in batch])
+        rows.append(matrix)
+        db[VECTORS].insert_many(
+            [_vector(collection, doc, matrix[i]) for i, (collection, doc) in enumerate(batch)],
+            ordered=False,
+        )
+        entries.extend(
+            (collection, doc["_id"], doc.get(TITLE_FIELDS[collection], ""), doc.get("slug", ""))
+            for collection, doc in batch
+        )
+    rows.freeze()
+    n = len(entries)
+    if log:
+        log(f"{n} documents, {width} terms")
+
+    changed = set()
+    block = max(1, min(n, BLOCK_CELLS // max(width, 1)))
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        queries = rows.dense(start, stop)
+        # Running top k of each query row over the column blocks
+        best = np.full((stop - start, k), -np.inf, dtype=np.float32)
+        best_columns = np.zeros((stop - start, k), dtype=np.intp)
+        for column_start in range(0, n, block):
+            column_stop = min(column_start + block, n)
+            scores = queries @ rows.dense(column_start, column_stop).T
+            # A document is not its own recommendation
+            for row in range(max(start, column_start), min(stop, column_stop)):
+                scores[row - start, row - column_start] = -1
+            columns = top_k(scores, k)
+            merged = np.concatenate([best, np.take_along_axis(scores, columns, axis=1)], axis=1)
+            merged_columns = np.concatenate([best_columns, columns + column_start], axis=1)
+            order = top_k(merged, k)
+            best = np.take_along_axis(merged, order, axis=1)
+            best_columns = np.take_along_axis(merged_columns, order, axis=1)
+        changed |= _write_block(db, entries, start, best, best_columns)
+    _save_model(db, model, n)
+    return changed
+
+
+def _write_block(db, entries, start, best, best_columns):
+    """Store the recommendations of rows ``start`` onwards where they changed."""
+    stored = {}
+    ids = {}
+    for row in range(start, start + len(best)):
+        ids.setdefault(entries[row][0], []).append(entries[row][1])
+    for collection, doc_ids in ids.items():
+        for doc in db[collection].find({"_id": {"$in": doc_ids}}, {FIELD: 1}):
+            stored[(collection, doc["_id"])] = doc.get(FIELD)
+
+    updates = {collection: [] for collection in TEXT_FIELDS}
+    for offset, (scores, columns) in enumerate(zip(best, best_columns)):
+        collection, doc_id = entries[start + offset][:2]
+        recommended = []
+        for score, column in zip(scores, columns):
+            if score < MIN_SCORE:
+                break
+            other, other_id, title, slug = entries[column]
+            doc = {"_id": other_id, TITLE_FIELDS[other]: title, "slug": slug}
+            recommended.append(_entry(other, doc, score))
+        if recommended != stored.get((collection, doc_id)):
+            updates[collection].append(_set_op(doc_id, recommended))
+    return _write(db, updates)
+
+
+def apply_change(db, collection, old, new):
+    """Update recommendations after a create (old is None), edit or delete
+    (new is None) in ``collection``. Returns the collections changed."""
+    import numpy as np
+
+    if old is not None and new is not None:
+        if _source(collection, old) == _source(collection, new):
+            return set()
+    model = load_model(db)
+    if model is None:
+        return set()
+    k = model.k
+    doc_id = (new or old)["_id"]
+    if new is None:
+        db[VECTORS].delete_one({"_id": _vector_id(collection, doc_id)})
+    else:
+        row = model.vectors([term_counts(collection, new)])[0]
+        db[VECTORS].replace_one(
+            {"_id": _vector_id(collection, doc_id)}, _vector(collection, new, row), upsert=True
+        )
+
+    # Documents recommending this one may lose it or show a stale title, so
+    # they are recomputed in full, along with the document itself
+    targets = [
+        (name, doc)
+        for name in TEXT_FIELDS
+        for doc in db[name].find({f"{FIELD}._id": doc_id}, _projection(name))
+        if not (name == collection and doc["_id"] == doc_id)
+    ]
+    if new is not None:
+        targets.append((collection, new))
+    if not targets:
+        return set()
+    position = {(name, doc["_id"]): t for t, (name, doc) in enumerate(targets)}
+    queries = model.vectors([term_counts(name, doc) for name, doc in targets])
+    # Only documents sharing a term with a target can score above zero
+    columns = [int(c) for c in np.flatnonzero(queries.any(axis=0))]
+    # Per target: a min-heap of (score, tiebreak, entry)
+    best = [[] for _ in targets]
+    pushes = []
+    tiebreak = 0
+
+    for batch in _batches(_candidates(db, columns), SCAN_BATCH):
+        scores = np.stack([queries[:, terms] @ weights for _, _, terms, weights in batch])
+        keys = [(name, doc["_id"]) for name, doc, _, _ in batch]
+        for row, key in enumerate(keys):
+            if key in position:
+                scores[row, position[key]] = -1
+        for t, rows in enumerate(top_k(scores.T, k)):
+            for row in rows:
+                score = float(scores[row, t])
+                if score < MIN_SCORE:
+                    break
+                tiebreak += 1
+                item = (score, -tiebreak, _entry(*batch[row][:2], score))
+                if len(best[t]) < k:
+                    heapq.heappush(best[t], item)
+                elif item[:2] > best[t][0][:2]:
+                    heapq.heapreplace(best[t], item)
+        if new is not None:
+            for row in np.flatnonzero(scores[:, -1] >= MIN_SCORE):
+                if keys[row] not in position:
+                    pushes.append((*keys[row], round(float(scores[row, -1]), 4)))
+
+    updates = {name: [] for name in TEXT_FIELDS}
+    for (name, doc), heap in zip(targets, best):
+        entries = [entry for _, _, entry in sorted(heap, key=lambda item: item[:2], reverse=True)]
+        if entries != doc.get(FIELD):
+            updates[name].append(_set_op(doc["_id"], entries))
+    if new is not None:
+        entry = _entry(collection, new, 0)
+        for name, other_id, score in pushes:
+            # Only where the new score beats the last of a full list
+            updates[name].append(
+                UpdateOne(
+                    {
+                        "_id": other_id,
+                        f"{FIELD}._id": {"$ne": doc_id},
+                        "$or": [
+                            {f"{FIELD}.{k - 1}": {"$exists": False}},
+                            {f"{FIELD}.{k - 1}.score": {"$lt": score}},
+                        ],
+                    },
+                    {
+                        "$push": {
+                            FIELD: {
+                                "$each": [dict(entry, score=score)],
+                                "$sort": {"score": -1},
+                                "$slice": k,
+                            }
+                        },
+                        "$currentDate": {"modified": True},
+                    },
+                )
+            )
+    return _write(db, updates)
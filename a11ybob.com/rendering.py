@@ -0,0 +1,90 @@
+"""
+Markdown rendering for article content.
+
+Articles are rendered to HTML when they are saved and the result is stored on
+the document as ``content_html``, stamped with ``content_html_version``. The
+detail page serves the stored HTML as-is; documents whose stamp does not match
+render_stamp() are re-rendered on view or by ``seed/render_articles.py``.
+
+Given a glossary Automaton (see autolink.py), rendering also links glossary
+terms mentioned in the text; the stamp then includes the vocabulary digest, so
+a vocabulary change makes stored HTML stale.
+"""
+
+import threading
+from importlib.metadata import version
+
+from timing import track
+
+MARKDOWN_EXTENSIONS = ["extra", "smarty"]
+
+# Bump whenever a change here alters the HTML produced for the same source.
+RENDERER_REVISION = 1
+
+# Read from the package metadata so serving stored HTML never imports markdown
+RENDERER_VERSION = "{}:markdown-{}:{}".format(
+    RENDERER_REVISION, version("Markdown"), "+".join(MARKDOWN_EXTENSIONS)
+)
+
+# Each thread reuses its Markdown instances: {linked: (automaton, Markdown)}
+_local = threading.local()
+
+
+class _GlossaryLinks:
+    """Postprocessor linking glossary terms in the final HTML, after raw HTML
+    is restored."""
+
+    def __init__(self, automaton):
+        self.automaton = automaton
+
+    def run(self, text):
+        return self.automaton.link_html(text)
+
+
+def _new_converter(automaton):
+    import markdown
+
+    converter = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    if automaton is not None:
+        converter.postprocessors.register(_GlossaryLinks(automaton), "glossary_links", 5)
+    return converter
+
+
+def _converter(automaton):
+    """This thread's Markdown instance for ``automaton``, reset for a new
+    document. Extensions are loaded once, not on every call."""
+    converters = _local.__dict__.setdefault("converters", {})
+    linked = automaton is not None
+    cached = converters.get(linked)
+    if cached is None or cached[0] is not automaton:
+        cached = converters[linked] = (automaton, _new_converter(automaton))
+    return cached[1].reset()
+
+
+def render_markdown(text, automaton=None):
+    """Render Markdown source to an HTML string, linking glossary terms if an
+    Automaton is given."""
+    if not text:
+        return ""
+    with track("markdown"):
+        return _converter(automaton).convert(text)
+
+
+def render_stamp(automaton=None):
+    """The content_html_version for HTML rendered with ``automaton``."""
+    if automaton is None:
+        return RENDERER_VERSION
+    return f"{RENDERER_VERSION}:glossary-{automaton.digest}"
+
+
+def render_article(doc, automaton=None):
+    """Store rendered HTML and its version stamp on an article document."""
+    doc["content_html"] = render_markdown(doc.get("content", ""), automaton)
+    doc["content_html_version"] = render_stamp(automaton)
+    return doc
+
+
+def is_stale(doc, automaton=None):
+    """True if the article's stored HTML is missing, from another renderer or
+    linked against another glossary vocabulary."""
+    return doc.get("content_html_version") != render_stamp(automaton)
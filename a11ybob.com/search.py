@@ -0,0 +1,261 @@
+"""
+Full-text search backends for the listing pages.
+
+By default searches go to Atlas Search ($search on the *_search indexes). With
+SEARCH_BACKEND=memory they are answered by MemorySearch instead: one in-process
+inverted index per collection, scored with BM25 over the same fields and with
+single-edit fuzzy matching like ``"fuzzy": {"maxEdits": 1}``. It works against
+a plain local mongod and needs no network hop per query.
+"""
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+SEARCH_FIELDS = {
+    "glossary": ["term", "aka", "definition", "category"],
+    "reviews": [
+        "title",
+        "authors",
+        "summary",
+        "key_findings",
+        "tags",
+        "standards_referenced",
+    ],
+    "articles": ["title", "summary", "content", "tags"],
+}
+
+ATLAS_INDEXES = {
+    "glossary": "glossary_search",
+    "reviews": "reviews_search",
+    "articles": "articles_search",
+}
+
+# BM25 parameters (Lucene defaults)
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return " ".join(_text(v) for v in value)
+    return str(value)
+
+
+def _deletions(term):
+    """The term itself plus every variant with one character removed."""
+    return {term} | {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a, b):
+    """True if a and b differ by at most one insert, delete, substitution or
+    transposition of adjacent characters."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    i = 0
+    while i < la and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        return a[i + 1:] == b[i + 1:] or (
+            i + 1 < la and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+        )
+    return a[i:] == b[i + 1:]
+
+
+class InvertedIndex:
+    """BM25-scored inverted index over a fixed set of document fields.
+
+    ``filter_field`` values are kept per document so that search results can
+    be narrowed to a category or tag without another query.
+    """
+
+    def __init__(self, fields, filter_field=None):
+        self.fields = fields
+        self.filter_field = filter_field
+        self._postings = {f: defaultdict(dict) for f in fields}
+        self._lengths = {f: {} for f in fields}
+        self._total_length = dict.fromkeys(fields, 0)
+        self._doc_terms = {}
+        self._filters = {}
+        self._vocabulary = Counter()
+        self._variants = defaultdict(set)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def add(self, doc):
+        """Index ``doc``, replacing any earlier version with the same _id."""
+        doc_id = doc["_id"]
+        with self._lock:
+            self.remove(doc_id)
+            terms = {}
+            for field in self.fields:
+                tokens = tokenize(_text(doc.get(field)))
+                self._lengths[field][doc_id] = len(tokens)
+                self._total_length[field] += len(tokens)
+                counts = Counter(tokens)
+                for term, tf in counts.items():
+                    self._postings[field][term][doc_id] = tf
+                    if not self._vocabulary[term]:
+                        for variant in _deletions(term):
+                            self._variants[variant].add(term)
+                    self._vocabulary[term] += 1
+                terms[field] = list(counts)
+            self._doc_terms[doc_id] = terms
+            if self.filter_field:
+                value = doc.get(self.filter_field) or []
+                self._filters[doc_id] = set(value if isinstance(value, list) else [value])
+
+    def remove(self, doc_id):
+        with self._lock:
+            terms = self._doc_terms.pop(doc_id, None)
+            if terms is None:
+                return
+            self._filters.pop(doc_id, None)
+            for field, field_terms in terms.items():
+                self._total_length[field] -= self._lengths[field].pop(doc_id, 0)
+                postings = self._postings[field]
+                for term in field_terms:
+                    postings[term].pop(doc_id, None)
+                    if not postings[term]:
+                        del postings[term]
+                    self._vocabulary[term] -= 1
+                    if not self._vocabulary[term]:
+                        del self._vocabulary[term]
+                        for variant in _deletions(term):
+                            self._variants[variant].discard(term)
+                            if not self._variants[variant]:
+                                del self._variants[variant]
+
+    def _expand(self, token, fuzzy):
+        """Index terms matching ``token``, each with a similarity weight."""
+        matches = {}
+        if token in self._vocabulary:
+            matches[token] = 1.0
+        if fuzzy:
+            candidates = set()
+            for variant in _deletions(token):
+                candidates |= self._variants.get(variant, set())
+            for term in candidates:
+                if term in matches or not _within_one_edit(token, term):
+                    continue
+                # Lucene's fuzzy similarity: 1 - edits / shorter length
+                weight = 1.0 - 1.0 / min(len(token), len(term))
+                if weight > 0:
+                    matches[term] = weight
+        return matches
+
+    def search(self, query, filter_value=None, fuzzy=True):
+        """Return matching document ids, best match first."""
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if not n_docs:
+                return []
+            scores = defaultdict(float)
+            for token in set(tokenize(query)):
+                for term, weight in self._expand(token, fuzzy).items():
+                    for field in self.fields:
+                        postings = self._postings[field].get(term)
+                        if not postings:
+                            continue
+                        idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                        avg_length = self._total_length[field] / n_docs or 1
+                        lengths = self._lengths[field]
+                        for doc_id, tf in postings.items():
+                            norm = K1 * (1 - B + B * lengths[doc_id] / avg_length)
+                            scores[doc_id] += weight * idf * tf * (K1 + 1) / (tf + norm)
+            if filter_value is not None:
+                scores = {
+                    doc_id: score
+                    for doc_id, score in scores.items()
+                    if filter_value in self._filters.get(doc_id, ())
+                }
+        return sorted(scores, key=lambda doc_id: (-scores[doc_id], str(doc_id)))
+
+
+class MemorySearch:
+    """In-process search backend with one InvertedIndex per collection.
+
+    Indexes are built from MongoDB on first use. When the VersionTracker
+    shows that another process changed a collection, a background thread
+    rebuilds its index and swaps it in whole; searches keep using the old one
+    until then. Admin writes in this process update them incrementally
+    through apply_change().
+    """
+
+    def __init__(self, db, filter_fields, tracker):
+        self.db = db
+        self.filter_fields = filter_fields
+        self.tracker = tracker
+        self._indexes = {}
+        self._built_version = {}
+        self._rebuilding = set()
+        self._lock = threading.Lock()
+
+    def _build(self, collection):
+        fields = SEARCH_FIELDS[collection]
+        filter_field = self.filter_fields.get(collection)
+        index = InvertedIndex(fields, filter_field)
+        projection = dict.fromkeys(fields + ([filter_field] if filter_field else []), 1)
+        for doc in self.db[collection].find({}, projection):
+            index.add(doc)
+        return index
+
+    def index(self, collection):
+        version = self.tracker.current().get(collection, 0)
+        with self._lock:
+            index = self._indexes.get(collection)
+            if index is None:
+                # First use: there is no older index to answer from
+                index = self._indexes[collection] = self._build(collection)
+                self._built_version[collection] = version
+            elif self._built_version.get(collection) != version:
+                if collection not in self._rebuilding:
+                    self._rebuilding.add(collection)
+                    threading.Thread(
+                        target=self._rebuild, args=(collection, version), daemon=True
+                    ).start()
+            return index
+
+    def _rebuild(self, collection, version):
+        try:
+            index = self._build(collection)
+            with self._lock:
+                self._indexes[collection] = index
+                self._built_version[collection] = version
+        finally:
+            with self._lock:
+                self._rebuilding.discard(collection)
+
+    def search(self, collection, query, filter_value=None):
+        """Ranked _ids of ``collection`` documents matching ``query``."""
+        return self.index(collection).search(query, filter_value)
+
+    def apply_change(self, collection, old, new, version):
+        """Mirror an admin create, edit or delete that produced ``version``."""
+        with self._lock:
+            index = self._indexes.get(collection)
+            if index is None:
+                return
+            if new is not None:
+                index.add(new)
+            elif old is not None:
+                index.remove(old["_id"])
+            # Still current only if no other process wrote in between
+            if self._built_version.get(collection) == version - 1:
+                self._built_version[collection] = version
@@ -0,0 +1,103 @@
+"""
+Benchmark glossary auto-linking against vocabulary size and text length.
+
+Usage:
+    python seed/bench_autolink.py
+    python seed/bench_autolink.py --terms 5000 --max-chars 400000
+
+Builds a synthetic vocabulary, links generated HTML of doubling lengths and
+prints the time per thousand characters. The per-character cost should stay
+flat as the text grows; the script exits non-zero if the largest text costs
+more than twice as much per character as the smallest. No database needed.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autolink import Automaton
+
+WORDS = (
+    "accessible focus contrast landmark keyboard label caption audio video "
+    "switch voice zoom motion braille speech reading order target pointer "
+    "heading table form error status alert dialog menu tab link image text"
+).split()
+
+
+def vocabulary(count, rng):
+    patterns = {}
+    while len(patterns) < count:
+        length = rng.choice((1, 2, 2, 3))
+        name = " ".join(rng.choice(WORDS) + str(rng.randrange(100)) for _ in range(length))
+        patterns.setdefault(name, str(len(patterns)))
+    return patterns
+
+
+def document(chars, patterns, rng):
+    names = list(patterns)
+    parts = []
+    size = 0
+    while size < chars:
+        roll = rng.random()
+        if roll < 0.1:
+            piece = f"<p>{rng.choice(names).upper()}</p>"
+        elif roll < 0.15:
+            piece = f'<a href="/x">{rng.choice(names)}</a> '
+        elif roll < 0.2:
+            piece = f"<code>{rng.choice(names)}</code> "
+        else:
+            piece = rng.choice(WORDS) + " "
+        parts.append(piece)
+        size += len(piece)
+    return "".join(parts)
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--terms", type=int, default=5000, help="vocabulary size")
+    parser.add_argument("--min-chars", type=int, default=10000)
+    parser.add_argument("--max-chars", type=int, default=320000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    patterns = vocabulary(args.terms, rng)
+    start = time.perf_counter()
+    automaton = Automaton(patterns)
+    print(f"Built automaton for {len(automaton)} names in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"{'chars':>10} {'links':>7} {'ms':>9} {'us/1k chars':>12}")
+    costs = []
+    chars = args.min_chars
+    while chars <= args.max_chars:
+        text = document(chars, patterns, rng)
+        elapsed = best_of(lambda: automaton.link_html(text), args.repeat)
+        links = automaton.link_html(text).count('class="glossary-link"')
+        cost = elapsed / len(text) * 1e9
+        costs.append(cost)
+        print(f"{len(text):>10} {links:>7} {elapsed * 1000:>9.2f} {cost:>12.1f}")
+        chars *= 2
+
+    ratio = costs[-1] / costs[0]
+    print(f"Largest/smallest cost per character: {ratio:.2f}")
+    if ratio > 2:
+        print("Linking is not linear in text length.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
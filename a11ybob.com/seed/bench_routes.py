@@ -0,0 +1,391 @@
+"""
+Benchmark the public routes at several corpus sizes.
+
+Usage:
+    python seed/bench_routes.py
+    python seed/bench_routes.py --sizes 1000,10000,100000 --requests 300
+    python seed/bench_routes.py --only glossary_index,article_detail
+    python seed/bench_routes.py --update-baseline
+
+For each size a corpus from ``seed/generate_corpus.py`` is loaded into its
+own database (MONGO_DB with a ``_bench_<size>`` suffix, reused on later runs
+unless --regenerate), and the app is driven through Flask's test client in a
+separate process per size, so each run binds the app to its own database.
+
+Every route is measured on its first page, a deep page (numbered, which
+skips, and by cursor) and a filtered page; glossary_term on the term with the
+most related terms, glossary_suggest on a prefix and a typo of its name, and
+article_detail on the longest article, both from stored HTML and re-rendered
+on every request. The response cache is off and content versions are re-read
+once an hour, so each request does the route's full work and round-trip
+counts are exact.
+
+Reported per case: p50/p95/p99 latency, throughput for one client and for
+--threads concurrent clients, and round trips (MongoDB commands per request,
+counted with a pymongo CommandListener).
+
+Results are compared with ``seed/bench_routes_baseline.json``. A latency
+percentile more than the tolerance above its baseline, throughput more than
+the tolerance below it, any extra round trip, or a size or case with no
+baseline fails the run. The committed file holds the round trips for the
+default sizes, which do not depend on the machine; add latency and
+throughput by running --update-baseline on the reference machine.
+
+Needs a local mongod (MONGO_URI, default mongodb://localhost:27017); the
+in-memory MongoDB doubles do not implement $unionWith, which every listing
+page uses.
+"""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, monitoring
+
+load_dotenv()
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.environ.get("MONGO_DB", "a11y_paradise")
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "bench_routes_baseline.json")
+DEFAULT_SIZES = "1000,10000"
+DEFAULT_TOLERANCE = 0.25
+
+# Metric: True if higher is better, False if lower is better, None if exact
+METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "rps": True,
+    "rps_concurrent": True,
+    "round_trips": None,
+}
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def corpus_counts(size):
+    return {"glossary": size, "reviews": size, "articles": max(1, size // 10)}
+
+
+def bench_db_name(size):
+    return f"{MONGO_DB}_bench_{size}"
+
+
+# --- Measuring (child process) ---
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts every command sent to MongoDB by this process."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _at_offset(collection, sort, offset, fields):
+    return next(
+        collection.find({}, dict.fromkeys(fields, 1)).sort(sort).skip(offset).limit(1),
+        None,
+    )
+
+
+def build_cases(db):
+    """(name, url, reset) for every benchmarked request.
+
+    ``reset`` runs untimed before each request, or is None.
+    """
+    from app import ARTICLES_PER_PAGE, GLOSSARY_PER_PAGE, REVIEWS_PER_PAGE
+    from listing import encode_cursor, with_tiebreaker
+
+    cases = []
+
+    def listing_cases(route, collection, path, sort, per_page, facet_param):
+        total = db[collection].count_documents({})
+        deep = max(1, math.ceil(total / per_page) * 9 // 10)
+        cases.append((f"{route} first", path, None))
+        cases.append((f"{route} deep-page", f"{path}?page={deep}", None))
+        sort = with_tiebreaker(sort)
+        doc = _at_offset(db[collection], sort, (deep - 1) * per_page, [f for f, _ in sort])
+        if doc:
+            cursor = encode_cursor(sort, doc)
+            cases.append((f"{route} deep-cursor", f"{path}?after={cursor}", None))
+        top = db.facets.find_one({"collection": collection}, sort=[("count", -1)])
+        if top:
+            query = urlencode({facet_param: top["value"]})
+            cases.append((f"{route} filtered", f"{path}?{query}", None))
+
+    listing_cases("glossary_index", "glossary", "/glossary", [("term", 1)],
+                  GLOSSARY_PER_PAGE, "category")
+    hub = next(db.glossary.aggregate([
+        {"$project": {"term": 1, "n": {"$size": {"$ifNull": ["$related", []]}}}},
+        {"$sort": {"n": -1, "_id": 1}},
+        {"$limit": 1},
+    ]), None)
+    if hub:
+        query = hub["term"].split()[0]
+        cases.append(("glossary_index search", f"/glossary?{urlencode({'q': query})}", None))
+        cases.append(("glossary_term hub", f"/glossary/{hub['_id']}", None))
+        # Typeahead: a short prefix, and a typo that needs the fuzzy fallback
+        prefix = query[:3]
+        typo = query[0] + query[2] + query[1] + query[3:] if len(query) > 3 else query
+        for label, text in (("prefix", prefix), ("fuzzy", typo)):
+            url = f"/glossary/suggest?{urlencode({'q': text})}"
+            cases.append((f"glossary_suggest {label}", url, None))
+
+    listing_cases("reviews_index", "reviews", "/reviews", [("_id", -1)],
+                  REVIEWS_PER_PAGE, "tag")
+    reviews = db.reviews.count_documents({})
+    review = _at_offset(db.reviews, [("_id", 1)], reviews // 2, ["_id"])
+    if review:
+        cases.append(("review_detail median", f"/reviews/{review['_id']}", None))
+
+    listing_cases("articles_index", "articles", "/articles", [("published_date", -1)],
+                  ARTICLES_PER_PAGE, "tag")
+    longest = next(db.articles.aggregate([
+        {"$project": {"slug": 1, "n": {"$strLenCP": {"$ifNull": ["$content", ""]}}}},
+        {"$sort": {"n": -1, "_id": 1}},
+        {"$limit": 1},
+    ]), None)
+    if longest:
+        url = f"/articles/{longest['slug']}"
+
+        def make_stale(article_id=longest["_id"]):
+            db.articles.update_one({"_id": article_id}, {"$unset": {"content_html_version": 1}})
+
+        cases.append(("article_detail longest", url, None))
+        cases.append(("article_detail longest-render", url, make_stale))
+    return cases
+
+
+def measure(app, counter, url, reset, requests, warmup, threads):
+    client = app.test_client()
+
+    def get():
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+
+    for _ in range(warmup):
+        if reset:
+            reset()
+        get()
+
+    latencies = []
+    trips = []
+    for _ in range(requests):
+        if reset:
+            reset()
+        before = counter.count
+        start = time.perf_counter()
+        get()
+        latencies.append(time.perf_counter() - start)
+        trips.append(counter.count - before)
+    latencies.sort()
+
+    result = {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "rps": round(len(latencies) / sum(latencies), 1),
+        "round_trips": max(trips),
+    }
+
+    # Resetting between concurrent requests would race, so re-render cases
+    # only report single-client throughput.
+    if reset is None and threads > 1:
+        def worker(count):
+            own = app.test_client()
+            for _ in range(count):
+                own.get(url)
+
+        share = max(1, requests // threads)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(worker, [share] * threads))
+        result["rps_concurrent"] = round(share * threads / (time.perf_counter() - start), 1)
+    return result
+
+
+def run_size(size, args):
+    """Benchmark one corpus size in this process and print JSON results."""
+    os.environ.update(
+        MONGO_DB=bench_db_name(size),
+        RESPONSE_CACHE_MAX_BYTES="0",
+        CONTENT_VERSION_CHECK_SECONDS="3600",
+        SEARCH_BACKEND=args.search_backend,
+    )
+    counter = CommandCounter()
+    # Registered before the app creates its client, so it sees every command
+    monitoring.register(counter)
+    from app import app, db
+
+    only = set(filter(None, args.only.split(",")))
+    results = {}
+    for name, url, reset in build_cases(db):
+        if only and name.split()[0] not in only:
+            continue
+        log(f"  {name}: {url[:80]}")
+        results[name] = measure(app, counter, url, reset, args.requests,
+                                args.warmup, args.threads)
+    print(json.dumps(results))
+
+
+# --- Orchestrating (parent process) ---
+
+
+def ensure_corpus(client, size, seed, regenerate, workers):
+    import generate_corpus
+
+    db = client[bench_db_name(size)]
+    counts = corpus_counts(size)
+    current = {c: db[c].estimated_document_count() for c in counts}
+    if current == counts and not regenerate:
+        return
+    client.drop_database(db.name)
+    generate_corpus.generate(MONGO_URI, db.name, counts, seed, workers, log=log)
+
+
+def regressions(results, baseline, tolerance):
+    problems = []
+    for size, cases in results.items():
+        base_cases = baseline.get("sizes", {}).get(size)
+        if not base_cases:
+            problems.append(f"size {size}: no baseline (record one with --update-baseline)")
+            continue
+        for name, metrics in cases.items():
+            base = base_cases.get(name)
+            if not base:
+                problems.append(f"size {size}, {name}: no baseline")
+                continue
+            for metric, higher_is_better in METRICS.items():
+                if metric not in metrics or metric not in base:
+                    continue
+                value, expected = metrics[metric], base[metric]
+                if higher_is_better is None:
+                    worse = value > expected
+                elif higher_is_better:
+                    worse = value < expected * (1 - tolerance)
+                else:
+                    worse = value > expected * (1 + tolerance)
+                if worse:
+                    problems.append(f"size {size}, {name}: {metric} {value} (baseline {expected})")
+    return problems
+
+
+def print_table(size, cases, threads):
+    print(f"\nCorpus size {size}")
+    print(f"{'case':<34} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'req/s':>8} {f'req/s x{threads}':>10} {'trips':>6}")
+    for name, m in cases.items():
+        concurrent = m.get("rps_concurrent")
+        print(f"{name:<34} {m['p50_ms']:>8.2f} {m['p95_ms']:>8.2f} {m['p99_ms']:>8.2f} "
+              f"{m['rps']:>8.1f} {'-' if concurrent is None else f'{concurrent:.1f}':>10} "
+              f"{m['round_trips']:>6}")
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_FILE):
+        return {"tolerance": DEFAULT_TOLERANCE, "sizes": {}}
+    with open(BASELINE_FILE) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="comma-separated corpus sizes (glossary terms and reviews)")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per case")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per case")
+    parser.add_argument("--threads", type=int, default=4,
+                        help="concurrent clients for the throughput run")
+    parser.add_argument("--only", default="", help="comma-separated route names to run")
+    parser.add_argument("--search-backend", default="memory", choices=("memory", "atlas"))
+    parser.add_argument("--seed", type=int, default=1, help="corpus random seed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="corpus generating processes")
+    parser.add_argument("--regenerate", action="store_true",
+                        help="rebuild the benchmark corpora even if present")
+    parser.add_argument("--tolerance", type=float,
+                        help="allowed relative latency/throughput regression "
+                             "(default: the baseline file's, else 0.25)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write these results to the baseline file instead of comparing")
+    parser.add_argument("--child-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_size:
+        run_size(args.child_size, args)
+        return
+
+    client = MongoClient(MONGO_URI)
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        ensure_corpus(client, size, args.seed, args.regenerate, args.workers)
+        log(f"Benchmarking corpus size {size}...")
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child-size", str(size),
+             "--requests", str(args.requests), "--warmup", str(args.warmup),
+             "--threads", str(args.threads), "--only", args.only,
+             "--search-backend", args.search_backend],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        if child.returncode:
+            sys.exit(f"Benchmark for size {size} failed.")
+        results[str(size)] = json.loads(child.stdout.strip().splitlines()[-1])
+        print_table(size, results[str(size)], args.threads)
+
+    baseline = load_baseline()
+    if args.update_baseline:
+        for size, cases in results.items():
+            baseline.setdefault("sizes", {}).setdefault(size, {}).update(cases)
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {BASELINE_FILE}")
+        return
+
+    tolerance = args.tolerance
+    if tolerance is None:
+        tolerance = baseline.get("tolerance", DEFAULT_TOLERANCE)
+    problems = regressions(results, baseline, tolerance)
+    if problems:
+        print(f"\nRegressions (tolerance {tolerance:.0%}):")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark how quickly a fresh process can serve its first request.
+
+Usage:
+    python seed/bench_startup.py
+    python seed/bench_startup.py --runs 20 --max-ms 400
+
+Starts new Python processes, as gunicorn does for every worker it spawns or
+recycles, and times in each: importing the app, loading every template, and
+serving the home page. Runs alternate between an empty Jinja bytecode cache
+(a first deploy) and one filled by the previous run (a recycled or autoscaled
+worker). Also lists heavy modules loaded by then, which should only be
+imported when a request needs them. Exits non-zero if the median warm start
+takes longer than --max-ms. No database needed.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules a worker should not need before its first request
+HEAVY_MODULES = ("markdown", "numpy", "matplotlib", "networkx")
+
+STAGES = ("interpreter", "import", "templates", "first_request", "total")
+
+
+def child(started):
+    """Runs in the benchmarked process; prints its timings as JSON."""
+    imported = time.time()
+    sys.path.insert(0, APP_DIR)
+    from app import app, compile_templates
+
+    loaded = time.time()
+    compile_templates()
+    compiled = time.time()
+    response = app.test_client().get("/")
+    served = time.time()
+    print(
+        json.dumps(
+            {
+                "status": response.status_code,
+                "interpreter": imported - started,
+                "import": loaded - imported,
+                "templates": compiled - loaded,
+                "first_request": served - compiled,
+                "total": served - started,
+                "heavy": sorted(m for m in HEAVY_MODULES if m in sys.modules),
+            }
+        )
+    )
+
+
+def run_child(cache_dir):
+    env = dict(
+        os.environ,
+        JINJA_CACHE_DIR=cache_dir,
+        METRICS_DIR=os.path.join(cache_dir, "metrics"),
+        RESPONSE_CACHE_MAX_BYTES="0",
+    )
+    started = time.time()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", repr(started)],
+        env=env,
+        cwd=APP_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _ms(values):
+    return f"{statistics.median(values) * 1000:7.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=10, help="processes per mode")
+    parser.add_argument(
+        "--max-ms", type=float, default=0, help="fail above this median warm start (0: no limit)"
+    )
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(float(args.child))
+        return
+
+    results = {"cold": [], "warm": []}
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            results["cold"].append(run_child(cache_dir))
+            results["warm"].append(run_child(cache_dir))
+
+    print(f"{'mode':<6}" + "".join(f"{stage:>15}" for stage in STAGES) + "   (median ms)")
+    for mode, runs in results.items():
+        print(f"{mode:<6}" + "".join(f"{_ms([r[s] for r in runs]):>15}" for s in STAGES))
+    statuses = {r["status"] for runs in results.values() for r in runs}
+    heavy = sorted({m for runs in results.values() for r in runs for m in r["heavy"]})
+    print(f"first request statuses: {sorted(statuses)}")
+    print(f"heavy modules loaded: {', '.join(heavy) or 'none'}")
+
+    warm = statistics.median(r["total"] for r in results["warm"]) * 1000
+    if args.max_ms and warm > args.max_ms:
+        print(f"FAIL: median warm start {warm:.1f} ms exceeds {args.max_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
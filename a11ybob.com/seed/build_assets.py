@@ -0,0 +1,38 @@
+"""
+Fingerprint and precompress the static assets.
+
+Usage:
+    python seed/build_assets.py
+
+Writes content-hashed copies of everything in static/ to static/build/, with
+gzip and (when the brotli package is installed) brotli versions alongside,
+and the manifest the app uses to resolve url_for('static', ...). Run it on
+every deploy before starting the app; workers read the manifest at startup.
+No database needed.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import assets
+
+
+def main():
+    manifest = assets.build()
+    build_dir = os.path.join(assets.STATIC_DIR, assets.BUILD_DIR)
+    for path, target in sorted(manifest.items()):
+        target_file = os.path.join(assets.STATIC_DIR, *target.split("/"))
+        sizes = [f"{os.path.getsize(target_file)} bytes"]
+        for encoding, suffix in assets.ENCODINGS:
+            if os.path.exists(target_file + suffix):
+                sizes.append(f"{encoding} {os.path.getsize(target_file + suffix)}")
+        print(f"{path} -> {target} ({', '.join(sizes)})")
+    if assets.brotli is None:
+        print("brotli is not installed; only gzip versions were written")
+    print(f"Wrote {len(manifest)} assets to {build_dir}")
+
+
+if __name__ == "__main__":
+    main()
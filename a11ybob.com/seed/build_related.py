@@ -0,0 +1,59 @@
+"""
+Rebuild the related-content recommendations shown on detail pages.
+
+Usage:
+    python seed/build_related.py
+    python seed/build_related.py --k 8 --features 8192
+
+Fits TF-IDF weights over every glossary term, review and article, stores
+each document's nearest neighbours on it, saves every document's vector and
+bumps the content versions of the collections that changed, so cached pages
+are refreshed. Admin edits keep recommendations current from the saved model
+and vectors; run this after bulk imports and periodically so new vocabulary
+is picked up. Vectors are held sparse and compared a block at a time, so
+memory grows with the corpus's nonzero term weights, not documents x
+features.
+
+Requires MONGO_URI and MONGO_DB environment variables (or uses defaults).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+import related
+import versions
+
+load_dotenv()
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.environ.get("MONGO_DB", "a11y_paradise")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--k", type=int, default=related.TOP_K, help="recommendations per document")
+    parser.add_argument(
+        "--features", type=int, default=related.MAX_FEATURES, help="vocabulary size limit"
+    )
+    args = parser.parse_args()
+
+    db = MongoClient(MONGO_URI)[MONGO_DB]
+    start = time.perf_counter()
+    changed = related.rebuild(db, k=args.k, max_features=args.features, log=print)
+    for collection in sorted(changed):
+        versions.bump(db, collection)
+    print(
+        f"Recommendations rebuilt in {time.perf_counter() - start:.1f}s; "
+        f"changed: {', '.join(sorted(changed)) or 'none'}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Compile every template into the Jinja bytecode cache ahead of time.
+
+Usage:
+    python seed/compile_templates.py
+
+Fills JINJA_CACHE_DIR (see config.py) so the first worker started after a
+deploy loads compiled templates instead of compiling them on its first
+requests. Run it in the build step, after the static assets are built; stale
+entries are ignored, since the cache is keyed on each template's source.
+No database needed.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, compile_templates
+
+
+def main():
+    directory = app.config["JINJA_CACHE_DIR"]
+    if app.jinja_env.bytecode_cache is None:
+        sys.exit(f"Bytecode cache disabled or not writable: {directory!r}")
+    start = time.perf_counter()
+    compile_templates()
+    elapsed = time.perf_counter() - start
+    count = len(app.jinja_env.list_templates())
+    print(f"Compiled {count} templates into {directory} in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
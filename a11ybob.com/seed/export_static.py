@@ -0,0 +1,395 @@
+"""
+Export the public site to static HTML files.
+
+Usage:
+    python seed/export_static.py OUTPUT_DIR              # incremental when possible
+    python seed/export_static.py OUTPUT_DIR --full       # re-render everything
+    python seed/export_static.py OUTPUT_DIR --workers 8
+
+The home and about pages, every glossary, review and article detail page and
+every listing page a visitor can reach without searching are rendered
+through the Flask app by a pool of worker processes, and static/ is copied
+alongside. Listing pages are enumerated rather than crawled: each listing
+unfiltered, per facet value as tag and category links reach it, and per facet
+value and sort order its filter form offers. Each gets its numbered pages up
+to the app's NUMBERED_PAGE_LIMIT; beyond that the pages link by
+``?after=``/``?before=`` cursors, so the chain of cursor links is followed
+from the last numbered page and exported as it is reached (sorts that cannot
+seek by cursor, such as reviews by author, number every page). Search results
+(``?q=...``) and the admin are not exported.
+
+A page is written to ``<path>/index.html``, or to ``<path>/index-<query>.html``
+for its query string as a browser sends it (the filter form's
+``/reviews?q=&tag=wcag&sort=newest`` becomes
+``reviews/index-q=&tag=wcag&sort=newest.html``). Serve the directory with a
+rule that tries that file and otherwise proxies to the app, e.g. for nginx:
+
+    location / {
+        set $static_page $uri/index.html;
+        if ($args) {
+            set $static_page $uri/index-$args.html;
+        }
+        try_files $static_page $uri @app;
+    }
+
+Incremental runs re-render only the detail pages of documents modified since
+the last export (glossary cascades touch the terms that refer to a renamed or
+deleted term) and the listing pages of the affected collections; pages of
+deleted documents are removed. A glossary vocabulary change re-renders every
+article and review (they link glossary terms), and a template or renderer
+change forces a full export.
+
+Requires MONGO_URI and MONGO_DB environment variables (or uses defaults).
+"""
+
+import argparse
+import html
+import json
+import math
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from urllib.parse import quote, urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATE_FILE = ".export-state.json"
+
+LISTING_PATHS = {
+    "glossary": "/glossary",
+    "reviews": "/reviews",
+    "articles": "/articles",
+}
+
+# Pages whose text links glossary terms (see autolink.py)
+LINKED_COLLECTIONS = ("reviews", "articles")
+
+# The filter form fields of each listing page, in form order
+LISTING_FORMS = {
+    "glossary": ("q", "category"),
+    "reviews": ("q", "tag", "sort"),
+    "articles": ("q", "tag", "sort"),
+}
+
+# Pagination links past the numbered pages (see templates/pagination.html)
+_CURSOR_LINK = re.compile(r'href="([^"]*(?:[?;])(?:after|before)=[^"]*)"')
+
+# Longest file name most filesystems accept
+NAME_MAX = 255
+
+_client = None
+
+
+# --- Worker processes ---
+
+
+def _init_worker():
+    global _client
+    # Each page is rendered once; the response cache would only cost memory
+    os.environ["RESPONSE_CACHE_MAX_BYTES"] = "0"
+    from app import app
+
+    _client = app.test_client()
+
+
+def _render(url):
+    """Render one URL; return (url, status, body)."""
+    response = _client.get(url)
+    return url, response.status_code, response.get_data()
+
+
+# --- Paths and URLs ---
+
+
+def output_path(url):
+    """Relative file path that a page URL is exported to."""
+    parts = urlsplit(url)
+    base = parts.path.strip("/")
+    # Encode the query the way a browser would send it
+    query = quote(parts.query, safe="!#$&'()*+,/:;=?@[]~%-._")
+    name = f"index-{query}.html" if query else "index.html"
+    return os.path.join(base, name)
+
+
+def detail_url(collection, doc):
+    if collection == "articles":
+        return f"/articles/{doc['slug']}"
+    return f"{LISTING_PATHS[collection]}/{doc['_id']}"
+
+
+def _pages(count, per_page):
+    return max(1, math.ceil(count / per_page))
+
+
+def listing_urls(db, collection):
+    """Every numbered listing page URL of ``collection`` reachable without
+    searching; render_all(follow=True) adds the cursor pages after them.
+
+    Facet links and form submissions are encoded as url_for() and a browser
+    encode them; numbered page links are built as app.url_for_page() builds
+    them from those arguments.
+    """
+    from app import (
+        ARTICLE_SORTS,
+        ARTICLES_PER_PAGE,
+        GLOSSARY_PER_PAGE,
+        NUMBERED_PAGE_LIMIT,
+        REVIEW_SORTS,
+        REVIEWS_PER_PAGE,
+    )
+    from facets import FACET_FIELDS
+    from listing import KEYSET_FIELDS
+
+    path = LISTING_PATHS[collection]
+    per_page = {
+        "glossary": GLOSSARY_PER_PAGE,
+        "reviews": REVIEWS_PER_PAGE,
+        "articles": ARTICLES_PER_PAGE,
+    }[collection]
+    sorts = {"reviews": REVIEW_SORTS, "articles": ARTICLE_SORTS}.get(
+        collection, {None: ("term", 1)}
+    )
+    # Links without a sort argument get the listing's default order
+    default = "newest" if collection in ("reviews", "articles") else None
+
+    def numbered(count, sort):
+        # Sorts that cannot seek by cursor number every page (see fetch_page)
+        pages = _pages(count, per_page)
+        field = sorts[sort or default][0]
+        return min(pages, NUMBERED_PAGE_LIMIT) if field in KEYSET_FIELDS else pages
+
+    facet = LISTING_FORMS[collection][1]
+    counts = {"": db[collection].count_documents({})}
+    for row in db.facets.find(
+        {"collection": collection, "field": FACET_FIELDS[collection], "count": {"$gt": 0}}
+    ):
+        counts[row["value"]] = row["count"]
+
+    urls = [path]
+    for value, count in counts.items():
+        # Tag and category links on cards and detail pages, then the form
+        variants = [[(facet, value)]] if value else [[]]
+        for sort in sorts:
+            variants.append([("q", ""), (facet, value)] + ([("sort", sort)] if sort else []))
+        for fields in variants:
+            if fields:
+                urls.append(f"{path}?{urlencode(fields)}")
+            raw = "".join(f"{k}={v}&" for k, v in fields)
+            sort = dict(fields).get("sort")
+            urls += [f"{path}?{raw}page={n}" for n in range(1, numbered(count, sort) + 1)]
+    return urls
+
+
+# --- Render ---
+
+
+def cursor_links(body):
+    """The cursor pagination URLs a rendered page links to."""
+    return [html.unescape(href) for href in _CURSOR_LINK.findall(body.decode())]
+
+
+def render_all(executor, urls, out_dir, follow=False):
+    """Render ``urls`` and write their files; with ``follow``, also every
+    page reached through their cursor pagination links.
+
+    Returns the set of relative file paths written.
+    """
+    seen = set(urls)
+    pending = {executor.submit(_render, url) for url in seen}
+    written = set()
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            url, status, body = future.result()
+            if status != 200:
+                print(f"  skipped {url} ({status})")
+                continue
+            if follow:
+                for link in cursor_links(body):
+                    if link not in seen:
+                        seen.add(link)
+                        pending.add(executor.submit(_render, link))
+            path = output_path(url)
+            if len(os.path.basename(path)) > NAME_MAX:
+                print(f"  skipped {url} (file name too long)")
+                continue
+            full = os.path.join(out_dir, path)
+            os.makedirs(os.path.dirname(full), exist_ok=True)
+            with open(full, "wb") as f:
+                f.write(body)
+            written.add(path)
+    return written
+
+
+# --- State ---
+
+
+def load_state(out_dir):
+    try:
+        with open(os.path.join(out_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(out_dir, state):
+    with open(os.path.join(out_dir, STATE_FILE), "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+
+
+def snapshot(db):
+    """Map each collection to {id: name} for every current document."""
+    fields = {"glossary": "term", "reviews": "title", "articles": "slug"}
+    return {
+        collection: {
+            str(doc["_id"]): doc.get(field, "")
+            for doc in db[collection].find({}, {field: 1})
+        }
+        for collection, field in fields.items()
+    }
+
+
+def changed_since(db, collection, since):
+    """Documents modified at or after ``since`` (an aware datetime)."""
+    return list(
+        db[collection].find(
+            {
+                "$or": [
+                    {"modified": {"$gte": since}},
+                    # Documents saved before precise timestamps existed
+                    {"modified": {"$exists": False},
+                     "updated": {"$gte": since.strftime("%Y-%m-%d")}},
+                ]
+            }
+        )
+    )
+
+
+# --- Export ---
+
+
+def _copy_static(out_dir):
+    from app import app
+
+    target = os.path.join(out_dir, "static")
+    shutil.rmtree(target, ignore_errors=True)
+    shutil.copytree(app.static_folder, target)
+
+
+def _remove(out_dir, paths):
+    for path in paths:
+        try:
+            os.remove(os.path.join(out_dir, path))
+        except FileNotFoundError:
+            pass
+
+
+def full_export(executor, db, out_dir):
+    urls = ["/", "/about"]
+    for collection in LISTING_PATHS:
+        for doc in db[collection].find({}, {"slug": 1}):
+            urls.append(detail_url(collection, doc))
+    written = render_all(executor, urls, out_dir)
+
+    listing_files = {}
+    for collection in LISTING_PATHS:
+        pages = render_all(executor, listing_urls(db, collection), out_dir, follow=True)
+        listing_files[collection] = sorted(pages)
+        written |= pages
+    return written, listing_files
+
+
+def incremental_export(executor, db, out_dir, state, current, relinked=False):
+    since = datetime.fromisoformat(state["exported_at"])
+    seeds = set()
+    dirty = set()
+    for collection in LISTING_PATHS:
+        previous = state["documents"].get(collection, {})
+        if relinked and collection in LINKED_COLLECTIONS:
+            changed = list(db[collection].find({}, {"slug": 1}))
+        else:
+            changed = changed_since(db, collection, since)
+        deleted = set(previous) - set(current[collection])
+        for doc in changed:
+            seeds.add(detail_url(collection, doc))
+        for doc_id in deleted:
+            if collection == "articles":
+                path = output_path(f"/articles/{previous[doc_id]}")
+            else:
+                path = output_path(f"{LISTING_PATHS[collection]}/{doc_id}")
+            _remove(out_dir, [path])
+        # A renamed article leaves its old slug's page behind
+        if collection == "articles":
+            for doc in changed:
+                old_slug = previous.get(str(doc["_id"]))
+                if old_slug and old_slug != doc.get("slug"):
+                    _remove(out_dir, [output_path(f"/articles/{old_slug}")])
+        if changed or deleted:
+            dirty.add(collection)
+
+    written = render_all(executor, sorted(seeds), out_dir)
+
+    listing_files = dict(state["listing_files"])
+    for collection in sorted(dirty):
+        pages = render_all(executor, listing_urls(db, collection), out_dir, follow=True)
+        _remove(out_dir, set(listing_files.get(collection, [])) - pages)
+        listing_files[collection] = sorted(pages)
+        written |= pages
+    return written, listing_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output", help="directory to write the static site to")
+    parser.add_argument("--full", action="store_true",
+                        help="re-render every page even if an earlier export exists")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="number of rendering processes")
+    args = parser.parse_args()
+
+    import autolink
+    from app import app, db
+    from conditional import TEMPLATE_VERSION
+
+    out_dir = os.path.abspath(args.output)
+    os.makedirs(out_dir, exist_ok=True)
+    started = datetime.now(timezone.utc)
+    current = snapshot(db)
+    vocabulary = autolink.build(db, app.config["GLOSSARY_LINK_PREFIX"]).digest
+    state = None if args.full else load_state(out_dir)
+    if state and state.get("template_version") != TEMPLATE_VERSION:
+        print("Templates changed since the last export; rendering everything.")
+        state = None
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(args.workers, mp_context=context,
+                             initializer=_init_worker) as executor:
+        if state:
+            written, listing_files = incremental_export(
+                executor, db, out_dir, state, current,
+                relinked=state.get("vocabulary") != vocabulary,
+            )
+        else:
+            written, listing_files = full_export(executor, db, out_dir)
+    _copy_static(out_dir)
+
+    save_state(
+        out_dir,
+        {
+            "template_version": TEMPLATE_VERSION,
+            "vocabulary": vocabulary,
+            "exported_at": started.isoformat(),
+            "documents": current,
+            "listing_files": listing_files,
+        },
+    )
+    mode = "incremental" if state else "full"
+    print(f"Wrote {len(written)} page(s) to {out_dir} ({mode} export).")
+
+
+if __name__ == "__main__":
+    main()
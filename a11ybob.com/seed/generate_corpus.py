@@ -0,0 +1,424 @@
+"""
+Generate a large synthetic corpus for load and capacity testing.
+
+Usage:
+    python seed/generate_corpus.py --scale 10000 --drop
+    python seed/generate_corpus.py --glossary 50000 --reviews 200000 --articles 20000 --drop
+    python seed/generate_corpus.py --scale 1000000 --workers 8 --seed 7 --drop
+
+--scale sets the number of glossary terms and reviews, with one article per
+ten of them; the per-collection options override it. The same --seed always
+produces the same documents, _ids included, so cursors, page boundaries and
+timings can be compared between runs and machines.
+
+Distributions are skewed the way real content is: tags, categories and
+authors follow Zipf-like popularity, related terms attach preferentially to a
+few hub terms (about 1% of references are left dangling), author lists are
+mostly short with a long tail, publication years lean recent, and article
+length is log-normal with a long tail. Articles mention glossary terms so the
+auto-linker has work to do; their HTML is rendered on first view or by
+``seed/render_articles.py``.
+
+Batches are generated and inserted by a pool of worker processes, each with
+its own connection. Indexes, facet counts and content versions are brought
+up to date at the end. --drop also drops the facet counts and the
+related-content model and vectors, which describe the old corpus; content versions are
+bumped rather than dropped, so validators never repeat an old version. Run
+``seed/build_related.py`` for recommendations on the new corpus.
+
+Requires MONGO_URI and MONGO_DB environment variables (or uses defaults).
+"""
+
+import argparse
+import hashlib
+import math
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.environ.get("MONGO_DB", "a11y_paradise")
+
+BATCH_SIZE = 1000
+COLLECTIONS = ("glossary", "reviews", "articles")
+
+# Collections derived from the content, dropped along with it
+DERIVED = ("facets", "related_model", "related_vectors")
+
+# Range of creation (for articles, publication) dates per collection
+CREATED_YEARS = {
+    "glossary": (2018, 2025),
+    "reviews": (2015, 2025),
+    "articles": (2010, 2025),
+}
+
+# No generated timestamp is later than this, whatever the run date
+LATEST = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+# --- Vocabulary ---
+
+MODIFIERS = """
+accessible adaptive alternative assistive audio automated braille captioned
+cognitive colour compliant conformance contextual descriptive dynamic
+error focus forced haptic inclusive interactive keyboard landmark live
+logical mobile motor navigable non-text perceivable programmatic reading
+reflow responsive screen semantic sensory sequential skip spatial speech
+switch tactile textual timed touch visual voice
+""".split()
+
+NOUNS = """
+name role value label region state announcement contrast indicator order
+target alternative transcript caption description heading landmark link
+button control widget dialog menu table form input error message status
+notification pattern gesture shortcut zoom magnifier reader display cursor
+outline timeout animation motion flash sequence structure hierarchy list
+relationship instruction identifier purpose language direction orientation
+""".split()
+
+CATEGORIES = """
+standards assistive-technology design development testing law cognition
+vision hearing mobility speech documents mobile web media organisations
+""".split()
+
+TAGS = """
+wcag aria screen-readers usability testing mobile cognitive low-vision
+deaf captions keyboard forms colour-contrast pdf education e-commerce
+government healthcare older-adults voice-control switch-access games
+maps data-visualisation authoring-tools procurement law-and-policy
+machine-learning overlays automated-testing user-research design-systems
+""".split()
+
+STANDARDS = [
+    "WCAG 2.0", "WCAG 2.1", "WCAG 2.2", "WAI-ARIA 1.2", "Section 508",
+    "EN 301 549", "ATAG 2.0", "UAAG 2.0", "PDF/UA", "ISO 14289", "ADA",
+    "AODA", "EAA",
+]
+
+FIRST_NAMES = """
+Alex Sam Jordan Maria Wei Aisha Tomas Priya Kenji Fatima Liam Noor Elena
+Diego Hana Omar Chloe Ravi Ingrid Kwame Mei Lucas Zara Ivan Amara Felix
+""".split()
+
+LAST_NAMES = """
+Smith Chen Garcia Okafor Nakamura Kowalski Patel Johansson Haddad Silva
+Nguyen Müller Rossi Kim Mensah Dubois Ahmed Novak O'Brien Tanaka Costa
+Fischer Ibrahim Larsen Moreau Reyes Singh Walker Yilmaz Zhang
+""".split()
+
+VENUES = [
+    "ACM Transactions on Accessible Computing", "ASSETS", "CHI",
+    "Universal Access in the Information Society", "Disability and Rehabilitation",
+    "Journal of Usability Studies", "W4A", "ICCHP", "Behaviour & Information Technology",
+    "International Journal of Human-Computer Studies",
+]
+
+WORDS = """
+the a of to and in for with users people study results interface content
+page support design evaluation participants method approach barrier access
+technology systems tasks performance found showed reported improved reduced
+significant common often may can should must while when across through
+between during without compared higher lower more less each most many
+developers designers testers guidance criteria requirements implementation
+""".split()
+
+
+def _zipf_index(rng, n, s=1.1):
+    """Index in [0, n) with Zipf-like popularity: low indexes are common."""
+    return min(n - 1, int(n ** rng.random() ** s) - 1) if n > 1 else 0
+
+
+def _some(rng, pool, mean, cap):
+    """A few distinct items from ``pool``, popular ones more often."""
+    count = min(cap, len(pool), 1 + int(rng.expovariate(1 / max(mean - 1, 0.01))))
+    picked = []
+    while len(picked) < count:
+        item = pool[_zipf_index(rng, len(pool))]
+        if item not in picked:
+            picked.append(item)
+    return picked
+
+
+def created_at(seed, collection, i):
+    """When document ``i`` was created; derivable without generating it."""
+    rng = random.Random(f"{seed}:{collection}:{i}:created")
+    return _date(rng, *CREATED_YEARS[collection])
+
+
+def doc_id(seed, collection, i):
+    """A deterministic ObjectId carrying the document's creation time."""
+    when = created_at(seed, collection, i)
+    tail = hashlib.blake2b(f"{seed}:{collection}:{i}".encode(), digest_size=8).digest()
+    return ObjectId(struct.pack(">I", int(when.timestamp())) + tail)
+
+
+def term_name(i):
+    """The ``i``-th glossary term name; unique for every i."""
+    name = f"{MODIFIERS[i % len(MODIFIERS)]} {NOUNS[(i // len(MODIFIERS)) % len(NOUNS)]}"
+    round_ = i // (len(MODIFIERS) * len(NOUNS))
+    return f"{name} {round_ + 1}" if round_ else name
+
+
+def _sentence(rng, terms=None, words=(8, 22)):
+    length = rng.randint(*words)
+    out = [rng.choice(WORDS) for _ in range(length)]
+    if terms and rng.random() < 0.6:
+        out.insert(rng.randrange(len(out)), term_name(_zipf_index(rng, terms)))
+    text = " ".join(out)
+    return text[0].upper() + text[1:] + "."
+
+
+def _paragraph(rng, terms=None, sentences=(2, 6)):
+    return " ".join(_sentence(rng, terms) for _ in range(rng.randint(*sentences)))
+
+
+def _date(rng, start_year, end_year, recent_bias=2.0):
+    # Later dates are more likely, as publication volume grows over time
+    span = (datetime(end_year, 12, 31) - datetime(start_year, 1, 1)).days
+    offset = int(span * rng.random() ** (1 / recent_bias))
+    return datetime(start_year, 1, 1, tzinfo=timezone.utc) + timedelta(days=offset)
+
+
+def _stamps(rng, created):
+    updated = min(LATEST, created + timedelta(days=int(rng.expovariate(1 / 60))))
+    return {
+        "created": created.strftime("%Y-%m-%d"),
+        "updated": updated.strftime("%Y-%m-%d"),
+        "modified": updated,
+    }
+
+
+# --- Documents ---
+
+
+def glossary_doc(rng, seed, i, total):
+    created = created_at(seed, "glossary", i)
+    name = term_name(i)
+    related = []
+    for _ in range(min(total - 1, int(rng.expovariate(1 / 3)))):
+        # Preferential attachment: low-numbered terms become hubs
+        j = _zipf_index(rng, total, 1.6)
+        if j != i and all(r["i"] != j for r in related):
+            related.append({"i": j})
+    related_terms = [term_name(r["i"]) for r in related]
+    if rng.random() < 0.01:
+        related_terms.append(f"{rng.choice(MODIFIERS)} {rng.choice(WORDS)}")
+    doc = {
+        "_id": doc_id(seed, "glossary", i),
+        "term": name,
+        # Hyphenated spellings ("screen-reader") as aliases
+        "aka": [name.replace(" ", "-")] if rng.random() < 0.3 else [],
+        "definition": _paragraph(rng, total, (1, 4)),
+        "category": _some(rng, CATEGORIES, 1.6, 4),
+        "related_terms": related_terms,
+        "related": sorted(
+            (
+                {"_id": doc_id(seed, "glossary", r["i"]), "term": term_name(r["i"])}
+                for r in related
+            ),
+            key=lambda entry: entry["term"],
+        ),
+        "sources": [f"https://example.org/glossary/{i}"] if rng.random() < 0.5 else [],
+    }
+    doc.update(_stamps(rng, created))
+    return doc
+
+
+def review_doc(rng, seed, i, terms):
+    created = created_at(seed, "reviews", i)
+    year = _date(rng, 1995, 2025, recent_bias=3.0).year
+    authors = [
+        f"{FIRST_NAMES[_zipf_index(rng, len(FIRST_NAMES))]} "
+        f"{LAST_NAMES[_zipf_index(rng, len(LAST_NAMES))]}"
+        for _ in range(min(12, 1 + int(rng.expovariate(1 / 2))))
+    ]
+    doc = {
+        "_id": doc_id(seed, "reviews", i),
+        "title": _sentence(rng, terms, (5, 14)).rstrip("."),
+        "authors": list(dict.fromkeys(authors)),
+        "year": year,
+        "publication": rng.choice(VENUES),
+        "doi": f"10.5555/synthetic.{seed}.{i}",
+        "tags": _some(rng, TAGS, 3, 8),
+        "standards_referenced": _some(rng, STANDARDS, 1.5, 5) if rng.random() < 0.7 else [],
+        "summary": _paragraph(rng, terms, (2, 6)),
+        "key_findings": _paragraph(rng, terms, (1, 5)),
+        "relevance": _paragraph(rng, terms, (1, 2)),
+        "rating": rng.choices([1, 2, 3, 4, 5], weights=[1, 3, 8, 12, 6])[0],
+    }
+    doc.update(_stamps(rng, created))
+    return doc
+
+
+def article_doc(rng, seed, i, terms):
+    published = created_at(seed, "articles", i)
+    title = _sentence(rng, terms, (4, 10)).rstrip(".")
+    # Log-normal length: median around 1,000 words, a few over 10,000
+    words = max(150, min(40000, int(rng.lognormvariate(math.log(1000), 0.8))))
+    sections = []
+    size = 0
+    while size < words:
+        if sections and rng.random() < 0.15:
+            sections.append(f"## {_sentence(rng, terms, (2, 6)).rstrip('.')}")
+        roll = rng.random()
+        if roll < 0.08:
+            items = "\n".join(f"- {_sentence(rng, terms, (3, 10))}" for _ in range(rng.randint(2, 6)))
+            sections.append(items)
+        elif roll < 0.11:
+            sections.append(f'```html\n<button aria-label="{rng.choice(NOUNS)}">{rng.choice(WORDS)}</button>\n```')
+        else:
+            sections.append(_paragraph(rng, terms))
+        size += len(sections[-1].split())
+    slug_words = "-".join(w.strip(".").lower() for w in title.split()[:6])
+    doc = {
+        "_id": doc_id(seed, "articles", i),
+        "title": title,
+        "slug": f"{slug_words}-{i}",
+        "author": rng.choice(["Bob Dodd"] * 4 + [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"]),
+        "published_date": published.strftime("%Y-%m-%d"),
+        "tags": _some(rng, TAGS, 2.5, 6),
+        "summary": _sentence(rng, terms, (12, 30)),
+        "content": "\n\n".join(sections),
+    }
+    doc.update(_stamps(rng, published))
+    return doc
+
+
+GENERATORS = {
+    "glossary": glossary_doc,
+    "reviews": review_doc,
+    "articles": article_doc,
+}
+
+
+# --- Workers ---
+
+_db = None
+
+
+def _init_worker(uri, name):
+    global _db
+    _db = MongoClient(uri)[name]
+
+
+def generate_batch(collection, seed, start, count, terms):
+    """Build documents ``start`` .. ``start + count - 1`` of ``collection``.
+
+    Each document has its own random stream, so output does not depend on
+    batch size or worker count.
+    """
+    make = GENERATORS[collection]
+    docs = []
+    for i in range(start, start + count):
+        rng = random.Random(f"{seed}:{collection}:{i}")
+        docs.append(make(rng, seed, i, terms))
+    return docs
+
+
+def _insert_batch(collection, seed, start, count, terms):
+    docs = generate_batch(collection, seed, start, count, terms)
+    _db[collection].insert_many(docs, ordered=False)
+    return collection, len(docs)
+
+
+def _post_process(db, log=print):
+    import facets
+    import indexes
+    import versions
+    from autolink import VOCABULARY
+
+    log("Ensuring indexes...")
+    indexes.ensure_indexes(db)
+    log("Rebuilding facet counts...")
+    for collection in facets.FACET_FIELDS:
+        facets.rebuild(db, collection)
+    # Running app processes drop their caches and in-process indexes
+    for name in COLLECTIONS + (VOCABULARY,):
+        versions.bump(db, name)
+
+
+def drop(db):
+    """Drop the content collections and the data derived from them."""
+    for collection in COLLECTIONS + DERIVED:
+        db[collection].drop()
+
+
+def generate(uri, name, counts, seed=1, workers=None, batch_size=BATCH_SIZE, log=print):
+    """Insert ``counts`` documents per collection into database ``name`` at
+    ``uri`` and bring its indexes, facet counts and content versions up to
+    date."""
+    db = MongoClient(uri)[name]
+    terms = max(1, counts["glossary"])
+    tasks = [
+        (collection, seed, start, min(batch_size, total - start), terms)
+        for collection, total in counts.items()
+        for start in range(0, total, batch_size)
+    ]
+    log(f"Generating {counts['glossary']} terms, {counts['reviews']} reviews and "
+        f"{counts['articles']} articles with seed {seed}...")
+
+    started = time.monotonic()
+    done = dict.fromkeys(COLLECTIONS, 0)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers or os.cpu_count() or 2, mp_context=context,
+                             initializer=_init_worker,
+                             initargs=(uri, name)) as executor:
+        futures = [executor.submit(_insert_batch, *task) for task in tasks]
+        for n, future in enumerate(as_completed(futures), 1):
+            collection, inserted = future.result()
+            done[collection] += inserted
+            if n % 50 == 0 or n == len(futures):
+                rate = sum(done.values()) / (time.monotonic() - started)
+                log(f"  {dict(done)} ({rate:,.0f} docs/s)")
+
+    _post_process(db, log)
+    return time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1000,
+                        help="glossary terms and reviews to create (articles: scale / 10)")
+    parser.add_argument("--glossary", type=int, help="glossary terms to create")
+    parser.add_argument("--reviews", type=int, help="reviews to create")
+    parser.add_argument("--articles", type=int, help="articles to create")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="number of generating processes")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--drop", action="store_true",
+                        help="drop existing content and derived data first")
+    args = parser.parse_args()
+
+    counts = {
+        "glossary": args.glossary if args.glossary is not None else args.scale,
+        "reviews": args.reviews if args.reviews is not None else args.scale,
+        "articles": args.articles if args.articles is not None else max(1, args.scale // 10),
+    }
+
+    db = MongoClient(MONGO_URI)[MONGO_DB]
+    if args.drop:
+        drop(db)
+    elif any(db[c].estimated_document_count() for c in COLLECTIONS):
+        sys.exit("The database already has content; rerun with --drop to replace it.")
+
+    elapsed = generate(MONGO_URI, MONGO_DB, counts, args.seed, args.workers, args.batch_size)
+    print(f"Done in {elapsed:.1f}s. Article HTML renders on first view, "
+          "or run: python seed/render_articles.py; for recommendations run "
+          "python seed/build_related.py")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Bulk import and export of glossary terms, reviews and articles.
+
+Usage:
+    python seed/import_export.py import glossary terms.ndjson
+    python seed/import_export.py import reviews reviews.csv
+    python seed/import_export.py export articles articles.ndjson
+    python seed/import_export.py export glossary - --format csv   # to stdout
+
+Records are validated with the admin form rules and upserted in batches keyed
+on term (glossary), doi (reviews) or slug (articles); rejected records are
+listed with their line numbers. Use ``-`` to read stdin or write stdout. The
+format follows the file extension unless --format is given. See bulk.py for
+the record layout.
+
+Requires MONGO_URI and MONGO_DB environment variables (or uses defaults).
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bulk
+
+
+def run_import(app, db, collection, path, fmt):
+    from admin import VALIDATORS, record_bulk_change
+
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8-sig", newline="")
+    with stream, app.app_context():
+        try:
+            report = bulk.import_records(
+                db,
+                collection,
+                bulk.read_records(stream, fmt),
+                VALIDATORS[collection],
+                automaton=app.config["glossary_links"].current(),
+            )
+        finally:
+            # Earlier batches are written even if the file fails part-way
+            record_bulk_change(db, collection)
+    for error in report.errors:
+        key = f" ({error['key']})" if error["key"] else ""
+        print(f"line {error['line']}{key}: {' '.join(error['messages'])}", file=sys.stderr)
+    if len(report.errors) < report.failed:
+        print(f"... and {report.failed - len(report.errors)} more.", file=sys.stderr)
+    print(report.summary(), file=sys.stderr)
+    return 1 if report.failed else 0
+
+
+def run_export(db, collection, path, fmt):
+    stream = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+    with stream:
+        for chunk in bulk.export_chunks(db, collection, fmt):
+            stream.write(chunk)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("collection", choices=sorted(bulk.FIELDS))
+    parser.add_argument("path", help="file to read or write, or - for stdin/stdout")
+    parser.add_argument("--format", choices=bulk.FORMATS,
+                        help="record format (default: from the file extension)")
+    args = parser.parse_args()
+
+    from app import app, db
+
+    fmt = args.format or bulk.format_for(args.path)
+    if args.action == "import":
+        sys.exit(run_import(app, db, args.collection, args.path, fmt))
+    sys.exit(run_export(db, args.collection, args.path, fmt))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Index registry for the MongoDB collections the site queries.
+
+Usage:
+    python seed/indexes.py              # create or reconcile B-tree indexes
+    python seed/indexes.py --prune      # ...and drop indexes not listed here
+    python seed/indexes.py --search     # ...and Atlas Search indexes (Atlas only)
+    python seed/indexes.py --verify     # explain every route query shape
+
+--verify exits non-zero if any query shape the routes issue is planned with a
+COLLSCAN or an in-memory SORT.
+
+Requires MONGO_URI and MONGO_DB environment variables (or uses defaults).
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient
+from pymongo.errors import OperationFailure
+
+import listing
+from facets import facet_pipeline
+from projections import view
+from search import ATLAS_INDEXES, SEARCH_FIELDS
+
+load_dotenv()
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.environ.get("MONGO_DB", "a11y_paradise")
+
+# Listing sorts always end in an _id tiebreaker (see listing.with_tiebreaker),
+# so every sortable field is indexed together with _id, with and without the
+# facet field in front for the filtered listings.
+INDEXES = {
+    "glossary": [
+        IndexModel([("term", ASCENDING), ("_id", ASCENDING)], name="term_id"),
+        # One document per term, which bulk imports upsert by (see bulk.py)
+        IndexModel([("term", ASCENDING)], name="term_unique", unique=True),
+        IndexModel(
+            [("category", ASCENDING), ("term", ASCENDING), ("_id", ASCENDING)],
+            name="category_term_id",
+        ),
+        # Cascading renames and deletes of related terms
+        IndexModel([("related._id", ASCENDING)], name="related_id"),
+        IndexModel([("related_terms", ASCENDING)], name="related_terms"),
+        # Documents recommending an edited one (see related.py)
+        IndexModel([("related_content._id", ASCENDING)], name="related_content_id"),
+    ],
+    "reviews": [
+        IndexModel([("tags", ASCENDING), ("_id", DESCENDING)], name="tags_id"),
+        IndexModel([("year", ASCENDING), ("_id", ASCENDING)], name="year_id"),
+        IndexModel(
+            [("tags", ASCENDING), ("year", ASCENDING), ("_id", ASCENDING)],
+            name="tags_year_id",
+        ),
+        IndexModel([("title", ASCENDING), ("_id", ASCENDING)], name="title_id"),
+        IndexModel(
+            [("tags", ASCENDING), ("title", ASCENDING), ("_id", ASCENDING)],
+            name="tags_title_id",
+        ),
+        IndexModel([("authors", ASCENDING), ("_id", ASCENDING)], name="authors_id"),
+        # Bulk import upserts and export order (see bulk.py)
+        IndexModel([("doi", ASCENDING), ("_id", ASCENDING)], name="doi_id"),
+        # Reviews without a DOI are not import keys, so they may repeat
+        IndexModel(
+            [("doi", ASCENDING)],
+            name="doi_unique",
+            unique=True,
+            partialFilterExpression={"doi": {"$gt": ""}},
+        ),
+        IndexModel([("related_content._id", ASCENDING)], name="related_content_id"),
+    ],
+    "articles": [
+        IndexModel([("slug", ASCENDING)], name="slug_unique", unique=True),
+        IndexModel(
+            [("published_date", ASCENDING), ("_id", ASCENDING)],
+            name="published_date_id",
+        ),
+        IndexModel(
+            [("tags", ASCENDING), ("published_date", ASCENDING), ("_id", ASCENDING)],
+            name="tags_published_date_id",
+        ),
+        IndexModel([("title", ASCENDING), ("_id", ASCENDING)], name="title_id"),
+        IndexModel(
+            [("tags", ASCENDING), ("title", ASCENDING), ("_id", ASCENDING)],
+            name="tags_title_id",
+        ),
+        IndexModel([("related_content._id", ASCENDING)], name="related_content_id"),
+    ],
+    "facets": [
+        IndexModel(
+            [("collection", ASCENDING), ("field", ASCENDING), ("value", ASCENDING)],
+            name="collection_field_value",
+            unique=True,
+        ),
+    ],
+    # Stored vectors sharing a term with an edited document (see related.py)
+    "related_vectors": [
+        IndexModel([("terms", ASCENDING)], name="terms"),
+    ],
+}
+
+
+SEARCH_INDEXES = {
+    collection: {
+        "name": ATLAS_INDEXES[collection],
+        "definition": {
+            "mappings": {
+                "dynamic": False,
+                "fields": {name: {"type": "string"} for name in fields},
+            }
+        },
+    }
+    for collection, fields in SEARCH_FIELDS.items()
+}
+
+
+# --- Reconcile ---
+
+
+def _spec(info):
+    return (
+        list(info["key"]),
+        bool(info.get("unique", False)),
+        info.get("partialFilterExpression"),
+    )
+
+
+def ensure_indexes(db, prune=False, log=print):
+    """Create missing indexes and rebuild ones whose definition changed.
+
+    Returns the number of indexes that could not be created.
+    """
+    failures = 0
+    for collection, models in INDEXES.items():
+        coll = db[collection]
+        existing = coll.index_information()
+        wanted = set()
+        for model in models:
+            doc = model.document
+            name = doc["name"]
+            wanted.add(name)
+            spec = (
+                list(doc["key"].items()),
+                bool(doc.get("unique", False)),
+                doc.get("partialFilterExpression"),
+            )
+            if name in existing:
+                if _spec(existing[name]) == spec:
+                    continue
+                log(f"{collection}: rebuilding {name} (definition changed)")
+                coll.drop_index(name)
+            try:
+                coll.create_indexes([model])
+                log(f"{collection}: created {name}")
+            except OperationFailure as e:
+                failures += 1
+                log(f"{collection}: could not create {name}: {e}")
+
+        for name in existing:
+            if name == "_id_" or name in wanted:
+                continue
+            if prune:
+                coll.drop_index(name)
+                log(f"{collection}: dropped unmanaged index {name}")
+            else:
+                log(f"{collection}: unmanaged index {name} (use --prune to drop)")
+    return failures
+
+
+def ensure_search_indexes(db, log=print):
+    """Create or update the Atlas Search indexes. Atlas clusters only."""
+    for collection, index in SEARCH_INDEXES.items():
+        coll = db[collection]
+        try:
+            current = {i["name"]: i for i in coll.list_search_indexes()}
+            if index["name"] not in current:
+                coll.create_search_index(index)
+                log(f"{collection}: created search index {index['name']}")
+            elif current[index["name"]].get("latestDefinition") != index["definition"]:
+                coll.update_search_index(index["name"], index["definition"])
+                log(f"{collection}: updated search index {index['name']}")
+        except OperationFailure as e:
+            log(f"{collection}: search indexes unavailable ({e.details.get('errmsg', e)})")
+            return
+
+
+# --- Verify ---
+
+# Representative cursor positions for the keyset query shapes
+CURSOR_SAMPLES = {
+    "_id": ObjectId(),
+    "term": "M",
+    "title": "M",
+    "year": 2010,
+    "published_date": "2020-01-01",
+}
+
+
+class _Named:
+    """Stand-in collection for building pipelines without a database."""
+
+    def __init__(self, name):
+        self.name = name
+
+
+def query_shapes():
+    """Yield (collection, label, command, allowed) for every route query.
+
+    ``command`` is an explainable find or aggregate command document;
+    ``allowed`` lists plan stages that are expected for that shape.
+    """
+    from app import (
+        ARTICLES_PER_PAGE,
+        ARTICLE_SORTS,
+        GLOSSARY_PER_PAGE,
+        REVIEWS_PER_PAGE,
+        REVIEW_SORTS,
+    )
+
+    listings = [
+        ("glossary", "category", "accessibility", {"term": ("term", 1)},
+         GLOSSARY_PER_PAGE),
+        ("reviews", "tags", "wcag", REVIEW_SORTS, REVIEWS_PER_PAGE),
+        ("articles", "tags", "wcag", ARTICLE_SORTS, ARTICLES_PER_PAGE),
+    ]
+    for collection, facet_field, sample, sorts, per_page in listings:
+        for sort_name, sort in sorts.items():
+            sort = listing.with_tiebreaker([sort])
+            allowed = ()
+            if sort[0][0] == "authors":
+                # Sorting on an array field is not served by a multikey index
+                allowed = ("SORT",)
+            for match in (None, {facet_field: sample}):
+                where = f"{facet_field}={sample}" if match else "all"
+                values = [CURSOR_SAMPLES.get(f) for f, _ in sort]
+                for mode, seek in (
+                    ("page", None),
+                    ("cursor", listing.keyset_filter(sort, values)),
+                ):
+                    if seek is not None and not all(
+                        f in listing.KEYSET_FIELDS for f, _ in sort
+                    ):
+                        continue
+                    pipeline = listing.build_pipeline(
+                        _Named(collection),
+                        page=2,
+                        per_page=per_page,
+                        match=match,
+                        sort=sort,
+                        seek=seek,
+                        count=False,
+                    )
+                    yield (
+                        collection,
+                        f"{mode} sort={sort_name} {where}",
+                        {"aggregate": collection, "pipeline": pipeline, "cursor": {}},
+                        allowed,
+                    )
+            # Unfiltered counts read collection stats; filtered ones use indexes
+            yield (
+                collection,
+                f"count {facet_field}={sample}",
+                {
+                    "aggregate": collection,
+                    "pipeline": listing.count_pipeline({facet_field: sample}, None),
+                    "cursor": {},
+                },
+                (),
+            )
+        yield (
+            "facets",
+            f"facets for {collection}",
+            {
+                "aggregate": "facets",
+                "pipeline": facet_pipeline(collection, "values"),
+                "cursor": {},
+            },
+            (),
+        )
+
+    from admin import ADMIN_LISTS, ADMIN_PER_PAGE
+
+    for collection, options in ADMIN_LISTS.items():
+        for field in options["sorts"]:
+            sort = listing.with_tiebreaker([(field, -1)])
+            for where, match in (
+                ("all", None),
+                ("prefix", listing.prefix_filter(options["prefix"], "Ac")),
+            ):
+                # A prefix on another column is matched first, then sorted
+                allowed = ("SORT",) if match and field != options["prefix"] else ()
+                pipeline = listing.build_pipeline(
+                    _Named(collection),
+                    page=2,
+                    per_page=ADMIN_PER_PAGE,
+                    match=match,
+                    sort=sort,
+                    count=False,
+                    projection=view(collection, "admin"),
+                )
+                yield (
+                    collection,
+                    f"admin sort={field} {where}",
+                    {"aggregate": collection, "pipeline": pipeline, "cursor": {}},
+                    allowed,
+                )
+
+    yield (
+        "glossary",
+        "related-term cascade",
+        {"find": "glossary", "filter": {"related._id": ObjectId()}},
+        (),
+    )
+    yield (
+        "glossary",
+        "related-term names",
+        {"find": "glossary", "filter": {"related_terms": "WCAG"}},
+        (),
+    )
+    for collection in ("glossary", "reviews", "articles"):
+        yield (
+            collection,
+            "related-content references",
+            {"find": collection, "filter": {"related_content._id": ObjectId()}},
+            (),
+        )
+    yield (
+        "related_vectors",
+        "related-content candidates",
+        {"find": "related_vectors", "filter": {"terms": {"$in": [0, 1]}}},
+        (),
+    )
+    yield ("reviews", "bulk upsert by doi",
+           {"find": "reviews", "filter": {"doi": "10.1000/example"}}, ())
+    yield ("articles", "detail by slug",
+           {"find": "articles", "filter": {"slug": "example"}}, ())
+
+
+def _plan_problems(node, found):
+    if isinstance(node, dict):
+        if node.get("stage") in ("COLLSCAN", "SORT"):
+            found.add(node["stage"])
+        if "$sort" in node:
+            # A $sort left in the pipeline was not absorbed by an index scan
+            found.add("SORT")
+        for key, value in node.items():
+            if key not in ("command", "slotBasedPlan", "rejectedPlans"):
+                _plan_problems(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            _plan_problems(value, found)
+    return found
+
+
+def verify(db, log=print):
+    """Explain every query shape; return the number of failing shapes."""
+    failures = 0
+    for collection, label, command, allowed in query_shapes():
+        explain = db.command({"explain": command, "verbosity": "queryPlanner"})
+        problems = _plan_problems(explain, set()) - set(allowed)
+        if problems:
+            failures += 1
+            log(f"FAIL {collection}: {label} -> {', '.join(sorted(problems))}")
+        else:
+            log(f"ok   {collection}: {label}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prune", action="store_true",
+                        help="drop indexes that are not in the registry")
+    parser.add_argument("--search", action="store_true",
+                        help="also create or update Atlas Search indexes")
+    parser.add_argument("--verify", action="store_true",
+                        help="explain every route query shape instead")
+    args = parser.parse_args()
+
+    db = MongoClient(MONGO_URI)[MONGO_DB]
+    if args.verify:
+        failures = verify(db)
+        print(f"{failures} query shape(s) need an index." if failures
+              else "All query shapes are index-backed.")
+    else:
+        failures = ensure_indexes(db, prune=args.prune)
+        if args.search:
+            ensure_search_indexes(db)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Resolve glossary related-term names to embedded links.
+
+Usage:
+    python seed/link_glossary.py          # relink every term
+    python seed/link_glossary.py --report # list names that match no term
+
+Admin saves keep the ``related`` links current; run this once after upgrading
+and after bulk changes made outside the admin.
+
+Requires MONGO_URI and MONGO_DB environment variables (or uses defaults).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+import glossary
+import versions
+
+load_dotenv()
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.environ.get("MONGO_DB", "a11y_paradise")
+
+
+def main():
+    db = MongoClient(MONGO_URI)[MONGO_DB]
+    if "--report" in sys.argv[1:]:
+        dangling = glossary.dangling_references(db)
+        for doc in dangling:
+            print(f"{doc['term']}: {', '.join(doc['missing'])}")
+        print(f"{len(dangling)} term(s) with dangling related terms.")
+        return
+    changed = glossary.relink_all(db)
+    if changed:
+        versions.bump(db, "glossary")
+    print(f"Relinked {changed} glossary term(s).")
+
+
+if __name__ == "__main__":
+    main()
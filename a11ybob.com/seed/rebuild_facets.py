@@ -0,0 +1,37 @@
+"""
+Rebuild the materialized facet counts used by the listing filter dropdowns.
+
+Usage:
+    python seed/rebuild_facets.py
+
+Admin edits keep the counts current incrementally; run this to recover after
+bulk changes made outside the admin or if the counts ever drift.
+
+Requires MONGO_URI and MONGO_DB environment variables (or uses defaults).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+import facets
+
+load_dotenv()
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.environ.get("MONGO_DB", "a11y_paradise")
+
+
+def main():
+    db = MongoClient(MONGO_URI)[MONGO_DB]
+    for collection in facets.FACET_FIELDS:
+        count = facets.rebuild(db, collection)
+        print(f"{collection}: {count} {facets.FACET_FIELDS[collection]} value(s).")
+
+
+if __name__ == "__main__":
+    main()
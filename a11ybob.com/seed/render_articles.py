@@ -0,0 +1,85 @@
+"""
+Re-render stored article HTML after a Markdown or renderer upgrade, or after
+glossary changes outside the admin.
+
+Usage:
+    python seed/render_articles.py          # only articles with a stale stamp
+    python seed/render_articles.py --all    # every article
+
+Requires MONGO_URI and MONGO_DB environment variables (or uses defaults);
+set GLOSSARY_LINK_PREFIX as the app has it.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+import autolink
+import versions
+from rendering import render_article, render_stamp
+
+load_dotenv()
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.environ.get("MONGO_DB", "a11y_paradise")
+GLOSSARY_LINK_PREFIX = os.environ.get("GLOSSARY_LINK_PREFIX", autolink.LINK_PREFIX)
+
+BATCH_SIZE = 200
+
+
+def rerender(db, everything=False):
+    """Re-render stale (or all) articles; returns (rewritten, stamp).
+
+    Articles whose HTML changes get a fresh ``modified`` time and the
+    articles content version is bumped, so cached pages and validators
+    follow; an unchanged article only gets the new stamp.
+    """
+    automaton = autolink.build(db, GLOSSARY_LINK_PREFIX)
+    stamp = render_stamp(automaton)
+    query = {} if everything else {"content_html_version": {"$ne": stamp}}
+    cursor = db.articles.find(query, {"content": 1, "content_html": 1})
+
+    updated = 0
+    batch = []
+    for article in cursor:
+        previous = article.get("content_html")
+        render_article(article, automaton)
+        update = {
+            "$set": {
+                "content_html": article["content_html"],
+                "content_html_version": article["content_html_version"],
+            }
+        }
+        if article["content_html"] != previous:
+            update["$currentDate"] = {"modified": True}
+            updated += 1
+        batch.append(UpdateOne({"_id": article["_id"]}, update))
+        if len(batch) >= BATCH_SIZE:
+            db.articles.bulk_write(batch, ordered=False)
+            batch = []
+    if batch:
+        db.articles.bulk_write(batch, ordered=False)
+    if updated:
+        versions.bump(db, "articles")
+    return updated, stamp
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--all", action="store_true", help="re-render every article, not just stale ones"
+    )
+    args = parser.parse_args()
+
+    db = MongoClient(MONGO_URI)[MONGO_DB]
+    count, stamp = rerender(db, everything=args.all)
+    print(f"Re-rendered {count} article(s) with renderer {stamp}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,10 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 from pymongo import MongoClient
 
+import facets
+import glossary
+import indexes
+
 load_dotenv()
 
 MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
@@ -170,16 +174,18 @@ def seed():
     # Insert glossary terms
     result = db.glossary.insert_many(glossary_terms)
     print(f"Inserted {len(result.inserted_ids)} glossary terms.")
+    glossary.relink_all(db)
 
     # Insert reviews
     result = db.reviews.insert_many(literature_reviews)
     print(f"Inserted {len(result.inserted_ids)} literature reviews.")
 
-    # Create standard indexes for filtering
-    db.glossary.create_index("term")
-    db.glossary.create_index("category")
-    db.reviews.create_index("tags")
-    db.reviews.create_index([("year", -1)])
+    # Create the indexes the routes rely on (see seed/indexes.py)
+    indexes.ensure_indexes(db)
+
+    # Filter dropdown counts
+    for collection in facets.FACET_FIELDS:
+        facets.rebuild(db, collection)
 
     print("Database seeded successfully.")
     print()
@@ -188,6 +194,9 @@ def seed():
     print("    Fields: term, aka, definition, category (dynamic mapping works too)")
     print("  - Index 'reviews_search' on the 'reviews' collection")
     print("    Fields: title, authors, summary, key_findings, tags, standards_referenced")
+    print("  - Index 'articles_search' on the 'articles' collection")
+    print("    Fields: title, summary, content, tags")
+    print("  or run: python seed/indexes.py --search")
 
 
 if __name__ == "__main__":
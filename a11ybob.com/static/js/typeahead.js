@@ -0,0 +1,157 @@
+/*
+ * Glossary search suggestions: turns a search input with data-suggest-*
+ * attributes into an ARIA combobox with a listbox popup. Typing fetches
+ * suggestions; Up and Down move through them, Enter opens the highlighted
+ * term, Escape closes the list. Enter with nothing highlighted submits the
+ * search form as usual.
+ */
+(function () {
+    "use strict";
+
+    var DELAY_MS = 120;
+
+    function setup(input) {
+        var list = document.getElementById(input.dataset.suggestList);
+        var status = document.getElementById(input.dataset.suggestStatus);
+        var url = input.dataset.suggestUrl;
+        var options = [];
+        var active = -1;
+        var timer = null;
+        var pending = null;
+
+        input.setAttribute("role", "combobox");
+        input.setAttribute("aria-autocomplete", "list");
+        input.setAttribute("aria-controls", list.id);
+        input.setAttribute("aria-expanded", "false");
+
+        function highlight(index) {
+            if (active >= 0) {
+                options[active].element.setAttribute("aria-selected", "false");
+            }
+            active = index;
+            if (active < 0) {
+                input.removeAttribute("aria-activedescendant");
+                return;
+            }
+            var element = options[active].element;
+            element.setAttribute("aria-selected", "true");
+            input.setAttribute("aria-activedescendant", element.id);
+            element.scrollIntoView({ block: "nearest" });
+        }
+
+        function close() {
+            highlight(-1);
+            list.hidden = true;
+            input.setAttribute("aria-expanded", "false");
+        }
+
+        function open() {
+            if (options.length) {
+                list.hidden = false;
+                input.setAttribute("aria-expanded", "true");
+            }
+        }
+
+        function show(results) {
+            highlight(-1);
+            list.textContent = "";
+            options = results.map(function (result, i) {
+                var element = document.createElement("li");
+                element.id = list.id + "-" + i;
+                element.setAttribute("role", "option");
+                element.setAttribute("aria-selected", "false");
+                element.textContent = result.term;
+                if (result.match !== result.term) {
+                    var alias = document.createElement("span");
+                    alias.className = "typeahead-alias";
+                    alias.textContent = " (" + result.match + ")";
+                    element.appendChild(alias);
+                }
+                list.appendChild(element);
+                return { element: element, url: result.url };
+            });
+            status.textContent = options.length
+                ? options.length + (options.length === 1 ? " suggestion" : " suggestions") +
+                  " available. Use the up and down arrow keys to review."
+                : "No suggestions.";
+            if (options.length) {
+                open();
+            } else {
+                close();
+            }
+        }
+
+        function fetchSuggestions() {
+            var query = input.value.trim();
+            if (pending) {
+                pending.abort();
+                pending = null;
+            }
+            if (!query) {
+                options = [];
+                list.textContent = "";
+                status.textContent = "";
+                close();
+                return;
+            }
+            pending = new AbortController();
+            fetch(url + "?q=" + encodeURIComponent(query), { signal: pending.signal })
+                .then(function (response) {
+                    return response.ok ? response.json() : { results: [] };
+                })
+                .then(function (data) {
+                    if (data.query === undefined || data.query.trim() === input.value.trim()) {
+                        show(data.results || []);
+                    }
+                })
+                .catch(function () {});
+        }
+
+        input.addEventListener("input", function () {
+            clearTimeout(timer);
+            timer = setTimeout(fetchSuggestions, DELAY_MS);
+        });
+
+        input.addEventListener("keydown", function (event) {
+            if (event.key === "ArrowDown" || event.key === "ArrowUp") {
+                if (!options.length) {
+                    return;
+                }
+                event.preventDefault();
+                if (list.hidden) {
+                    open();
+                }
+                var step = event.key === "ArrowDown" ? 1 : -1;
+                var next = active + step;
+                if (next < -1) {
+                    next = options.length - 1;
+                } else if (next >= options.length) {
+                    next = -1;
+                }
+                highlight(next);
+            } else if (event.key === "Enter" && active >= 0 && !list.hidden) {
+                event.preventDefault();
+                window.location.href = options[active].url;
+            } else if (event.key === "Escape" && !list.hidden) {
+                event.preventDefault();
+                close();
+            }
+        });
+
+        input.addEventListener("blur", close);
+
+        // Keep focus in the input while an option is clicked
+        list.addEventListener("mousedown", function (event) {
+            event.preventDefault();
+        });
+
+        list.addEventListener("click", function (event) {
+            var element = event.target.closest("[role=option]");
+            if (element) {
+                window.location.href = options[Number(element.id.split("-").pop())].url;
+            }
+        });
+    }
+
+    document.querySelectorAll("input[data-suggest-url]").forEach(setup);
+})();
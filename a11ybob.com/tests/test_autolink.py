@@ -0,0 +1,28 @@
+from autolink import Automaton
+
+
+def matches(patterns, text):
+    automaton = Automaton({pattern: pattern for pattern in patterns})
+    return [text[start:end] for start, end, _ in automaton.find(text)]
+
+
+def test_prefers_leftmost_then_longest():
+    assert matches(["screen", "screen reader", "reader"], "a screen reader") == ["screen reader"]
+
+
+def test_whole_words_only():
+    assert matches(["aria"], "variant aria-label") == ["aria"]
+
+
+def test_shorter_match_after_an_overlapping_longer_one():
+    assert matches(["x y z", "z w", "w"], "x y z w") == ["x y z", "w"]
+
+
+def test_overlapping_match_keeps_later_ones():
+    # "b c d" loses to "a b" and must not drop "c" on its way out
+    assert matches(["a b", "c", "b c d"], "a b c d") == ["a b", "c"]
+
+
+def test_folds_escaped_quotes():
+    text = "Fitts&#39;s law and Fitts&rsquo;s law"
+    assert matches(["fitts's law"], text) == ["Fitts&#39;s law", "Fitts&rsquo;s law"]
@@ -0,0 +1,59 @@
+import base64
+
+import pytest
+from bson import ObjectId, json_util
+
+from listing import decode_cursor, encode_cursor, keyset_filter
+
+SORT = [("title", 1), ("_id", 1)]
+
+
+def token(payload):
+    raw = json_util.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def test_round_trip():
+    doc = {"_id": ObjectId(), "title": "Alt text"}
+    assert decode_cursor(SORT, encode_cursor(SORT, doc)) == ["Alt text", doc["_id"]]
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [],
+        ["Alt text"],
+        ["Alt text", ObjectId(), "extra"],
+        {"title": "Alt text"},
+        [{"$gt": ""}, ObjectId()],
+        [["Alt text"], ObjectId()],
+        ["Alt text", "not an id"],
+        None,
+    ],
+)
+def test_rejects_crafted_values(values):
+    assert decode_cursor(SORT, token({"k": ["title", "_id"], "v": values})) is None
+
+
+@pytest.mark.parametrize(
+    "raw",
+    ["", "not base64!", token(["title"]), token({"k": ["year", "_id"], "v": [1, ObjectId()]})],
+)
+def test_rejects_malformed_tokens(raw):
+    assert decode_cursor(SORT, raw) is None
+
+
+def test_rejects_invalid_extended_json():
+    raw = base64.urlsafe_b64encode(b'{"k": ["title", "_id"], "v": ["a", {"$oid": "zz"}]}')
+    assert decode_cursor(SORT, raw.decode()) is None
+
+
+def test_keyset_filter_uses_decoded_values():
+    doc_id = ObjectId()
+    values = decode_cursor(SORT, encode_cursor(SORT, {"_id": doc_id, "title": "B"}))
+    assert keyset_filter(SORT, values) == {
+        "$or": [
+            {"title": {"$gt": "B"}},
+            {"$and": [{"title": "B"}, {"_id": {"$gt": doc_id}}]},
+        ]
+    }
@@ -0,0 +1,200 @@
+"""
+Per-request timing: MongoDB commands, template rendering and Markdown.
+
+CommandTimer is a pymongo command listener on the app's MongoClient. pymongo
+calls it on the thread that sent the command, so each command's duration is
+added to the Flask request that sent it. Template rendering is timed through
+Flask's template signals and Markdown through track(). Times are exclusive:
+a query run while rendering counts as db, and Markdown run from a template
+filter as markdown, not render.
+
+Every response gets a Server-Timing header:
+
+    Server-Timing: db;dur=4.2;desc="3 commands", render;dur=1.9, markdown;dur=0.0, total;dur=7.5
+
+Requests slower than SLOW_REQUEST_MS are logged as one JSON object with the
+shape of each command: field names and operators with every value replaced
+by "?", so no content or user input reaches the log.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+
+from flask import before_render_template, current_app, g, has_request_context, request
+from flask import template_rendered
+from pymongo import monitoring
+
+SPANS = ("render", "markdown")
+
+# Command fields that carry data or driver bookkeeping rather than the query
+_OMITTED_FIELDS = {
+    "documents",
+    "lsid",
+    "$db",
+    "$clusterTime",
+    "$readPreference",
+    "txnNumber",
+    "signature",
+}
+
+
+def shape(value):
+    """``value`` with every scalar replaced by "?" and value lists collapsed."""
+    if isinstance(value, dict):
+        return {key: shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if any(isinstance(item, (dict, list, tuple)) for item in value):
+            return [shape(item) for item in value]
+        return "?"
+    return "?"
+
+
+def command_shape(name, command):
+    """The collection and query shape of a command document."""
+    collection = command.get(name)
+    return {
+        "command": name,
+        "collection": collection if isinstance(collection, str) else None,
+        "shape": {
+            key: shape(value)
+            for key, value in command.items()
+            if key != name and key not in _OMITTED_FIELDS
+        },
+    }
+
+
+class RequestTimings:
+    """Times and commands recorded for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.totals = dict.fromkeys(("db",) + SPANS, 0.0)
+        self.commands = []
+        self._pending = {}
+        self._stack = []
+
+    def command_started(self, event):
+        self._pending[event.request_id] = command_shape(event.command_name, event.command)
+
+    def command_finished(self, event, failed=False):
+        entry = self._pending.pop(event.request_id, None)
+        if entry is None:
+            return
+        seconds = event.duration_micros / 1e6
+        entry["ms"] = round(seconds * 1000, 3)
+        if failed:
+            entry["failed"] = True
+        self.commands.append(entry)
+        self.totals["db"] += seconds
+        if self._stack:
+            self._stack[-1][2] += seconds
+
+    def begin(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def end(self, name):
+        if not self._stack or self._stack[-1][0] != name:
+            return
+        _, start, inner = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self.totals[name] += elapsed - inner
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        parts = [f'db;dur={self.totals["db"] * 1000:.1f};desc="{len(self.commands)} commands"']
+        parts += [f"{name};dur={self.totals[name] * 1000:.1f}" for name in SPANS]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def current():
+    """This request's RequestTimings, or None outside a timed request."""
+    if not has_request_context():
+        return None
+    return g.get("timings")
+
+
+@contextmanager
+def track(name):
+    """Time a block as part of the current request's ``name`` span."""
+    timings = current()
+    if timings is None:
+        yield
+        return
+    timings.begin(name)
+    try:
+        yield
+    finally:
+        timings.end(name)
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Adds each MongoDB command to the request that sent it."""
+
+    def started(self, event):
+        timings = current()
+        if timings is not None:
+            timings.command_started(event)
+
+    def succeeded(self, event):
+        timings = current()
+        if timings is not None:
+            timings.command_finished(event)
+
+    def failed(self, event):
+        timings = current()
+        if timings is not None:
+            timings.command_finished(event, failed=True)
+
+
+def _slow_request_entry(timings, response):
+    return {
+        "event": "slow_request",
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "args": sorted(request.args),
+        "status": response.status_code,
+        "total_ms": round(timings.elapsed() * 1000, 1),
+        **{f"{name}_ms": round(seconds * 1000, 1) for name, seconds in timings.totals.items()},
+        "commands": timings.commands,
+    }
+
+
+def init_app(app):
+    """Time every request to ``app`` and log the slow ones."""
+
+    @app.before_request
+    def start_timing():
+        g.timings = RequestTimings()
+
+    @app.after_request
+    def add_server_timing(response):
+        timings = current()
+        if timings is None:
+            return response
+        response.headers["Server-Timing"] = timings.server_timing()
+        threshold = current_app.config["SLOW_REQUEST_MS"]
+        if threshold > 0 and timings.elapsed() * 1000 >= threshold:
+            current_app.logger.warning(
+                json.dumps(_slow_request_entry(timings, response), default=str)
+            )
+        return response
+
+    def rendering_started(sender, template, context, **extra):
+        timings = current()
+        if timings is not None:
+            timings.begin("render")
+
+    def rendering_finished(sender, template, context, **extra):
+        timings = current()
+        if timings is not None:
+            timings.end("render")
+
+    before_render_template.connect(rendering_started, app, weak=False)
+    template_rendered.connect(rendering_finished, app, weak=False)
@@ -0,0 +1,190 @@
+"""
+Glossary typeahead suggestions from an in-memory prefix index.
+
+Every glossary ``term`` and ``aka`` name is normalized (case-folded, with
+punctuation runs turned into single spaces) and inserted into a trie, along
+with each of its inner word starts, so "reader" finds "Screen Reader". Each
+trie node keeps the best few matches below it, so a lookup costs one walk
+down the query's characters whatever the size of the glossary. Matches rank
+as: names equal to the query, then terms, then aliases starting with it,
+then names with a later word starting with it, alphabetically within each.
+When that leaves room, names one edit (insertion, deletion, substitution or
+transposition) away from the query's prefix fill the rest.
+
+The index changes only when the vocabulary does: Typeahead rebuilds it when
+the VOCABULARY content version moves (see autolink.py), outside the lock
+readers use, and swaps it in whole; requests keep using the previous index
+until then.
+"""
+
+import re
+import threading
+
+from autolink import VOCABULARY
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+MAX_QUERY = 100
+
+# Shorter queries get prefix matches only
+FUZZY_MIN_LENGTH = 3
+
+# Match classes, best first
+EXACT, TERM, ALIAS, WORD = range(4)
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize(text):
+    return _SEPARATORS.sub(" ", text.casefold()).strip()
+
+
+class _Node:
+    __slots__ = ("children", "top", "exact")
+
+    def __init__(self):
+        self.children = {}
+        # Ordinals of the best postings below this node, one per term
+        self.top = []
+        # Ordinals of postings whose whole key ends here
+        self.exact = []
+
+
+class PrefixIndex:
+    """An immutable trie over glossary names, built from (id, term, aka)
+    tuples."""
+
+    def __init__(self, terms, version=0):
+        self.version = version
+        postings = []
+        for position, (term_id, term, aka) in enumerate(terms):
+            names = [(TERM, term)] + [(ALIAS, name) for name in aka or ()]
+            for match, name in names:
+                key = normalize(name or "")
+                if not key:
+                    continue
+                postings.append((match, key, position, name))
+                words = key.split(" ")
+                for start in range(1, len(words)):
+                    postings.append((WORD, " ".join(words[start:]), position, name))
+        postings.sort()
+
+        self.terms = [(term_id, term) for term_id, term, _ in terms]
+        # (term position, matched name) by ordinal, in rank order
+        self.postings = [(position, name) for _, _, position, name in postings]
+        self.root = _Node()
+        seen = {}
+        for ordinal, (_, key, position, _) in enumerate(postings):
+            node = self.root
+            self._keep(node, seen, ordinal, position)
+            for ch in key:
+                child = node.children.get(ch)
+                if child is None:
+                    child = node.children[ch] = _Node()
+                node = child
+                self._keep(node, seen, ordinal, position)
+            if len(node.exact) < MAX_LIMIT:
+                node.exact.append(ordinal)
+
+    @staticmethod
+    def _keep(node, seen, ordinal, position):
+        # Postings arrive in rank order, so the first MAX_LIMIT distinct
+        # terms seen at a node are its best
+        if len(node.top) >= MAX_LIMIT:
+            return
+        terms = seen.setdefault(id(node), set())
+        if position not in terms:
+            terms.add(position)
+            node.top.append(ordinal)
+
+    def _find(self, node, key):
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def _near(self, key):
+        """Nodes for every string one edit away from ``key``."""
+        found = {}
+
+        def add(node):
+            if node is not None:
+                found[id(node)] = node
+
+        node = self.root
+        for i in range(len(key)):
+            rest = key[i + 1 :]
+            add(self._find(node, rest))
+            if i + 1 < len(key):
+                add(self._find(node, key[i + 1] + key[i] + key[i + 2 :]))
+            for ch, child in node.children.items():
+                add(self._find(child, key[i:]))
+                if ch != key[i]:
+                    add(self._find(child, rest))
+            node = node.children.get(key[i])
+            if node is None:
+                break
+        return found.values()
+
+    def suggest(self, query, limit=DEFAULT_LIMIT, fuzzy=True):
+        """Up to ``limit`` (term id, term, matched name) tuples for ``query``."""
+        key = normalize(query[:MAX_QUERY])
+        if not key:
+            return []
+        node = self._find(self.root, key)
+        ordinals = []
+        if node is not None:
+            ordinals = node.exact + node.top
+        results = self._collect(ordinals, limit, set())
+        if fuzzy and len(results) < limit and len(key) >= FUZZY_MIN_LENGTH:
+            near = sorted({o for n in self._near(key) for o in n.top})
+            results += self._collect(near, limit - len(results), {r[0] for r in results})
+        return results
+
+    def _collect(self, ordinals, limit, seen):
+        results = []
+        for ordinal in ordinals:
+            position, name = self.postings[ordinal]
+            term_id, term = self.terms[position]
+            if term_id in seen:
+                continue
+            seen.add(term_id)
+            results.append((term_id, term, name))
+            if len(results) == limit:
+                break
+        return results
+
+
+def build(db, version=0):
+    """A PrefixIndex over the current glossary."""
+    terms = [
+        (str(doc["_id"]), doc.get("term", ""), doc.get("aka") or [])
+        for doc in db.glossary.find({}, {"term": 1, "aka": 1}).sort("term", 1)
+    ]
+    return PrefixIndex(terms, version)
+
+
+class Typeahead:
+    """This process's PrefixIndex, rebuilt when the VOCABULARY version moves."""
+
+    def __init__(self, db, tracker):
+        self.db = db
+        self.tracker = tracker
+        self._index = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        version = self.tracker.current().get(VOCABULARY, 0)
+        index = self._index
+        if index is not None and index.version == version:
+            return index
+        # One thread rebuilds; the others keep answering from the old index
+        if not self._lock.acquire(blocking=index is None):
+            return index
+        try:
+            if self._index is None or self._index.version != version:
+                self._index = build(self.db, version)
+            return self._index
+        finally:
+            self._lock.release()
@@ -0,0 +1,115 @@
+"""
+Per-collection content versions.
+
+Every admin write bumps a counter in the ``content_versions`` collection:
+
+    {"_id": "glossary", "version": 42, "updated_at": datetime}
+
+Anything derived from a whole collection (listing page validators, caches,
+in-process indexes) compares against these instead of inspecting the documents
+themselves. VersionTracker gives each worker process a cheap, periodically
+refreshed view, so a write in one worker invalidates derived data in all.
+"""
+
+import threading
+import time
+from datetime import timezone
+
+from pymongo import ReturnDocument
+
+
+def bump(db, collection):
+    """Increment ``collection``'s version and return the new value."""
+    doc = db.content_versions.find_one_and_update(
+        {"_id": collection},
+        {"$inc": {"version": 1}, "$currentDate": {"updated_at": True}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["version"]
+
+
+def _records(found, collections):
+    versions = {}
+    for collection in collections:
+        doc = found.get(collection, {})
+        updated_at = doc.get("updated_at")
+        if updated_at is not None and updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        versions[collection] = {
+            "version": doc.get("version", 0),
+            "updated_at": updated_at,
+        }
+    return versions
+
+
+def get_versions(db, collections):
+    """Map each collection name to its {"version", "updated_at"} record."""
+    found = {
+        doc["_id"]: doc
+        for doc in db.content_versions.find({"_id": {"$in": list(collections)}})
+    }
+    return _records(found, collections)
+
+
+async def get_versions_async(db, collections):
+    """get_versions() for an asyncio (AsyncMongoClient) database."""
+    cursor = db.content_versions.find({"_id": {"$in": list(collections)}})
+    found = {doc["_id"]: doc for doc in await cursor.to_list()}
+    return _records(found, collections)
+
+
+class VersionTracker:
+    """This process's view of every collection's content version.
+
+    The versions are re-read with one small query at most every ``interval``
+    seconds; writes made by this process are applied immediately via note().
+
+    When pages are read from replica set secondaries, a secondary may not
+    have a write yet when the new version is seen. ``settle`` is how long
+    that can last; unsettled() reports collections still inside it.
+    """
+
+    def __init__(self, db, interval=1.0, settle=0.0):
+        self.db = db
+        self.interval = interval
+        self.settle = settle
+        self._versions = {}
+        self._changed = {}
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._checked is None or now - self._checked >= self.interval:
+                versions = {
+                    doc["_id"]: doc.get("version", 0)
+                    for doc in self.db.content_versions.find({}, {"version": 1})
+                }
+                if self._checked is not None:
+                    for name, version in versions.items():
+                        if version != self._versions.get(name):
+                            self._changed[name] = now
+                self._versions = versions
+                self._checked = now
+            return self._versions
+
+    def note(self, collection, version):
+        with self._lock:
+            if version > self._versions.get(collection, 0):
+                self._versions = dict(self._versions, **{collection: version})
+                self._changed[collection] = time.monotonic()
+
+    def unsettled(self, collections):
+        """True if any of ``collections`` changed too recently for every
+        secondary to be sure to have the change."""
+        if not self.settle:
+            return False
+        self.current()
+        now = time.monotonic()
+        return any(
+            now - self._changed[name] < self.settle
+            for name in collections
+            if name in self._changed
+        )